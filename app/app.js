@@ -18,7 +18,10 @@ const state = {
   activeAnnotationId: null,
   noteTimers: {},
   assetsRequestSeq: 0,
+  nextCursor: null,
+  loadingMore: false,
   semanticMode: false,
+  hideDuplicates: false,
   error: "",
 };
 
@@ -205,7 +208,9 @@ function getViewCollection() {
 function activeFilterParts() {
   const parts = [];
   const semanticQuery = semanticQueryFromInput(state.q);
-  if (semanticQuery) parts.push(`semantic "${semanticQuery}"`);
+  const likeAsset = likeAssetFromInput(state.q);
+  if (likeAsset) parts.push("more like this");
+  else if (semanticQuery) parts.push(`semantic "${semanticQuery}"`);
   else if (state.q.trim()) parts.push(`search "${state.q.trim()}"`);
   if (state.sources.size > 0) parts.push(`${state.sources.size} source filter${state.sources.size === 1 ? "" : "s"}`);
   if (state.boards.size > 0) parts.push(`${state.boards.size} source tag filter${state.boards.size === 1 ? "" : "s"}`);
@@ -225,9 +230,18 @@ function semanticQueryFromInput(value) {
   return "";
 }
 
-function semanticSourceFilter() {
-  if (state.sources.size === 0) return "";
-  return Array.from(state.sources)[0] || "";
+function likeAssetFromInput(value) {
+  const text = `${value || ""}`.trim();
+  if (!text.toLowerCase().startsWith("like:")) return "";
+  return text.slice("like:".length).trim();
+}
+
+function semanticFilterQueryString() {
+  const source = encodeURIComponent(Array.from(state.sources).join(","));
+  const board = encodeURIComponent(Array.from(state.boards).join(","));
+  const label = encodeURIComponent(Array.from(state.labels).join(","));
+  const col = encodeURIComponent(state.viewCollectionId || "");
+  return `source=${source}&board=${board}&label=${label}&collection_id=${col}`;
 }
 
 function shortRef(value, max = 64) {
@@ -253,7 +267,7 @@ function setStats() {
   const filterState = filters.length ? "Filtered" : "Unfiltered";
   const destination = activeCollection ? ` • Add-to "${activeCollection.name}"` : "";
   $("#canvasContext").textContent = `Canvas: ${scope} • ${filterState}${destination}`;
-  const statsBase = `${state.assets.length} items shown${filters.length ? ` • ${filters.join(" • ")}` : ""}`;
+  const statsBase = `${state.assets.length}${state.nextCursor ? "+" : ""} items shown${filters.length ? ` • ${filters.join(" • ")}` : ""}`;
   $("#stats").textContent = state.error ? `${statsBase} • Error: ${state.error}` : statsBase;
   $("#addSelected").disabled = state.selected.size === 0;
   $("#addSelectedToCollection").textContent = activeCollection ? `Add Selected to "${activeCollection.name}"` : "Add Selected to Collection";
@@ -319,10 +333,11 @@ function renderGrid() {
     const preview = previewForAsset(a);
     const img = preview.url;
     const ai = a.ai;
+    const hasAi = !!(ai || a.ai_created_at);
     const summary = ai?.summary || a.ai_summary || a.description || "";
-    const imageType = ai?.image_type ? `${ai.image_type}` : "";
-    const labelCount = aiLabelCount(ai);
-    const top = topTags(ai, 6);
+    const imageType = a.ai_image_type || ai?.image_type || "";
+    const labelCount = ai ? aiLabelCount(ai) : a.ai_label_count || 0;
+    const top = a.ai_top_tags || topTags(ai, 6);
     const host = sourceHost(a.source_ref || a.image_url || "");
     const placeholderLabel = host ? `No preview (${host})` : "No preview image";
     const metaParts = [];
@@ -351,7 +366,7 @@ function renderGrid() {
         <div class="cardTitle">${escapeHtml(a.title || "(untitled)")}</div>
         ${summary ? `<div class="cardSummary">${escapeHtml(summary)}</div>` : `<div class="cardSummary">Not tagged yet.</div>`}
         <div class="cardMeta">${escapeHtml(meta)}</div>
-        ${ai ? `<div class="compactTags">${renderChips(top)}</div>` : ""}
+        ${hasAi ? `<div class="compactTags">${renderChips(top)}</div>` : ""}
         ${ai ? `<div class="tagGrid">${renderTagSections(ai)}</div>` : ""}
         <div class="expandedInfo">
           <div class="expandedRow">
@@ -371,10 +386,11 @@ function renderGrid() {
               ? `<div class="expandedRow">Created: ${escapeHtml(createdDate)}</div>`
               : ""
           }
-          ${!ai ? '<div class="expandedRow muted">No AI tags available for this item.</div>' : ""}
+          ${!hasAi ? '<div class="expandedRow muted">No AI tags available for this item.</div>' : ""}
         </div>
         <div class="cardFooter">
           <div>AI: ${escapeHtml(a.ai_model || a.ai_provider || "—")} • ${labelCount} tags</div>
+          <button class="miniBtn" data-similar>Similar</button>
           <button class="miniBtn" data-annotate>Annotate</button>
         </div>
       </div>
@@ -415,9 +431,18 @@ function renderGrid() {
       e.stopPropagation();
       openModal(a);
     });
+    el.querySelector("[data-similar]").addEventListener("click", (e) => {
+      e.stopPropagation();
+      state.q = `like:${a.id}`;
+      $("#search").value = state.q;
+      loadAssets();
+    });
     el.onclick = () => {
       if (state.expanded.has(a.id)) state.expanded.delete(a.id);
-      else state.expanded.add(a.id);
+      else {
+        state.expanded.add(a.id);
+        if (hasAi && !ai) loadAssetDetail(a);
+      }
       renderGrid();
     };
     wrap.appendChild(el);
@@ -451,15 +476,36 @@ async function loadTray() {
   setStats();
 }
 
+function assetsQueryString() {
+  const q = encodeURIComponent(state.q || "");
+  const source = encodeURIComponent(Array.from(state.sources).join(","));
+  const board = encodeURIComponent(Array.from(state.boards).join(","));
+  const label = encodeURIComponent(Array.from(state.labels).join(","));
+  const col = encodeURIComponent(state.viewCollectionId || "");
+  const dupes = state.hideDuplicates ? "&hide_duplicates=1" : "";
+  return `fields=card&q=${q}&source=${source}&board=${board}&label=${label}&collection_id=${col}${dupes}`;
+}
+
 async function loadAssets() {
   const requestSeq = ++state.assetsRequestSeq;
   const semanticQuery = semanticQueryFromInput(state.q);
-  state.semanticMode = !!semanticQuery;
+  const likeAsset = likeAssetFromInput(state.q);
+  state.semanticMode = !!(semanticQuery || likeAsset);
+  state.nextCursor = null;
+  state.loadingMore = false;
   try {
+    if (likeAsset) {
+      const id = encodeURIComponent(likeAsset);
+      const data = await api(`/api/assets/${id}/similar?fields=card&${semanticFilterQueryString()}&limit=120`);
+      if (requestSeq !== state.assetsRequestSeq) return;
+      state.error = "";
+      state.assets = (data.results || []).map((a) => ({ ...a, ai: parseAi(a) }));
+      renderGrid();
+      return;
+    }
     if (semanticQuery) {
-      const source = encodeURIComponent(semanticSourceFilter());
       const q = encodeURIComponent(semanticQuery);
-      const data = await api(`/api/search/similar?q=${q}&source=${source}&limit=120`);
+      const data = await api(`/api/search/similar?fields=card&q=${q}&${semanticFilterQueryString()}&limit=120`);
       if (requestSeq !== state.assetsRequestSeq) return;
       state.error = "";
       state.assets = (data.results || []).map((a) => ({ ...a, ai: parseAi(a) }));
@@ -467,15 +513,11 @@ async function loadAssets() {
       return;
     }
 
-    const q = encodeURIComponent(state.q || "");
-    const source = encodeURIComponent(Array.from(state.sources).join(","));
-    const board = encodeURIComponent(Array.from(state.boards).join(","));
-    const label = encodeURIComponent(Array.from(state.labels).join(","));
-    const col = encodeURIComponent(state.viewCollectionId || "");
-    const data = await api(`/api/assets?q=${q}&source=${source}&board=${board}&label=${label}&collection_id=${col}`);
+    const data = await api(`/api/assets?${assetsQueryString()}`);
     if (requestSeq !== state.assetsRequestSeq) return;
     state.error = "";
     state.assets = data.assets.map((a) => ({ ...a, ai: parseAi(a) }));
+    state.nextCursor = data.next_cursor || null;
     renderGrid();
   } catch (err) {
     if (requestSeq !== state.assetsRequestSeq) return;
@@ -485,6 +527,42 @@ async function loadAssets() {
   }
 }
 
+async function loadAssetDetail(asset) {
+  try {
+    const data = await api(`/api/assets/${encodeURIComponent(asset.id)}`);
+    asset.ai = parseAi(data.asset);
+    renderGrid();
+  } catch (err) {
+    state.error = formatApiError(err);
+    setStats();
+  }
+}
+
+async function loadMoreAssets() {
+  if (!state.nextCursor || state.loadingMore || state.semanticMode) return;
+  const requestSeq = state.assetsRequestSeq;
+  state.loadingMore = true;
+  try {
+    const cursor = encodeURIComponent(state.nextCursor);
+    const data = await api(`/api/assets?${assetsQueryString()}&cursor=${cursor}`);
+    if (requestSeq !== state.assetsRequestSeq) return;
+    state.assets = state.assets.concat(data.assets.map((a) => ({ ...a, ai: parseAi(a) })));
+    state.nextCursor = data.next_cursor || null;
+    renderGrid();
+  } catch (err) {
+    if (requestSeq !== state.assetsRequestSeq) return;
+    state.error = formatApiError(err);
+    setStats();
+  } finally {
+    if (requestSeq === state.assetsRequestSeq) state.loadingMore = false;
+  }
+}
+
+$(".content").addEventListener("scroll", (e) => {
+  const el = e.currentTarget;
+  if (el.scrollTop + el.clientHeight >= el.scrollHeight - 800) loadMoreAssets();
+});
+
 async function openModal(asset) {
   state.modalAsset = asset;
   $("#modalTitle").textContent = asset.title || "(untitled)";
@@ -664,7 +742,7 @@ $("#modal").onclick = (e) => {
 
 $("#search").addEventListener("input", (e) => {
   state.q = e.target.value || "";
-  if (semanticQueryFromInput(state.q)) {
+  if (semanticQueryFromInput(state.q) || likeAssetFromInput(state.q)) {
     setStats();
     return;
   }
@@ -889,6 +967,15 @@ async function loadFacets() {
 function renderFilters() {
   const wrap = $("#filters");
   wrap.innerHTML = "";
+  const dupes = document.createElement("label");
+  dupes.className = "filterItem";
+  dupes.innerHTML = `<input type="checkbox" ${state.hideDuplicates ? "checked" : ""} /> Hide duplicates`;
+  dupes.querySelector("input").addEventListener("change", (e) => {
+    state.hideDuplicates = e.target.checked;
+    loadAssets();
+  });
+  wrap.appendChild(dupes);
+
   const groups = [
     { key: "sources", label: "Source", set: state.sources },
     { key: "boards", label: "Source Tags", set: state.boards },
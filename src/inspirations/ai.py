@@ -4,15 +4,24 @@ import base64
 import json
 import math
 import os
+import random
 import re
+import time
+import unicodedata
 import urllib.error
 import urllib.request
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-from .db import Db
+from .db import Db, embedding_input_hash, has_asset_lexical
+from .ann import ANN_INDEXES, DEFAULT_IVF_NPROBE, ivf_scores
+from .embedding_index import embeddings_version, get_embedding_index, indices_at_least, top_indices
+from .search_cache import cached_query_embedding, get_cached_results, library_version, normalize_query, put_cached_results
+from .store import filter_asset_ids
+from .vectors import pack_vector, query_vector
 from .storage import download_and_attach_originals
 from .thumbnails import generate_thumbnails
 
@@ -399,6 +408,76 @@ def _gemini_embed_text(
         raise RuntimeError(f"Invalid embedding values in Gemini response: {e}") from e
 
 
+EMBED_BATCH_SIZE = 100
+EMBED_WORKERS = 4
+EMBED_MAX_ATTEMPTS = 5
+EMBED_BACKOFF_S = 1.0
+
+
+def _retry_delay_s(attempt: int, retry_after: str | None = None) -> float:
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    return EMBED_BACKOFF_S * (2**attempt) * (0.5 + random.random())
+
+
+def _gemini_batch_embed_texts(
+    *,
+    api_key: str,
+    model: str,
+    texts: list[str],
+    task_type: str = "RETRIEVAL_DOCUMENT",
+    timeout_s: float = 60.0,
+) -> list[list[float]]:
+    """One batchEmbedContents call, retried with jittered backoff on 429/5xx and network errors."""
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:batchEmbedContents"
+    payload = {
+        "requests": [
+            {"model": f"models/{model}", "content": {"parts": [{"text": t}]}, "taskType": task_type}
+            for t in texts
+        ]
+    }
+    body = json.dumps(payload).encode("utf-8")
+    for attempt in range(EMBED_MAX_ATTEMPTS):
+        req = urllib.request.Request(
+            url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "x-goog-api-key": api_key,
+            },
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+                data = json.loads(resp.read().decode("utf-8") or "{}")
+            break
+        except urllib.error.HTTPError as e:
+            retryable = e.code == 429 or e.code >= 500
+            if retryable and attempt < EMBED_MAX_ATTEMPTS - 1:
+                time.sleep(_retry_delay_s(attempt, e.headers.get("Retry-After") if e.headers else None))
+                continue
+            detail = e.read().decode("utf-8", errors="ignore") if hasattr(e, "read") else ""
+            raise RuntimeError(f"Gemini batch embed HTTP {e.code}: {detail}") from e
+        except (urllib.error.URLError, TimeoutError) as e:
+            if attempt < EMBED_MAX_ATTEMPTS - 1:
+                time.sleep(_retry_delay_s(attempt))
+                continue
+            raise RuntimeError(f"Gemini batch embed failed: {e}") from e
+
+    embeddings = data.get("embeddings")
+    if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+        raise RuntimeError("Gemini batch embed response does not match request size")
+    out: list[list[float]] = []
+    for item in embeddings:
+        values = (item or {}).get("values")
+        if not isinstance(values, list) or not values:
+            raise RuntimeError("No embedding values in Gemini batch embed response")
+        out.append([float(v) for v in values])
+    return out
+
+
 def _build_embedding_input_text(row: dict[str, Any]) -> str:
     parts: list[str] = []
     field_order = [
@@ -434,9 +513,16 @@ def _cosine_similarity(a: list[float], b: list[float]) -> float:
     return dot / (na * nb)
 
 
+def _lexical_words(text: str) -> list[str]:
+    # Mirrors the asset_lexical tokenizer (unicode61, remove_diacritics 2): letters and
+    # digits in any script, lowercased, with accents stripped.
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.findall(r"[^\W_]+", folded)
+
+
 def _tokenize_lexical(text: str) -> set[str]:
-    tokens = set(re.findall(r"[a-z0-9]+", (text or "").lower()))
-    return {t for t in tokens if t and t not in LEXICAL_STOPWORDS}
+    return {t for t in _lexical_words(text) if t not in LEXICAL_STOPWORDS}
 
 
 def _lexical_overlap_score(query_text: str, doc_text: str) -> float:
@@ -617,6 +703,87 @@ def run_ai_error_triage(
     }
 
 
+def _embedding_candidates(db: Db, *, model: str, source: str = "", skip_duplicates: bool = False) -> list[dict[str, Any]]:
+    """Every asset's current embedding input text and hash, next to the hash it was embedded with."""
+    clauses = ["a.source = ?"] if source else []
+    if skip_duplicates:
+        clauses.append("a.duplicate_of is null")
+    where = "where " + " and ".join(clauses) if clauses else ""
+    params: tuple[Any, ...] = ("gemini", model, source) if source else ("gemini", model)
+    rows = db.query(
+        f"""
+        select a.id, a.source, a.title, a.description, a.board, a.notes,
+               coalesce(ail.summary, a.ai_summary) as ai_summary,
+               (select group_concat(al.label, '|') from asset_labels al where al.asset_id=a.id and al.source='ai') as labels_csv,
+               e.asset_id is not null as has_embedding,
+               e.input_hash as embedded_hash
+        from assets a
+        left join asset_ai_latest ail on ail.asset_id = a.id
+        left join asset_embeddings e on e.asset_id = a.id and e.provider = ? and e.model = ?
+        {where}
+        order by a.imported_at asc
+        """,
+        params,
+    )
+    out = []
+    for r in rows:
+        row = dict(r)
+        text = _build_embedding_input_text(row)
+        out.append(
+            {
+                "id": row["id"],
+                "text": text,
+                "input_hash": embedding_input_hash(text) if text else "",
+                "has_embedding": bool(row["has_embedding"]),
+                "embedded_hash": row["embedded_hash"],
+            }
+        )
+    return out
+
+
+def _share_embeddings_with_duplicates(db: Db, *, model: str, source: str = "", now: str) -> int:
+    """Give near-duplicates without an embedding a copy of their canonical asset's vector."""
+    clauses = ["a.duplicate_of is not null", "dup.asset_id is null"]
+    params: list[Any] = ["gemini", model, "gemini", model]
+    if source:
+        clauses.append("a.source = ?")
+        params.append(source)
+    rows = db.query(
+        f"""
+        select a.id, e.input_text, e.input_hash, e.vector_f32, e.dimensions
+        from assets a
+        join asset_embeddings e on e.asset_id = a.duplicate_of and e.provider = ? and e.model = ?
+        left join asset_embeddings dup on dup.asset_id = a.id and dup.provider = ? and dup.model = ?
+        where {" and ".join(clauses)} and e.vector_f32 is not null
+        """,
+        tuple(params),
+    )
+    db.executemany(
+        """
+        insert into asset_embeddings
+          (id, asset_id, provider, model, input_text, input_hash, vector_json, vector_f32, dimensions, created_at)
+        values (?, ?, ?, ?, ?, ?, '', ?, ?, ?)
+        """,
+        [
+            (str(uuid.uuid4()), r["id"], "gemini", model, r["input_text"], r["input_hash"], r["vector_f32"], r["dimensions"], now)
+            for r in rows
+        ],
+    )
+    return len(rows)
+
+
+def embedding_freshness(db: Db, *, model: str = DEFAULT_GEMINI_EMBEDDING_MODEL, source: str = "") -> dict[str, Any]:
+    embedded = stale = missing = 0
+    for c in _embedding_candidates(db, model=model, source=source):
+        if c["has_embedding"]:
+            embedded += 1
+            if c["input_hash"] != c["embedded_hash"]:
+                stale += 1
+        elif c["text"]:
+            missing += 1
+    return {"provider": "gemini", "model": model, "embedded": embedded, "stale": stale, "missing": missing}
+
+
 def run_gemini_text_embedder(
     db: Db,
     *,
@@ -625,6 +792,10 @@ def run_gemini_text_embedder(
     source: str = "",
     limit: int = 0,
     force: bool = False,
+    only_changed: bool = False,
+    skip_duplicates: bool = False,
+    batch_size: int = EMBED_BATCH_SIZE,
+    workers: int = EMBED_WORKERS,
 ) -> dict[str, Any]:
     run_id = str(uuid.uuid4())
     now = _now_iso()
@@ -633,77 +804,96 @@ def run_gemini_text_embedder(
         (run_id, "gemini-embed", model, now),
     )
 
-    clauses: list[str] = []
-    params: list[Any] = []
-    if source:
-        clauses.append("a.source = ?")
-        params.append(source)
-    if not force:
-        clauses.append(
-            "a.id not in (select asset_id from asset_embeddings where provider=? and model=?)"
-        )
-        params.extend(["gemini", model])
-    where = "where " + " and ".join(clauses) if clauses else ""
-    rows = db.query(
-        f"""
-        select a.id, a.source, a.title, a.description, a.board, a.notes,
-               coalesce(
-                 (select ai.summary from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1),
-                 a.ai_summary
-               ) as ai_summary,
-               (select group_concat(al.label, '|') from asset_labels al where al.asset_id=a.id and al.source='ai') as labels_csv
-        from assets a
-        {where}
-        order by a.imported_at asc
-        """,
-        tuple(params),
-    )
+    candidates = _embedding_candidates(db, model=model, source=source, skip_duplicates=skip_duplicates)
+    if force:
+        rows = candidates
+    elif only_changed:
+        rows = [c for c in candidates if not c["has_embedding"] or c["input_hash"] != c["embedded_hash"]]
+    else:
+        rows = [c for c in candidates if not c["has_embedding"]]
 
+    started = time.perf_counter()
     attempted = 0
     embedded = 0
     errors: list[dict[str, str]] = []
+    pending: list[tuple[str, str]] = []
     for r in rows:
         if limit and attempted >= limit:
             break
         attempted += 1
-        row = dict(r)
-        asset_id = row["id"]
-        text = _build_embedding_input_text(row)
-        if not text:
-            errors.append({"id": asset_id, "error": "No text content available for embedding"})
+        if not r["text"]:
+            errors.append({"id": r["id"], "error": "No text content available for embedding"})
             continue
-        try:
-            vector = _gemini_embed_text(
-                api_key=api_key,
-                model=model,
-                text=text,
-                task_type="RETRIEVAL_DOCUMENT",
-            )
-            db.exec(
-                """
-                insert into asset_embeddings
-                  (id, asset_id, provider, model, input_text, vector_json, dimensions, created_at)
-                values (?, ?, ?, ?, ?, ?, ?, ?)
-                on conflict(asset_id, provider, model) do update set
-                  input_text=excluded.input_text,
-                  vector_json=excluded.vector_json,
-                  dimensions=excluded.dimensions,
-                  created_at=excluded.created_at
-                """,
-                (
-                    str(uuid.uuid4()),
-                    asset_id,
-                    "gemini",
-                    model,
-                    text,
-                    json.dumps(vector),
-                    len(vector),
-                    now,
-                ),
-            )
-            embedded += 1
-        except Exception as e:
-            errors.append({"id": asset_id, "error": str(e)})
+        pending.append((r["id"], r["text"]))
+
+    batch_size = max(1, min(int(batch_size), EMBED_BATCH_SIZE))
+    batches = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def _embed(batch: list[tuple[str, str]]) -> list[list[float]]:
+        return _gemini_batch_embed_texts(
+            api_key=api_key,
+            model=model,
+            texts=[text for _, text in batch],
+            task_type="RETRIEVAL_DOCUMENT",
+        )
+
+    # Workers only make HTTP calls; this thread owns the connection and commits one
+    # transaction per batch, keeping at most 2 * workers batches in flight.
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as exe:
+        in_flight: dict[Any, list[tuple[str, str]]] = {}
+        queue = iter(batches)
+        while True:
+            while len(in_flight) < 2 * max(1, int(workers)):
+                batch = next(queue, None)
+                if batch is None:
+                    break
+                in_flight[exe.submit(_embed, batch)] = batch
+            if not in_flight:
+                break
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for fut in done:
+                batch = in_flight.pop(fut)
+                try:
+                    vectors = fut.result()
+                except Exception as e:
+                    errors.extend({"id": asset_id, "error": str(e)} for asset_id, _ in batch)
+                    continue
+                db.executemany(
+                    """
+                    insert into asset_embeddings
+                      (id, asset_id, provider, model, input_text, input_hash, vector_json, vector_f32, dimensions, created_at)
+                    values (?, ?, ?, ?, ?, ?, '', ?, ?, ?)
+                    on conflict(asset_id, provider, model) do update set
+                      input_text=excluded.input_text,
+                      input_hash=excluded.input_hash,
+                      vector_json=excluded.vector_json,
+                      vector_f32=excluded.vector_f32,
+                      dimensions=excluded.dimensions,
+                      created_at=excluded.created_at
+                    """,
+                    [
+                        (
+                            str(uuid.uuid4()),
+                            asset_id,
+                            "gemini",
+                            model,
+                            text,
+                            embedding_input_hash(text),
+                            pack_vector(vector),
+                            len(vector),
+                            now,
+                        )
+                        for (asset_id, text), vector in zip(batch, vectors)
+                    ],
+                )
+                db.commit()
+                embedded += len(batch)
+    shared = 0
+    if skip_duplicates:
+        # Duplicates keep the canonical copy's vector until they are embedded on their own.
+        shared = _share_embeddings_with_duplicates(db, model=model, source=source, now=now)
+        db.commit()
+    elapsed = max(0.001, time.perf_counter() - started)
 
     return {
         "provider": "gemini",
@@ -711,11 +901,212 @@ def run_gemini_text_embedder(
         "run_id": run_id,
         "attempted": attempted,
         "embedded_assets": embedded,
+        "shared_with_duplicates": shared,
+        "batches": len(batches),
+        "elapsed_s": round(elapsed, 3),
+        "assets_per_s": round(embedded / elapsed, 2),
         "errors": errors[:25],
         "note": "Errors are truncated to 25 in output.",
     }
 
 
+SIMILARITY_CANDIDATE_POOL = 100
+# Under index=ivf, filters that keep at most 1/N of the library are scored exactly.
+IVF_FILTER_EXACT_FRACTION = 4
+
+
+def _allowed_count(allowed: Any) -> int:
+    return int(allowed.sum()) if hasattr(allowed, "sum") else len(allowed)
+
+
+def _lexical_scores(db: Db, query_text: str) -> dict[str, float] | None:
+    """
+    `_lexical_overlap_score` for every asset sharing a query term, read from the
+    asset_lexical posting lists; None when the index is unavailable (no FTS5).
+    """
+    if not has_asset_lexical(db):
+        return None
+    terms = sorted(_tokenize_lexical(query_text))
+    if not terms:
+        return {}
+
+    def _matches(phrase: str) -> list[str]:
+        rows = db.query(
+            """
+            select d.asset_id from asset_lexical
+            join asset_lexical_docs d on d.doc_id = asset_lexical.rowid
+            where asset_lexical match ?
+            """,
+            (f'"{phrase}"',),
+        )
+        return [r["asset_id"] for r in rows]
+
+    hits: dict[str, int] = {}
+    for term in terms:
+        for asset_id in _matches(term):
+            hits[asset_id] = hits.get(asset_id, 0) + 1
+    scores = {asset_id: n / float(len(terms)) for asset_id, n in hits.items()}
+    words = _lexical_words(query_text)
+    if len(words) >= 2:
+        for asset_id in _matches(" ".join(words)):
+            if asset_id in scores:
+                scores[asset_id] = min(1.0, scores[asset_id] + 0.15)
+    return scores
+
+
+def _similarity_rows(db: Db, *, model: str, asset_ids: list[str]) -> dict[str, Any]:
+    if not asset_ids:
+        return {}
+    rows = db.query(
+        """
+        select e.asset_id, e.created_at,
+               a.source, a.source_ref, a.title, a.description, a.board, a.notes,
+               a.image_url, a.stored_path, a.thumb_path, a.imported_at,
+               coalesce(ail.summary, a.ai_summary) as ai_summary,
+               ail.json as ai_json,
+               ail.model as ai_model,
+               ail.provider as ai_provider,
+               ail.created_at as ai_created_at,
+               ail.image_type as ai_image_type,
+               coalesce(ail.label_count, 0) as ai_label_count,
+               ail.top_tags as ai_top_tags
+        from asset_embeddings e
+        join assets a on a.id = e.asset_id
+        left join asset_ai_latest ail on ail.asset_id = a.id
+        where e.provider = ? and e.model = ? and e.asset_id in (select value from json_each(?))
+        """,
+        ("gemini", model, json.dumps(asset_ids)),
+    )
+    return {r["asset_id"]: r for r in rows}
+
+
+def _similarity_result(r: Any, semantic_score: float, lexical_score: float, score: float) -> dict[str, Any]:
+    return {
+        "id": r["asset_id"],
+        "source": r["source"],
+        "source_ref": r["source_ref"],
+        "title": r["title"],
+        "description": r["description"],
+        "board": r["board"],
+        "notes": r["notes"],
+        "image_url": r["image_url"],
+        "stored_path": r["stored_path"],
+        "thumb_path": r["thumb_path"],
+        "imported_at": r["imported_at"],
+        "ai_summary": r["ai_summary"],
+        "ai_json": r["ai_json"],
+        "ai_model": r["ai_model"],
+        "ai_provider": r["ai_provider"],
+        "ai_created_at": r["ai_created_at"],
+        "ai_image_type": r["ai_image_type"],
+        "ai_label_count": r["ai_label_count"],
+        "ai_top_tags": json.loads(r["ai_top_tags"] or "[]"),
+        "semantic_score": semantic_score,
+        "lexical_score": lexical_score,
+        "score": score,
+        "embedding_created_at": r["created_at"],
+    }
+
+
+def _rank_by_vector(
+    db: Db,
+    *,
+    emb_index: Any,
+    group: Any,
+    query: Any,
+    query_text: str,
+    model: str,
+    source: str,
+    board: str,
+    label: str,
+    collection_id: str,
+    semantic_weight: float,
+    lexical_weight: float,
+    min_score: float,
+    index: str,
+    nprobe: int,
+    depth: int,
+    rank_depth: int,
+    exclude: frozenset[str] = frozenset(),
+) -> tuple[list[dict[str, Any]], int]:
+    """Blended, min_score-filtered results for a unit query vector, plus the number of vectors searched."""
+    group_size = len(group.ids)
+    scored: dict[str, dict[str, Any]] = {}
+    searched = 0
+    if group_size:
+        # Filters resolve to candidate ids first, so only their vectors are scored.
+        allowed = None
+        positions = None
+        candidate_ids = filter_asset_ids(db, source=source, board=board, label=label, collection_id=collection_id)
+        if candidate_ids is not None:
+            positions = group.positions_of(candidate_ids)
+            allowed = group.mask_at(positions)
+        if exclude:
+            if allowed is None:
+                allowed = group.mask_at(list(range(group_size)))
+            for i in group.positions_of(exclude):
+                if isinstance(allowed, set):
+                    allowed.discard(i)
+                else:
+                    allowed[i] = False
+        if index == "ivf" and (positions is None or len(positions) * IVF_FILTER_EXACT_FRACTION > group_size):
+            # Approximate candidate set from the probed IVF lists, scored exactly.
+            semantic_scores, probed = ivf_scores(db, emb_index, group, query, nprobe=nprobe)
+            allowed = probed if allowed is None else allowed & probed
+        else:
+            semantic_scores = group.scores(query, positions)
+        searched = group_size if allowed is None else _allowed_count(allowed)
+        lexical = _lexical_scores(db, query_text) if lexical_weight > 0.0 and query_text else {}
+
+        def _score(picks: list[int]) -> None:
+            pending = [group.ids[i] for i in picks if group.ids[i] not in scored]
+            rows = _similarity_rows(db, model=model, asset_ids=pending)
+            for i in picks:
+                asset_id = group.ids[i]
+                if asset_id in scored or asset_id not in rows:
+                    continue
+                semantic_score = float(semantic_scores[i])
+                r = rows[asset_id]
+                if lexical is not None:
+                    lexical_score = lexical.get(asset_id, 0.0)
+                else:
+                    doc_text_parts = [
+                        str(r["title"] or ""),
+                        str(r["description"] or ""),
+                        str(r["board"] or ""),
+                        str(r["notes"] or ""),
+                        str(r["ai_summary"] or ""),
+                    ]
+                    ai_json_text = str(r["ai_json"] or "")
+                    if ai_json_text:
+                        doc_text_parts.append(ai_json_text)
+                    lexical_score = _lexical_overlap_score(query_text, " ".join(doc_text_parts))
+                score = (semantic_weight * semantic_score) + (lexical_weight * lexical_score)
+                scored[asset_id] = _similarity_result(r, semantic_score, lexical_score, score)
+
+        # Rank by the vector score first, then pull in any asset whose best possible
+        # blended score (lexical = 1.0) could still reach the current top `limit`.
+        pool = top_indices(semantic_scores, max(rank_depth, depth * 4), allowed)
+        _score(pool)
+        if lexical_weight > 0.0 and len(pool) < searched:
+            finals = sorted((x["score"] for x in scored.values()), reverse=True)
+            threshold = max(min_score, finals[rank_depth - 1]) if len(finals) >= rank_depth else min_score
+            cutoff = (threshold - lexical_weight) / semantic_weight if semantic_weight > 0.0 else float("-inf")
+            extra = indices_at_least(semantic_scores, cutoff, allowed)
+            if lexical is not None:
+                # Lexical scores are already known, so keep only assets that reach the threshold.
+                extra = [
+                    i
+                    for i in extra
+                    if group.ids[i] in lexical
+                    and semantic_weight * float(semantic_scores[i]) + lexical_weight * lexical[group.ids[i]] >= threshold
+                ]
+            _score(extra)
+
+    results = sorted((x for x in scored.values() if x["score"] >= min_score), key=lambda x: x["score"], reverse=True)
+    return results, searched
+
+
 def run_similarity_search(
     db: Db,
     *,
@@ -723,14 +1114,22 @@ def run_similarity_search(
     query: str,
     model: str = DEFAULT_GEMINI_EMBEDDING_MODEL,
     source: str = "",
+    board: str = "",
+    label: str = "",
+    collection_id: str = "",
     limit: int = 25,
     semantic_weight: float = 0.85,
     lexical_weight: float = 0.15,
     min_score: float = 0.0,
+    index: str = "exact",
+    nprobe: int = DEFAULT_IVF_NPROBE,
+    offset: int = 0,
 ) -> dict[str, Any]:
     query_text = (query or "").strip()
     if not query_text:
         raise ValueError("query is required")
+    if index not in ANN_INDEXES:
+        raise ValueError("index must be one of: " + ", ".join(ANN_INDEXES))
     if limit <= 0:
         limit = 25
     semantic_weight = max(0.0, float(semantic_weight))
@@ -741,102 +1140,179 @@ def run_similarity_search(
     semantic_weight /= weight_sum
     lexical_weight /= weight_sum
     min_score = max(0.0, min(1.0, float(min_score)))
-
-    query_vec = _gemini_embed_text(
-        api_key=api_key,
+    offset = max(0, int(offset))
+    depth = offset + limit
+
+    # Ranked lists are reused while the library and embeddings are unchanged, so
+    # repeated and paginated searches skip the embedding call entirely.
+    cache_key = (
+        normalize_query(query_text),
+        model,
+        source,
+        board,
+        label,
+        collection_id,
+        semantic_weight,
+        lexical_weight,
+        min_score,
+        index,
+        nprobe if index == "ivf" else 0,
+    )
+    data_version = (library_version(db), embeddings_version(db, provider="gemini", model=model))
+    cached = get_cached_results(db, cache_key)
+    if cached is not None and cached["data_version"] == data_version and (cached["depth"] >= depth or cached["complete"]):
+        report = cached["report"]
+        return {**report, "query": query_text, "offset": offset, "cached": True, "results": report["results"][offset:depth]}
+
+    query_vec = cached_query_embedding(
+        db,
         model=model,
-        text=query_text,
         task_type="RETRIEVAL_QUERY",
+        text=query_text,
+        embed=lambda: _gemini_embed_text(
+            api_key=api_key,
+            model=model,
+            text=query_text,
+            task_type="RETRIEVAL_QUERY",
+        ),
     )
-
-    clauses = ["e.provider = ?", "e.model = ?"]
-    params: list[Any] = ["gemini", model]
-    if source:
-        clauses.append("a.source = ?")
-        params.append(source)
-    where = "where " + " and ".join(clauses)
-
-    rows = db.query(
-        f"""
-        select e.asset_id, e.vector_json, e.dimensions, e.created_at,
-               a.source, a.source_ref, a.title, a.description, a.board, a.notes,
-               a.image_url, a.stored_path, a.thumb_path, a.imported_at,
-               coalesce(
-                 (select ai.summary from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1),
-                 a.ai_summary
-               ) as ai_summary,
-               (select ai.json from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_json,
-               (select ai.model from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_model,
-               (select ai.provider from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_provider,
-               (select ai.created_at from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_created_at
-        from asset_embeddings e
-        join assets a on a.id = e.asset_id
-        {where}
-        """,
-        tuple(params),
-    )
-
-    scored: list[dict[str, Any]] = []
-    skipped_mismatch = 0
-    for r in rows:
-        try:
-            vector = [float(x) for x in json.loads(r["vector_json"] or "[]")]
-        except Exception:
-            continue
-        if len(vector) != len(query_vec):
-            skipped_mismatch += 1
-            continue
-        semantic_score = _cosine_similarity(query_vec, vector)
-        doc_text_parts = [
-            str(r["title"] or ""),
-            str(r["description"] or ""),
-            str(r["board"] or ""),
-            str(r["notes"] or ""),
-            str(r["ai_summary"] or ""),
-        ]
-        ai_json_text = str(r["ai_json"] or "")
-        if ai_json_text:
-            doc_text_parts.append(ai_json_text)
-        lexical_score = _lexical_overlap_score(query_text, " ".join(doc_text_parts))
-        score = (semantic_weight * semantic_score) + (lexical_weight * lexical_score)
-        if score < min_score:
-            continue
-        scored.append(
-            {
-                "id": r["asset_id"],
-                "source": r["source"],
-                "source_ref": r["source_ref"],
-                "title": r["title"],
-                "description": r["description"],
-                "board": r["board"],
-                "notes": r["notes"],
-                "image_url": r["image_url"],
-                "stored_path": r["stored_path"],
-                "thumb_path": r["thumb_path"],
-                "imported_at": r["imported_at"],
-                "ai_summary": r["ai_summary"],
-                "ai_json": r["ai_json"],
-                "ai_model": r["ai_model"],
-                "ai_provider": r["ai_provider"],
-                "ai_created_at": r["ai_created_at"],
-                "semantic_score": semantic_score,
-                "lexical_score": lexical_score,
-                "score": score,
-                "embedding_created_at": r["created_at"],
-            }
+    # Rank a little deeper than asked so the next pages come from the cache too.
+    rank_depth = max(depth, SIMILARITY_CANDIDATE_POOL)
+
+    emb_index = get_embedding_index(db, provider="gemini", model=model)
+    group = emb_index.group(len(query_vec))
+    group_size = len(group.ids) if group is not None else 0
+    skipped_mismatch = emb_index.size - group_size
+    results: list[dict[str, Any]] = []
+    searched = 0
+    if group is not None:
+        results, searched = _rank_by_vector(
+            db,
+            emb_index=emb_index,
+            group=group,
+            query=query_vector(query_vec),
+            query_text=query_text,
+            model=model,
+            source=source,
+            board=board,
+            label=label,
+            collection_id=collection_id,
+            semantic_weight=semantic_weight,
+            lexical_weight=lexical_weight,
+            min_score=min_score,
+            index=index,
+            nprobe=nprobe,
+            depth=depth,
+            rank_depth=rank_depth,
         )
-    scored.sort(key=lambda x: x["score"], reverse=True)
 
-    return {
+    report = {
         "query": query_text,
         "provider": "gemini",
         "model": model,
         "semantic_weight": semantic_weight,
         "lexical_weight": lexical_weight,
         "min_score": min_score,
-        "compared_assets": len(scored),
+        "index": index,
+        "nprobe": nprobe if index == "ivf" else None,
+        "compared_assets": len(results),
+        "searched_vectors": searched,
         "skipped_dimension_mismatch": skipped_mismatch,
-        "results": scored[:limit],
+        "results": results[:rank_depth],
+    }
+    put_cached_results(
+        db,
+        cache_key,
+        {"data_version": data_version, "depth": rank_depth, "complete": len(results) < rank_depth, "report": report},
+    )
+    return {**report, "offset": offset, "cached": False, "results": results[offset:depth]}
+
+
+def run_similar_assets(
+    db: Db,
+    *,
+    asset_id: str = "",
+    collection_id: str = "",
+    tray: bool = False,
+    model: str = DEFAULT_GEMINI_EMBEDDING_MODEL,
+    source: str = "",
+    board: str = "",
+    label: str = "",
+    limit: int = 25,
+    min_score: float = 0.0,
+    index: str = "exact",
+    nprobe: int = DEFAULT_IVF_NPROBE,
+    offset: int = 0,
+) -> dict[str, Any]:
+    """
+    "More like this": rank assets against a stored embedding (one asset) or the
+    centroid of a collection's or the tray's embeddings. No embedding API call is
+    made; the seed assets themselves are left out of the results.
+    """
+    if asset_id:
+        seed = {"asset_id": asset_id}
+        seeds = [asset_id]
+    elif collection_id:
+        seed = {"collection_id": collection_id}
+        seeds = [r["asset_id"] for r in db.query("select asset_id from collection_items where collection_id=?", (collection_id,))]
+    elif tray:
+        seed = {"tray": True}
+        seeds = [r["asset_id"] for r in db.query("select asset_id from tray_items")]
+    else:
+        raise ValueError("asset_id, collection_id or tray is required")
+    if index not in ANN_INDEXES:
+        raise ValueError("index must be one of: " + ", ".join(ANN_INDEXES))
+    if limit <= 0:
+        limit = 25
+    min_score = max(0.0, min(1.0, float(min_score)))
+    offset = max(0, int(offset))
+    depth = offset + limit
+
+    emb_index = get_embedding_index(db, provider="gemini", model=model)
+    # Seeds embedded at several dimensionalities use the group holding most of them.
+    group, at = None, []
+    for g in emb_index.groups.values():
+        positions = g.positions_of(seeds)
+        if len(positions) > len(at):
+            group, at = g, positions
+    if group is None:
+        raise ValueError(f"no {model} embeddings found for the requested assets")
+
+    results, searched = _rank_by_vector(
+        db,
+        emb_index=emb_index,
+        group=group,
+        query=group.centroid(at),
+        query_text="",
+        model=model,
+        source=source,
+        board=board,
+        label=label,
+        collection_id="",
+        semantic_weight=1.0,
+        lexical_weight=0.0,
+        min_score=min_score,
+        index=index,
+        nprobe=nprobe,
+        depth=depth,
+        rank_depth=depth,
+        exclude=frozenset(seeds),
+    )
+    return {
+        "seed": {**seed, "embedded_assets": len(at), "assets": len(seeds)},
+        "provider": "gemini",
+        "model": model,
+        "semantic_weight": 1.0,
+        "lexical_weight": 0.0,
+        "min_score": min_score,
+        "index": index,
+        "nprobe": nprobe if index == "ivf" else None,
+        "compared_assets": len(results),
+        "searched_vectors": searched,
+        "skipped_dimension_mismatch": emb_index.size - len(group.ids),
+        "offset": offset,
+        "cached": False,
+        "results": results[offset:depth],
     }
 
 
@@ -889,6 +1365,43 @@ def run_mock_labeler(db: Db, *, limit: int = 0) -> dict[str, Any]:
     }
 
 
+def _share_labels_with_duplicates(db: Db, *, source: str = "", run_id: str, now: str) -> int:
+    """Copy the canonical asset's latest Gemini result and AI labels to untagged near-duplicates."""
+    clauses = ["a.duplicate_of is not null", "a.id not in (select asset_id from asset_ai where provider=?)"]
+    params: list[Any] = ["gemini"]
+    if source:
+        clauses.append("a.source = ?")
+        params.append(source)
+    rows = db.query(
+        f"""
+        select a.id, a.duplicate_of, ail.model, ail.summary, ail.json
+        from assets a
+        join asset_ai_latest ail on ail.asset_id = a.duplicate_of and ail.provider = 'gemini'
+        where {" and ".join(clauses)}
+        """,
+        tuple(params),
+    )
+    for r in rows:
+        db.exec(
+            "insert into asset_ai (id, asset_id, provider, model, summary, json, created_at) values (?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), r["id"], "gemini", r["model"], r["summary"], r["json"], now),
+        )
+        if r["summary"]:
+            db.exec("update assets set ai_summary=? where id=?", (r["summary"], r["id"]))
+        labels = db.query(
+            "select label, confidence, model from asset_labels where asset_id=? and source='ai'", (r["duplicate_of"],)
+        )
+        db.executemany(
+            """
+            insert or ignore into asset_labels
+              (id, asset_id, label, confidence, source, model, run_id, created_at)
+            values (?, ?, ?, ?, ?, ?, ?, ?);
+            """,
+            [(str(uuid.uuid4()), r["id"], lab["label"], lab["confidence"], "ai", lab["model"], run_id, now) for lab in labels],
+        )
+    return len(rows)
+
+
 def run_gemini_image_labeler(
     db: Db,
     *,
@@ -901,6 +1414,7 @@ def run_gemini_image_labeler(
     store_dir: Path | None = None,
     preflight: bool = True,
     recitation_fallback_model: str | None = None,
+    skip_duplicates: bool = False,
 ) -> dict[str, Any]:
     fallback_model = (
         (recitation_fallback_model or "").strip()
@@ -938,6 +1452,10 @@ def run_gemini_image_labeler(
             "a.id not in (select asset_id from asset_ai where provider=?)"
         )
         params.extend(["gemini"])
+    if skip_duplicates:
+        # Near-duplicates (see duplicates.py) are not sent; they copy their canonical
+        # asset's tags once the loop below has labeled it.
+        clauses.append("a.duplicate_of is null")
     where = "where " + " and ".join(clauses) if clauses else ""
     rows = db.query(
         f"""
@@ -1041,6 +1559,8 @@ def run_gemini_image_labeler(
                 now=now,
             )
 
+    shared = _share_labels_with_duplicates(db, source=source, run_id=run_id, now=now) if skip_duplicates else 0
+
     return {
         "provider": "gemini",
         "model": model,
@@ -1049,6 +1569,7 @@ def run_gemini_image_labeler(
         "attempted": attempted,
         "labeled_assets": labeled,
         "fallback_labeled_assets": fallback_labeled,
+        "shared_with_duplicates": shared,
         "errors": errors[:25],
         "note": "Errors are truncated to 25 in output.",
     }
@@ -1074,5 +1595,6 @@ def run_ai_labeler(db: Db, *, provider: str, limit: int = 0, **kwargs: Any) -> d
             store_dir=kwargs.get("store_dir"),
             preflight=bool(kwargs.get("preflight", True)),
             recitation_fallback_model=kwargs.get("recitation_fallback_model"),
+            skip_duplicates=bool(kwargs.get("skip_duplicates")),
         )
     raise ValueError("Unsupported provider. Use provider=mock or provider=gemini.")
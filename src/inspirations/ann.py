@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .db import Db
+from .embedding_index import EmbeddingIndex, VectorGroup, get_embedding_index
+from .vectors import np
+
+
+ANN_INDEXES = ("exact", "ivf")
+DEFAULT_IVF_NPROBE = 8
+IVF_TRAIN_SAMPLE = 20000
+IVF_TRAIN_ITERATIONS = 8
+IVF_RETRAIN_GROWTH = 4
+_ASSIGN_CHUNK = 8192
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("The ivf index requires NumPy (pip install numpy)")
+
+
+def ivf_path(db_path: Path, *, provider: str, model: str, dims: int) -> Path:
+    safe_model = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+    return Path(db_path).with_name(f"{Path(db_path).name}.ivf-{provider}-{safe_model}-{dims}.npz")
+
+
+def default_nlist(n: int) -> int:
+    return max(1, min(n, int(4 * math.sqrt(n))))
+
+
+def _assign(matrix: Any, centroids: Any) -> Any:
+    out = np.empty(len(matrix), dtype="int32")
+    for start in range(0, len(matrix), _ASSIGN_CHUNK):
+        chunk = matrix[start : start + _ASSIGN_CHUNK]
+        out[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return out
+
+
+def train_centroids(matrix: Any, *, nlist: int, iterations: int = IVF_TRAIN_ITERATIONS, seed: int = 0) -> Any:
+    """Spherical k-means over (a sample of) unit vectors; centroids stay unit length."""
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    sample = matrix[rng.choice(n, size=IVF_TRAIN_SAMPLE, replace=False)] if n > IVF_TRAIN_SAMPLE else matrix
+    nlist = max(1, min(nlist, len(sample)))
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        counts = np.bincount(assignment, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype("float32")
+    return centroids
+
+
+class IvfIndex:
+    """
+    Inverted-file index over one VectorGroup: each vector belongs to its nearest
+    centroid, and a query scans only the `nprobe` closest lists.
+    """
+
+    def __init__(self, *, path: Path, centroids: Any, ids: list[str], assignment: Any, trained_size: int):
+        self.path = path
+        self.centroids = centroids
+        self.ids = ids
+        self.assignment = assignment
+        self.trained_size = trained_size
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                ids=np.array(self.ids, dtype=str),
+                assignment=self.assignment,
+                trained_size=np.array(self.trained_size),
+            )
+        os.replace(tmp, self.path)
+
+    @classmethod
+    def load(cls, path: Path) -> IvfIndex | None:
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                path=path,
+                centroids=data["centroids"],
+                ids=[str(x) for x in data["ids"]],
+                assignment=data["assignment"],
+                trained_size=int(data["trained_size"]),
+            )
+
+
+class _IvfView:
+    """An IvfIndex aligned to the positions of the current in-memory vector group."""
+
+    def __init__(self, group: VectorGroup, ivf: IvfIndex):
+        self.group = group
+        self.ivf = ivf
+        positions = group.positions()
+        assignment = np.full(len(group.ids), -1, dtype="int32")
+        for asset_id, list_id in zip(ivf.ids, ivf.assignment):
+            pos = positions.get(asset_id)
+            if pos is not None:
+                assignment[pos] = list_id
+        missing = np.nonzero(assignment < 0)[0]
+        if len(missing) or len(ivf.ids) != len(group.ids):
+            # Incremental insert: new embeddings join their nearest existing list.
+            if len(missing):
+                assignment[missing] = _assign(group.matrix[missing], ivf.centroids)
+            ivf.ids = list(group.ids)
+            ivf.assignment = assignment
+            ivf.save()
+        order = np.argsort(assignment, kind="stable")
+        self._order = order
+        self._offsets = np.searchsorted(assignment[order], np.arange(ivf.nlist + 1))
+
+    def candidates(self, query: Any, nprobe: int) -> Any:
+        centroid_scores = self.ivf.centroids @ query
+        nprobe = max(1, min(nprobe, self.ivf.nlist))
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        parts = [self._order[self._offsets[c] : self._offsets[c + 1]] for c in probe]
+        return np.concatenate(parts) if parts else np.empty(0, dtype="int64")
+
+
+_VIEWS: dict[Path, tuple[EmbeddingIndex, _IvfView]] = {}
+_VIEWS_LOCK = threading.Lock()
+
+
+def build_ivf_index(db: Db, *, provider: str, model: str, nlist: int = 0, evaluate: bool = True) -> dict[str, Any]:
+    _require_numpy()
+    index = get_embedding_index(db, provider=provider, model=model)
+    reports = []
+    for dims, group in index.groups.items():
+        if not group.ids:
+            continue
+        started = time.perf_counter()
+        ivf = _train(db, group, provider=provider, model=model, nlist=nlist)
+        report: dict[str, Any] = {
+            "dims": dims,
+            "vectors": len(group.ids),
+            "nlist": ivf.nlist,
+            "path": str(ivf.path),
+            "build_seconds": round(time.perf_counter() - started, 3),
+        }
+        view = _IvfView(group, ivf)
+        with _VIEWS_LOCK:
+            _VIEWS[ivf.path] = (index, view)
+        if evaluate:
+            report["recall"] = evaluate_ivf(group, view)
+        reports.append(report)
+    return {"provider": provider, "model": model, "indexes": reports}
+
+
+def _train(db: Db, group: VectorGroup, *, provider: str, model: str, nlist: int = 0) -> IvfIndex:
+    n = len(group.ids)
+    centroids = train_centroids(group.matrix, nlist=nlist or default_nlist(n))
+    ivf = IvfIndex(
+        path=ivf_path(db.path, provider=provider, model=model, dims=group.dims),
+        centroids=centroids,
+        ids=list(group.ids),
+        assignment=_assign(group.matrix, centroids),
+        trained_size=n,
+    )
+    ivf.save()
+    return ivf
+
+
+def ivf_view(db: Db, index: EmbeddingIndex, group: VectorGroup) -> _IvfView:
+    """
+    Load (training on first use) the persisted IVF index for a group, retraining
+    once the library has grown IVF_RETRAIN_GROWTH times past the trained size.
+    """
+    _require_numpy()
+    path = ivf_path(db.path, provider=index.provider, model=index.model, dims=group.dims)
+    with _VIEWS_LOCK:
+        cached = _VIEWS.get(path)
+        if cached is not None and cached[0] is index:
+            return cached[1]
+        ivf = IvfIndex.load(path)
+        if ivf is None or ivf.centroids.shape[1] != group.dims or len(group.ids) > IVF_RETRAIN_GROWTH * ivf.trained_size:
+            ivf = _train(db, group, provider=index.provider, model=index.model)
+        view = _IvfView(group, ivf)
+        _VIEWS[path] = (index, view)
+        return view
+
+
+def ivf_scores(db: Db, index: EmbeddingIndex, group: VectorGroup, query: Any, *, nprobe: int = DEFAULT_IVF_NPROBE) -> tuple[Any, Any]:
+    """
+    Exact scores for the vectors in the probed lists (-inf elsewhere) plus a mask
+    of those candidates.
+    """
+    cand = ivf_view(db, index, group).candidates(query, nprobe)
+    scores = np.full(len(group.ids), -np.inf, dtype="float32")
+    scores[cand] = group.matrix[cand] @ query
+    mask = np.zeros(len(group.ids), dtype=bool)
+    mask[cand] = True
+    return scores, mask
+
+
+def evaluate_ivf(group: VectorGroup, view: _IvfView, *, k: int = 10, queries: int = 50, seed: int = 0) -> list[dict[str, Any]]:
+    """Recall@k and mean latency per nprobe, using stored vectors as queries."""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(group.ids), size=min(queries, len(group.ids)), replace=False)
+    exact = []
+    for p in picks:
+        scores = group.matrix @ group.matrix[p]
+        exact.append(set(np.argsort(-scores)[:k].tolist()))
+    out = []
+    nprobe = 1
+    while True:
+        hits = 0
+        started = time.perf_counter()
+        for p, truth in zip(picks, exact):
+            cand = view.candidates(group.matrix[p], nprobe)
+            scores = group.matrix[cand] @ group.matrix[p]
+            top = cand[np.argsort(-scores)[:k]]
+            hits += len(truth.intersection(top.tolist()))
+        elapsed = time.perf_counter() - started
+        out.append(
+            {
+                "nprobe": nprobe,
+                "recall_at_k": round(hits / float(len(picks) * min(k, len(group.ids))), 4),
+                "ms_per_query": round(1000.0 * elapsed / len(picks), 3),
+            }
+        )
+        if nprobe >= view.ivf.nlist or out[-1]["recall_at_k"] >= 0.999:
+            break
+        nprobe = min(nprobe * 2, view.ivf.nlist)
+    return out
+
+
+def clear_ivf_cache() -> None:
+    with _VIEWS_LOCK:
+        _VIEWS.clear()
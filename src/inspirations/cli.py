@@ -5,19 +5,25 @@ import json
 import os
 from pathlib import Path
 
-from .db import Db, ensure_schema
+from .db import DEFAULT_BUSY_TIMEOUT_MS, Db, ensure_schema
 from .importers.facebook_saved import import_facebook_saved_zip
 from .importers.pinterest_crawler import import_pinterest_crawler_zip
 from .importers.scans import import_scans_inbox
-from .storage import download_and_attach_originals
+from .storage import DOWNLOAD_PER_HOST, DOWNLOAD_WORKERS, download_and_attach_originals
 from .thumbnails import generate_thumbnails
+from .duplicates import DUPLICATE_MAX_DISTANCE, backfill_dhashes, find_duplicate_clusters, mark_duplicates
 from .ai import (
     DEFAULT_GEMINI_EMBEDDING_MODEL,
+    EMBED_BATCH_SIZE,
+    EMBED_WORKERS,
     run_ai_error_triage,
+    embedding_freshness,
     run_ai_labeler,
     run_gemini_text_embedder,
+    run_similar_assets,
     run_similarity_search,
 )
+from .ann import ANN_INDEXES, DEFAULT_IVF_NPROBE, build_ivf_index
 from .server import run_server
 
 
@@ -44,7 +50,12 @@ def cmd_list(args: argparse.Namespace) -> int:
             "select source, count(*) as n from assets group by source order by n desc, source asc"
         )
         total = db.query_value("select count(*) from assets")
-    out = {"total_assets": total, "by_source": [{"source": r["source"], "n": r["n"]} for r in rows]}
+        embeddings = embedding_freshness(db, model=DEFAULT_GEMINI_EMBEDDING_MODEL)
+    out = {
+        "total_assets": total,
+        "by_source": [{"source": r["source"], "n": r["n"]} for r in rows],
+        "embeddings": embeddings,
+    }
     print(json.dumps(out, indent=2))
     return 0
 
@@ -62,7 +73,13 @@ def cmd_import_pinterest(args: argparse.Namespace) -> int:
         with Db(db_path) as db:
             ensure_schema(db)
             dl = download_and_attach_originals(
-                db=db, store_dir=store_dir, source="pinterest", limit=args.download_limit
+                db=db,
+                store_dir=store_dir,
+                source="pinterest",
+                limit=args.download_limit,
+                workers=args.download_workers,
+                per_host=args.download_per_host,
+                ignore_backoff=args.download_ignore_backoff,
             )
         report["downloaded"] = dl
 
@@ -88,6 +105,9 @@ def cmd_import_facebook(args: argparse.Namespace) -> int:
                 source="facebook",
                 limit=args.download_limit,
                 retry_non_image=args.retry_non_image,
+                workers=args.download_workers,
+                per_host=args.download_per_host,
+                ignore_backoff=args.download_ignore_backoff,
             )
         report["downloaded"] = dl
 
@@ -128,11 +148,29 @@ def cmd_thumbs(args: argparse.Namespace) -> int:
             limit=args.limit,
             source=source,
             tool=args.tool,
+            workers=args.workers,
         )
     print(json.dumps(report, indent=2))
     return 0
 
 
+def cmd_dupes(args: argparse.Namespace) -> int:
+    db_path = _p(args.db)
+    with Db(db_path) as db:
+        ensure_schema(db)
+        out: dict = {}
+        if args.backfill:
+            out["backfill"] = backfill_dhashes(db, limit=args.limit, max_distance=args.max_distance)
+        if args.mark:
+            out["mark"] = mark_duplicates(db, max_distance=args.max_distance)
+        clusters = find_duplicate_clusters(db, max_distance=args.max_distance)
+        out["clusters"] = len(clusters)
+        out["duplicates"] = sum(len(ids) - 1 for ids in clusters)
+        out["top"] = [{"canonical": ids[0], "duplicates": ids[1:]} for ids in clusters[: args.show]]
+    print(json.dumps(out, indent=2))
+    return 0
+
+
 def cmd_ai_tag(args: argparse.Namespace) -> int:
     db_path = _p(args.db)
     with Db(db_path) as db:
@@ -149,6 +187,7 @@ def cmd_ai_tag(args: argparse.Namespace) -> int:
             force=args.force,
             store_dir=_p(args.store),
             preflight=args.preflight,
+            skip_duplicates=args.skip_duplicates,
         )
     print(json.dumps(report, indent=2))
     return 0
@@ -188,16 +227,42 @@ def cmd_ai_embed(args: argparse.Namespace) -> int:
             source=args.source,
             limit=args.limit,
             force=args.force,
+            only_changed=args.only_changed,
+            skip_duplicates=args.skip_duplicates,
+            batch_size=args.batch_size,
+            workers=args.workers,
         )
     print(json.dumps(report, indent=2))
     return 0
 
 
 def cmd_ai_similar(args: argparse.Namespace) -> int:
+    db_path = _p(args.db)
+    if args.asset or args.like_collection or args.tray:
+        # "More like this" reuses stored vectors, so no API key is needed.
+        with Db(db_path) as db:
+            ensure_schema(db)
+            report = run_similar_assets(
+                db,
+                asset_id=args.asset,
+                collection_id=args.like_collection,
+                tray=args.tray,
+                model=args.model or DEFAULT_GEMINI_EMBEDDING_MODEL,
+                source=args.source,
+                board=args.board,
+                label=args.label,
+                limit=args.limit,
+                min_score=args.min_score,
+                index=args.index,
+                nprobe=args.nprobe,
+            )
+        print(json.dumps(report, indent=2))
+        return 0
+    if not args.query:
+        raise ValueError("--query, --asset, --like-collection or --tray is required")
     api_key = args.api_key or os.environ.get("GEMINI_API_KEY") or ""
     if not api_key:
         raise ValueError("Gemini API key required (set --api-key or GEMINI_API_KEY)")
-    db_path = _p(args.db)
     with Db(db_path) as db:
         ensure_schema(db)
         report = run_similarity_search(
@@ -206,10 +271,30 @@ def cmd_ai_similar(args: argparse.Namespace) -> int:
             query=args.query,
             model=args.model or DEFAULT_GEMINI_EMBEDDING_MODEL,
             source=args.source,
+            board=args.board,
+            label=args.label,
+            collection_id=args.collection,
             limit=args.limit,
             semantic_weight=args.semantic_weight,
             lexical_weight=args.lexical_weight,
             min_score=args.min_score,
+            index=args.index,
+            nprobe=args.nprobe,
+        )
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def cmd_ai_ann_build(args: argparse.Namespace) -> int:
+    db_path = _p(args.db)
+    with Db(db_path) as db:
+        ensure_schema(db)
+        report = build_ivf_index(
+            db,
+            provider="gemini",
+            model=args.model or DEFAULT_GEMINI_EMBEDDING_MODEL,
+            nlist=args.nlist,
+            evaluate=args.evaluate,
         )
     print(json.dumps(report, indent=2))
     return 0
@@ -222,9 +307,23 @@ def cmd_serve(args: argparse.Namespace) -> int:
     if args.reload:
         from .devserver import run_with_reload
 
-        run_with_reload(host=args.host, port=args.port, db_path=db_path, app_dir=app_dir, store_dir=store_dir)
+        run_with_reload(
+            host=args.host,
+            port=args.port,
+            db_path=db_path,
+            app_dir=app_dir,
+            store_dir=store_dir,
+            busy_timeout_ms=args.busy_timeout_ms,
+        )
         return 0
-    run_server(host=args.host, port=args.port, db_path=db_path, app_dir=app_dir, store_dir=store_dir)
+    run_server(
+        host=args.host,
+        port=args.port,
+        db_path=db_path,
+        app_dir=app_dir,
+        store_dir=store_dir,
+        busy_timeout_ms=args.busy_timeout_ms,
+    )
     return 0
 
 
@@ -251,6 +350,13 @@ def build_parser() -> argparse.ArgumentParser:
     pin.add_argument("--limit", type=int, default=0, help="Limit parsed records (0 = no limit)")
     pin.add_argument("--download", action="store_true", help="Download originals after import")
     pin.add_argument("--download-limit", type=int, default=0, help="Limit downloads (0 = no limit)")
+    pin.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent downloads")
+    pin.add_argument("--download-per-host", type=int, default=DOWNLOAD_PER_HOST, help="Concurrent downloads per host")
+    pin.add_argument(
+        "--download-ignore-backoff",
+        action="store_true",
+        help="Retry URLs that recently failed instead of waiting for their backoff",
+    )
     pin.set_defaults(func=cmd_import_pinterest)
 
     fb = imp_sub.add_parser("facebook", help="Import Facebook saved items export ZIP")
@@ -258,6 +364,13 @@ def build_parser() -> argparse.ArgumentParser:
     fb.add_argument("--limit", type=int, default=0, help="Limit parsed records (0 = no limit)")
     fb.add_argument("--download", action="store_true", help="Download originals after import")
     fb.add_argument("--download-limit", type=int, default=0, help="Limit downloads (0 = no limit)")
+    fb.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent downloads")
+    fb.add_argument("--download-per-host", type=int, default=DOWNLOAD_PER_HOST, help="Concurrent downloads per host")
+    fb.add_argument(
+        "--download-ignore-backoff",
+        action="store_true",
+        help="Retry URLs that recently failed instead of waiting for their backoff",
+    )
     fb.add_argument(
         "--retry-non-image",
         action="store_true",
@@ -278,8 +391,22 @@ def build_parser() -> argparse.ArgumentParser:
     thumbs.add_argument("--limit", type=int, default=0, help="Limit assets (0 = no limit)")
     thumbs.add_argument("--source", default="", help="Only generate for a source (pinterest/facebook/scan)")
     thumbs.add_argument("--tool", default="auto", help="Tool: auto | sips | magick")
+    thumbs.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parallel conversion processes (e.g. the CPU count; 1 = in-process)",
+    )
     thumbs.set_defaults(func=cmd_thumbs)
 
+    dupes = sub.add_parser("dupes", help="List near-duplicate clusters by perceptual hash")
+    dupes.add_argument("--max-distance", type=int, default=DUPLICATE_MAX_DISTANCE, help="Max Hamming distance (of 64 bits)")
+    dupes.add_argument("--backfill", action="store_true", help="Hash existing thumbnails that have no hash yet")
+    dupes.add_argument("--mark", action="store_true", help="Recompute duplicate_of for the whole library")
+    dupes.add_argument("--limit", type=int, default=0, help="Limit thumbnails hashed by --backfill (0 = no limit)")
+    dupes.add_argument("--show", type=int, default=20, help="Clusters to print")
+    dupes.set_defaults(func=cmd_dupes)
+
     ai = sub.add_parser("ai", help="AI utilities")
     ai_sub = ai.add_subparsers(dest="ai_cmd")
     tag = ai_sub.add_parser("tag", help="Run AI tagging")
@@ -300,6 +427,7 @@ def build_parser() -> argparse.ArgumentParser:
         help="Tag from thumbnails or originals",
     )
     tag.add_argument("--force", action="store_true", help="Retag even if already tagged")
+    tag.add_argument("--skip-duplicates", action="store_true", help="Send only canonical copies; near-duplicates copy their results")
     tag.add_argument(
         "--preflight",
         action=argparse.BooleanOptionalAction,
@@ -328,26 +456,55 @@ def build_parser() -> argparse.ArgumentParser:
     embed.add_argument("--source", default="", help="Only embed one source (pinterest/facebook/scan)")
     embed.add_argument("--limit", type=int, default=0, help="Limit assets (0 = no limit)")
     embed.add_argument("--force", action="store_true", help="Re-embed even if embedding already exists")
+    embed.add_argument("--skip-duplicates", action="store_true", help="Send only canonical copies; near-duplicates copy their results")
+    embed.add_argument("--only-changed", action="store_true", help="Embed new assets and re-embed those whose input text changed")
+    embed.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Texts per batchEmbedContents request (max 100)")
+    embed.add_argument("--workers", type=int, default=EMBED_WORKERS, help="Concurrent embedding requests")
     embed.add_argument("--api-key", default="", help="Gemini API key (or set GEMINI_API_KEY)")
     embed.set_defaults(func=cmd_ai_embed)
 
     similar = ai_sub.add_parser("similar", help="Run similarity search against stored embeddings")
-    similar.add_argument("--query", required=True, help="Natural-language query text")
+    similar.add_argument("--query", default="", help="Natural-language query text")
+    similar.add_argument("--asset", default="", help="Find assets similar to this asset id (uses its stored embedding)")
+    similar.add_argument("--like-collection", default="", help="Find assets similar to this collection's centroid")
+    similar.add_argument("--tray", action="store_true", help="Find assets similar to the tray's centroid")
     similar.add_argument("--source", default="", help="Optional source filter")
+    similar.add_argument("--board", default="", help="Optional board filter (comma-separated)")
+    similar.add_argument("--label", default="", help="Optional label filter (comma-separated)")
+    similar.add_argument("--collection", default="", help="Optional collection id filter")
     similar.add_argument("--limit", type=int, default=25, help="Top results to return")
     similar.add_argument("--model", default=DEFAULT_GEMINI_EMBEDDING_MODEL, help="Embedding model")
     similar.add_argument("--semantic-weight", type=float, default=0.85, help="Weight for cosine similarity")
     similar.add_argument("--lexical-weight", type=float, default=0.15, help="Weight for lexical overlap")
     similar.add_argument("--min-score", type=float, default=0.0, help="Discard results below this blended score")
+    similar.add_argument("--index", default="exact", choices=list(ANN_INDEXES), help="exact scan or approximate ivf index")
+    similar.add_argument("--nprobe", type=int, default=DEFAULT_IVF_NPROBE, help="IVF lists to scan (higher = better recall)")
     similar.add_argument("--api-key", default="", help="Gemini API key (or set GEMINI_API_KEY)")
     similar.set_defaults(func=cmd_ai_similar)
 
+    ann_build = ai_sub.add_parser("ann-build", help="Train the IVF index for approximate similarity search")
+    ann_build.add_argument("--model", default=DEFAULT_GEMINI_EMBEDDING_MODEL, help="Embedding model")
+    ann_build.add_argument("--nlist", type=int, default=0, help="Number of IVF lists (0 = 4*sqrt(vectors))")
+    ann_build.add_argument(
+        "--evaluate",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Report recall@10 and latency per nprobe",
+    )
+    ann_build.set_defaults(func=cmd_ai_ann_build)
+
     serve = sub.add_parser("serve", help="Run local web app")
     serve.add_argument("--host", default="127.0.0.1", help="Bind host (default 127.0.0.1)")
     serve.add_argument("--port", type=int, default=8000, help="Port")
     serve.add_argument("--app", default="app", help="App directory (static files)")
     serve.add_argument("--store", default="store", help="Store directory (originals/thumbs)")
     serve.add_argument("--reload", action="store_true", help="Auto-reload on file changes")
+    serve.add_argument(
+        "--busy-timeout-ms",
+        type=int,
+        default=DEFAULT_BUSY_TIMEOUT_MS,
+        help="SQLite busy timeout for pooled server connections",
+    )
     serve.set_defaults(func=cmd_serve)
 
     return p
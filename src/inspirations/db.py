@@ -1,16 +1,96 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import sqlite3
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
+
+from .vectors import pack_vector
+
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_CACHE_SIZE_KIB = 64 * 1024
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class ConnectionPool:
+    """
+    Reusable WAL-mode SQLite connections for long-running processes (the API server).
+    A connection is checked out by one thread at a time, so its page cache stays warm.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+        cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        temp_store: str = "memory",
+        max_idle: int = 8,
+    ):
+        self.path = path
+        self.busy_timeout_ms = max(0, int(busy_timeout_ms))
+        self.cache_size_kib = max(0, int(cache_size_kib))
+        self.mmap_size = max(0, int(mmap_size))
+        self.temp_store = temp_store
+        self.max_idle = max(1, int(max_idle))
+        self._lock = threading.Lock()
+        self._idle: list[sqlite3.Connection] = []
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000.0,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("pragma journal_mode=wal;")
+        conn.execute("pragma synchronous=normal;")
+        conn.execute(f"pragma busy_timeout={self.busy_timeout_ms};")
+        conn.execute(f"pragma cache_size=-{self.cache_size_kib};")
+        conn.execute(f"pragma mmap_size={self.mmap_size};")
+        conn.execute(f"pragma temp_store={self.temp_store};")
+        conn.execute("pragma foreign_keys=on;")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ConnectionPool is closed")
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
 
 
 class Db:
-    def __init__(self, path: Path):
+    def __init__(self, path: Path, *, pool: ConnectionPool | None = None):
         self.path = path
+        self._pool = pool
         self._conn: sqlite3.Connection | None = None
 
     def __enter__(self) -> "Db":
+        if self._pool is not None:
+            self._conn = self._pool.acquire()
+            return self
         self._conn = sqlite3.connect(self.path)
         self._conn.row_factory = sqlite3.Row
         self._conn.execute("pragma foreign_keys=on;")
@@ -22,7 +102,10 @@ class Db:
                 self._conn.commit()
             else:
                 self._conn.rollback()
-            self._conn.close()
+            if self._pool is not None:
+                self._pool.release(self._conn)
+            else:
+                self._conn.close()
             self._conn = None
 
     @property
@@ -37,6 +120,9 @@ class Db:
     def executemany(self, sql: str, rows: list[tuple[Any, ...]]) -> None:
         self.conn.executemany(sql, rows)
 
+    def commit(self) -> None:
+        self.conn.commit()
+
     def query(self, sql: str, params: tuple[Any, ...] = ()) -> list[sqlite3.Row]:
         cur = self.conn.execute(sql, params)
         return list(cur.fetchall())
@@ -55,7 +141,8 @@ def _ensure_columns(db: Db, table: str, columns: dict[str, str]) -> None:
         db.exec(f"alter table {table} add column {name} {decl};")
 
 
-def ensure_schema(db: Db) -> None:
+def _migrate_base(db: Db) -> None:
+    # Idempotent: databases created before schema_version existed run this again safely.
     db.exec(
         """
         create table if not exists assets (
@@ -219,3 +306,637 @@ def ensure_schema(db: Db) -> None:
         on asset_embeddings(asset_id, provider, model);
         """
     )
+
+
+def fts5_available(db: Db) -> bool:
+    try:
+        db.exec("create virtual table temp.fts5_probe using fts5(x);")
+        db.exec("drop table temp.fts5_probe;")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+# {match} is a predicate on the asset id, e.g. "= new.asset_id".
+_ASSET_SEARCH_DELETE_SQL = """
+    delete from asset_search where rowid in (select doc_id from asset_search_docs where asset_id {match});
+"""
+_ASSET_SEARCH_INSERT_SQL = """
+    insert into asset_search
+      (rowid, title, description, board, source_ref, notes, ai_summary, labels, annotations, collections)
+    select d.doc_id, a.title, a.description, a.board, a.source_ref, a.notes,
+           coalesce(
+             (select ai.summary from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1),
+             a.ai_summary
+           ),
+           (select group_concat(al.label, ' ') from asset_labels al where al.asset_id=a.id),
+           (select group_concat(an.text, ' ') from annotations an where an.asset_id=a.id),
+           (select group_concat(c.name, ' ')
+            from collection_items ci join collections c on c.id=ci.collection_id
+            where ci.asset_id=a.id)
+    from assets a
+    join asset_search_docs d on d.asset_id = a.id
+    where a.id {match};
+"""
+
+
+def _asset_search_refresh_sql(match: str) -> str:
+    return _ASSET_SEARCH_DELETE_SQL.format(match=match) + _ASSET_SEARCH_INSERT_SQL.format(match=match)
+
+
+def _create_asset_search_trigger(db: Db, name: str, event: str, body: str) -> None:
+    db.exec(f"create trigger if not exists {name} after {event} begin {body} end;")
+
+
+def _migrate_asset_search(db: Db) -> None:
+    # SQLite builds without FTS5 keep using the LIKE fallback in store.list_assets.
+    if not fts5_available(db):
+        return
+    db.exec(
+        """
+        create table if not exists asset_search_docs (
+          doc_id integer primary key,
+          asset_id text not null unique
+        );
+        """
+    )
+    db.exec(
+        """
+        create virtual table if not exists asset_search using fts5(
+          title, description, board, source_ref, notes, ai_summary, labels, annotations, collections,
+          tokenize = 'unicode61 remove_diacritics 2',
+          prefix = '2 3'
+        );
+        """
+    )
+    _create_asset_search_trigger(
+        db,
+        "tr_asset_search_assets_insert",
+        "insert on assets",
+        "insert or ignore into asset_search_docs (asset_id) values (new.id);" + _asset_search_refresh_sql("= new.id"),
+    )
+    _create_asset_search_trigger(
+        db,
+        "tr_asset_search_assets_update",
+        "update of title, description, board, source_ref, notes, ai_summary on assets",
+        _asset_search_refresh_sql("= new.id"),
+    )
+    _create_asset_search_trigger(
+        db,
+        "tr_asset_search_assets_delete",
+        "delete on assets",
+        _ASSET_SEARCH_DELETE_SQL.format(match="= old.id") + "delete from asset_search_docs where asset_id = old.id;",
+    )
+    for table, update_event in (
+        ("asset_labels", "update"),
+        ("asset_ai", "update"),
+        ("annotations", "update of text"),
+        ("collection_items", None),
+    ):
+        _create_asset_search_trigger(
+            db, f"tr_asset_search_{table}_insert", f"insert on {table}", _asset_search_refresh_sql("= new.asset_id")
+        )
+        _create_asset_search_trigger(
+            db, f"tr_asset_search_{table}_delete", f"delete on {table}", _asset_search_refresh_sql("= old.asset_id")
+        )
+        if update_event:
+            _create_asset_search_trigger(
+                db,
+                f"tr_asset_search_{table}_update",
+                f"{update_event} on {table}",
+                _asset_search_refresh_sql("= new.asset_id"),
+            )
+    _create_asset_search_trigger(
+        db,
+        "tr_asset_search_collections_update",
+        "update of name on collections",
+        _asset_search_refresh_sql("in (select asset_id from collection_items where collection_id = new.id)"),
+    )
+    rebuild_asset_search(db)
+
+
+def rebuild_asset_search(db: Db) -> None:
+    db.exec("delete from asset_search_docs where asset_id not in (select id from assets);")
+    db.exec("insert or ignore into asset_search_docs (asset_id) select id from assets;")
+    db.exec("delete from asset_search;")
+    db.exec(_ASSET_SEARCH_INSERT_SQL.format(match="is not null"))
+
+
+def has_asset_search(db: Db) -> bool:
+    return bool(
+        db.query_value("select count(*) from sqlite_master where type='table' and name='asset_search'")
+    )
+
+
+_ASSET_AI_LATEST_RECOMPUTE_SQL = """
+    delete from asset_ai_latest where asset_id = {asset_id};
+    insert into asset_ai_latest (asset_id, ai_id, provider, model, summary, json, created_at)
+    select ai.asset_id, ai.id, ai.provider, ai.model, ai.summary, ai.json, ai.created_at
+    from asset_ai ai
+    where ai.asset_id = {asset_id}
+    order by ai.created_at desc
+    limit 1;
+"""
+
+
+def _migrate_asset_ai_latest(db: Db) -> None:
+    # One row per asset mirroring its newest asset_ai result; maintained by triggers so
+    # every writer (CLI, tagging_runner, tagging_batch) keeps it current.
+    db.exec(
+        """
+        create table if not exists asset_ai_latest (
+          asset_id text primary key,
+          ai_id text not null,
+          provider text not null,
+          model text,
+          summary text,
+          json text,
+          created_at text not null,
+          foreign key(asset_id) references assets(id) on delete cascade
+        );
+        """
+    )
+    db.exec(
+        """
+        create trigger if not exists tr_asset_ai_latest_insert after insert on asset_ai begin
+          insert into asset_ai_latest (asset_id, ai_id, provider, model, summary, json, created_at)
+          values (new.asset_id, new.id, new.provider, new.model, new.summary, new.json, new.created_at)
+          on conflict(asset_id) do update set
+            ai_id=excluded.ai_id,
+            provider=excluded.provider,
+            model=excluded.model,
+            summary=excluded.summary,
+            json=excluded.json,
+            created_at=excluded.created_at
+          where excluded.created_at >= asset_ai_latest.created_at;
+        end;
+        """
+    )
+    db.exec(
+        "create trigger if not exists tr_asset_ai_latest_update after update on asset_ai begin "
+        + _ASSET_AI_LATEST_RECOMPUTE_SQL.format(asset_id="old.asset_id")
+        + _ASSET_AI_LATEST_RECOMPUTE_SQL.format(asset_id="new.asset_id")
+        + " end;"
+    )
+    db.exec(
+        "create trigger if not exists tr_asset_ai_latest_delete after delete on asset_ai begin "
+        + _ASSET_AI_LATEST_RECOMPUTE_SQL.format(asset_id="old.asset_id")
+        + " end;"
+    )
+    db.exec("delete from asset_ai_latest;")
+    db.exec(
+        """
+        insert into asset_ai_latest (asset_id, ai_id, provider, model, summary, json, created_at)
+        select asset_id, id, provider, model, summary, json, created_at
+        from (
+          select ai.*, row_number() over (partition by ai.asset_id order by ai.created_at desc) as rn
+          from asset_ai ai
+        )
+        where rn = 1;
+        """
+    )
+
+
+# 3 = local thumbnail, 2 = image-like stored original, 1 = image-like remote URL, 0 = link only.
+PREVIEW_RANK_SQL = """
+    case
+      when thumb_path is not null and thumb_path != '' then 3
+      when stored_path is not null and (
+        lower(stored_path) like '%.jpg'
+        or lower(stored_path) like '%.jpeg'
+        or lower(stored_path) like '%.png'
+        or lower(stored_path) like '%.webp'
+        or lower(stored_path) like '%.gif'
+        or lower(stored_path) like '%.bmp'
+        or lower(stored_path) like '%.svg'
+      ) then 2
+      when image_url is not null and (
+        lower(image_url) like '%.jpg%'
+        or lower(image_url) like '%.jpeg%'
+        or lower(image_url) like '%.png%'
+        or lower(image_url) like '%.webp%'
+        or lower(image_url) like '%.gif%'
+        or lower(image_url) like '%.bmp%'
+        or lower(image_url) like '%.svg%'
+      ) then 1
+      else 0
+    end
+"""
+
+
+def _migrate_preview_rank(db: Db) -> None:
+    _ensure_columns(db, "assets", {"preview_rank": "integer not null default 0"})
+    db.exec(
+        f"""
+        create trigger if not exists tr_assets_preview_rank_insert after insert on assets begin
+          update assets set preview_rank = {PREVIEW_RANK_SQL} where id = new.id;
+        end;
+        """
+    )
+    db.exec(
+        f"""
+        create trigger if not exists tr_assets_preview_rank_update
+        after update of thumb_path, stored_path, image_url on assets begin
+          update assets set preview_rank = {PREVIEW_RANK_SQL} where id = new.id;
+        end;
+        """
+    )
+    db.exec(f"update assets set preview_rank = {PREVIEW_RANK_SQL};")
+    db.exec("create index if not exists ix_assets_preview_rank_imported_at on assets(preview_rank, imported_at);")
+
+
+def _migrate_keyset_indexes(db: Db) -> None:
+    # Grid order is (preview_rank, imported_at, id) descending; id makes keyset cursors unique.
+    db.exec("drop index if exists ix_assets_preview_rank_imported_at;")
+    db.exec(
+        "create index if not exists ix_assets_preview_rank_imported_at_id on assets(preview_rank, imported_at, id);"
+    )
+    db.exec(
+        """
+        create index if not exists ix_assets_source_preview_rank_imported_at_id
+        on assets(source, preview_rank, imported_at, id);
+        """
+    )
+
+
+# Buckets mirror topTags()/aiLabelCount() in app/app.js, in display order.
+AI_TOP_TAG_KEYS = ("rooms", "elements", "materials", "colors", "styles", "lighting", "fixtures", "appliances", "tags")
+AI_LABEL_KEYS = AI_TOP_TAG_KEYS + ("text_in_image", "brands_products")
+AI_TOP_TAG_LIMIT = 6
+
+
+def _ai_card_fields_sql(json_expr: str) -> str:
+    top_keys = ", ".join(f"('{k}', {i})" for i, k in enumerate(AI_TOP_TAG_KEYS))
+    label_keys = ", ".join(f"('{k}')" for k in AI_LABEL_KEYS)
+    scalar = "j.type in ('text', 'integer', 'real', 'true') and trim(j.value) <> ''"
+    return f"""
+      image_type = case when json_valid({json_expr}) then json_extract({json_expr}, '$.image_type') end,
+      label_count = case when json_valid({json_expr}) then (
+        select count(*) from (values {label_keys}) k, json_each({json_expr}, '$.' || k.column1) j
+        where {scalar}
+      ) else 0 end,
+      top_tags = case when json_valid({json_expr}) then (
+        select json_group_array(tag) from (
+          select trim(j.value) as tag, min(k.column2 * 1000000 + coalesce(j.key, 0)) as pos
+          from (values {top_keys}) k, json_each({json_expr}, '$.' || k.column1) j
+          where {scalar}
+          group by tag
+          order by pos
+          limit {AI_TOP_TAG_LIMIT}
+        )
+      ) else '[]' end
+    """
+
+
+def _migrate_ai_card_fields(db: Db) -> None:
+    # Grid cards read these instead of shipping and parsing the full AI JSON per asset.
+    _ensure_columns(
+        db,
+        "asset_ai_latest",
+        {"image_type": "text", "label_count": "integer not null default 0", "top_tags": "text not null default '[]'"},
+    )
+    fields = _ai_card_fields_sql("new.json")
+    db.exec(
+        f"""
+        create trigger if not exists tr_asset_ai_latest_card_insert after insert on asset_ai_latest begin
+          update asset_ai_latest set {fields} where asset_id = new.asset_id;
+        end;
+        """
+    )
+    db.exec(
+        f"""
+        create trigger if not exists tr_asset_ai_latest_card_update after update of json on asset_ai_latest begin
+          update asset_ai_latest set {fields} where asset_id = new.asset_id;
+        end;
+        """
+    )
+    _backfill_ai_card_fields(db)
+
+
+def _backfill_ai_card_fields(db: Db) -> None:
+    # Qualified on purpose: a bare `json` inside json_each() resolves to json_each's own hidden column.
+    db.exec(f"update asset_ai_latest set {_ai_card_fields_sql('asset_ai_latest.json')};")
+
+
+def _migrate_embedding_blobs(db: Db) -> None:
+    # Embeddings move from JSON text to unit-normalized little-endian float32 (see vectors.py).
+    _ensure_columns(db, "asset_embeddings", {"vector_f32": "blob"})
+    rows = db.query("select id, vector_json from asset_embeddings where vector_f32 is null and vector_json <> ''")
+    for r in rows:
+        try:
+            values = [float(x) for x in json.loads(r["vector_json"])]
+        except (ValueError, TypeError):
+            continue
+        db.exec(
+            "update asset_embeddings set vector_f32=?, vector_json='' where id=?",
+            (pack_vector(values), r["id"]),
+        )
+
+
+_EMBEDDING_VERSION_BUMP_SQL = """
+    insert into embedding_versions (provider, model, version) values ({ref}.provider, {ref}.model, 1)
+    on conflict(provider, model) do update set version = version + 1;
+"""
+
+
+def _migrate_embedding_versions(db: Db) -> None:
+    # In-memory embedding indexes compare this counter to decide when to rebuild.
+    db.exec(
+        """
+        create table if not exists embedding_versions (
+          provider text not null,
+          model text not null,
+          version integer not null,
+          primary key(provider, model)
+        );
+        """
+    )
+    db.exec(
+        "create trigger if not exists tr_embedding_versions_insert after insert on asset_embeddings begin "
+        + _EMBEDDING_VERSION_BUMP_SQL.format(ref="new")
+        + " end;"
+    )
+    db.exec(
+        "create trigger if not exists tr_embedding_versions_update after update on asset_embeddings begin "
+        + _EMBEDDING_VERSION_BUMP_SQL.format(ref="old")
+        + _EMBEDDING_VERSION_BUMP_SQL.format(ref="new")
+        + " end;"
+    )
+    db.exec(
+        "create trigger if not exists tr_embedding_versions_delete after delete on asset_embeddings begin "
+        + _EMBEDDING_VERSION_BUMP_SQL.format(ref="old")
+        + " end;"
+    )
+
+
+_LIBRARY_VERSION_BUMP_SQL = """
+    insert into data_versions (name, version) values ('library', 1)
+    on conflict(name) do update set version = version + 1;
+"""
+
+
+def _migrate_search_cache(db: Db) -> None:
+    db.exec(
+        """
+        create table if not exists query_embedding_cache (
+          model text not null,
+          task_type text not null,
+          query_norm text not null,
+          vector_f32 blob not null,
+          dimensions integer not null,
+          created_at text not null,
+          last_used_at text not null,
+          primary key(model, task_type, query_norm)
+        );
+        """
+    )
+    db.exec("create index if not exists ix_query_embedding_cache_last_used on query_embedding_cache(last_used_at);")
+    # Bumped on any change that can alter search results; cached result lists compare it.
+    db.exec(
+        """
+        create table if not exists data_versions (
+          name text primary key,
+          version integer not null
+        );
+        """
+    )
+    for table in ("assets", "asset_ai_latest"):
+        for event in ("insert", "update", "delete"):
+            db.exec(
+                f"create trigger if not exists tr_data_versions_{table}_{event} after {event} on {table} begin "
+                + _LIBRARY_VERSION_BUMP_SQL
+                + " end;"
+            )
+
+
+def embedding_input_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _migrate_embedding_input_hash(db: Db) -> None:
+    _ensure_columns(db, "asset_embeddings", {"input_hash": "text"})
+    rows = db.query("select id, input_text from asset_embeddings where input_hash is null")
+    db.executemany(
+        "update asset_embeddings set input_hash=? where id=?",
+        [(embedding_input_hash(r["input_text"] or ""), r["id"]) for r in rows],
+    )
+
+
+# Inverted index behind the lexical half of hybrid similarity search; it covers the
+# same fields the per-document scorer used to tokenize on every query.
+_ASSET_LEXICAL_DELETE_SQL = """
+    delete from asset_lexical where rowid in (select doc_id from asset_lexical_docs where asset_id {match});
+"""
+_ASSET_LEXICAL_INSERT_SQL = """
+    insert into asset_lexical (rowid, title, description, board, notes, ai_summary, ai_json)
+    select d.doc_id, a.title, a.description, a.board, a.notes, coalesce(ail.summary, a.ai_summary), ail.json
+    from assets a
+    join asset_lexical_docs d on d.asset_id = a.id
+    left join asset_ai_latest ail on ail.asset_id = a.id
+    where a.id {match};
+"""
+
+
+_ASSET_LEXICAL_TABLE_SQL = """
+    create virtual table if not exists asset_lexical using fts5(
+      title, description, board, notes, ai_summary, ai_json,
+      tokenize = 'unicode61 remove_diacritics 2'
+    );
+"""
+
+
+def _asset_lexical_refresh_sql(match: str) -> str:
+    return _ASSET_LEXICAL_DELETE_SQL.format(match=match) + _ASSET_LEXICAL_INSERT_SQL.format(match=match)
+
+
+def _migrate_asset_lexical(db: Db) -> None:
+    if not fts5_available(db):
+        return
+    db.exec(
+        """
+        create table if not exists asset_lexical_docs (
+          doc_id integer primary key,
+          asset_id text not null unique
+        );
+        """
+    )
+    db.exec(_ASSET_LEXICAL_TABLE_SQL)
+    _create_asset_search_trigger(
+        db,
+        "tr_asset_lexical_assets_insert",
+        "insert on assets",
+        "insert or ignore into asset_lexical_docs (asset_id) values (new.id);" + _asset_lexical_refresh_sql("= new.id"),
+    )
+    _create_asset_search_trigger(
+        db,
+        "tr_asset_lexical_assets_update",
+        "update of title, description, board, notes, ai_summary on assets",
+        _asset_lexical_refresh_sql("= new.id"),
+    )
+    _create_asset_search_trigger(
+        db,
+        "tr_asset_lexical_assets_delete",
+        "delete on assets",
+        _ASSET_LEXICAL_DELETE_SQL.format(match="= old.id") + "delete from asset_lexical_docs where asset_id = old.id;",
+    )
+    for event, ref in (("insert", "new"), ("update", "new"), ("delete", "old")):
+        _create_asset_search_trigger(
+            db,
+            f"tr_asset_lexical_asset_ai_latest_{event}",
+            f"{event} on asset_ai_latest",
+            _asset_lexical_refresh_sql(f"= {ref}.asset_id"),
+        )
+    db.exec("insert or ignore into asset_lexical_docs (asset_id) select id from assets;")
+    db.exec("delete from asset_lexical;")
+    db.exec(_ASSET_LEXICAL_INSERT_SQL.format(match="is not null"))
+
+
+def _migrate_asset_lexical_diacritics(db: Db) -> None:
+    # Query terms keep non-ASCII letters and fold accents, so the index has to fold them too.
+    sql = db.query_value("select sql from sqlite_master where type='table' and name='asset_lexical'")
+    if not sql or "remove_diacritics 0" not in sql:
+        return
+    db.exec("drop table asset_lexical;")
+    db.exec(_ASSET_LEXICAL_TABLE_SQL)
+    db.exec(_ASSET_LEXICAL_INSERT_SQL.format(match="is not null"))
+
+
+def has_asset_lexical(db: Db) -> bool:
+    return bool(
+        db.query_value("select count(*) from sqlite_master where type='table' and name='asset_lexical'")
+    )
+
+
+def _migrate_filter_indexes(db: Db) -> None:
+    # Lets semantic search resolve board and label filters to asset ids before scoring.
+    db.exec("create index if not exists ix_assets_board on assets(board);")
+    db.exec("create index if not exists ix_asset_labels_label on asset_labels(label);")
+
+
+def _migrate_perceptual_hash(db: Db) -> None:
+    _ensure_columns(db, "assets", {"dhash": "text", "duplicate_of": "text"})
+    db.exec("create index if not exists ix_assets_dhash on assets(dhash);")
+    db.exec("create index if not exists ix_assets_duplicate_of on assets(duplicate_of);")
+
+
+def _migrate_media_path_indexes(db: Db) -> None:
+    # Reference counts for shared originals/thumbnails when deleting assets.
+    db.exec("create index if not exists ix_assets_stored_path on assets(stored_path);")
+    db.exec("create index if not exists ix_assets_thumb_path on assets(thumb_path);")
+
+
+def _migrate_url_previews(db: Db) -> None:
+    # What a page URL resolved to (image, og:image preview, nothing, or an HTTP error),
+    # with validators for conditional revalidation and when a negative result may be retried.
+    db.exec(
+        """
+        create table if not exists url_previews (
+          url text primary key,
+          status text not null,
+          image_url text,
+          http_status integer,
+          error text,
+          etag text,
+          last_modified text,
+          fetched_at text not null,
+          retry_after text
+        );
+        """
+    )
+
+
+def _migrate_download_attempts(db: Db) -> None:
+    # Per-URL download ledger: `attempts` counts consecutive failures and drives the
+    # exponential backoff in next_eligible_at.
+    db.exec(
+        """
+        create table if not exists download_attempts (
+          url text primary key,
+          host text not null,
+          status text not null,
+          attempts integer not null default 0,
+          bytes integer,
+          latency_ms integer,
+          error_class text,
+          error text,
+          last_attempt_at text not null,
+          next_eligible_at text
+        );
+        """
+    )
+    db.exec("create index if not exists ix_download_attempts_host on download_attempts(host, status);")
+
+
+def _migrate_filter_versions(db: Db) -> None:
+    # Label and collection filters are part of search cache keys, so membership
+    # changes must invalidate cached results too.
+    for table in ("asset_labels", "collection_items"):
+        for event in ("insert", "update", "delete"):
+            db.exec(
+                f"create trigger if not exists tr_data_versions_{table}_{event} after {event} on {table} begin "
+                + _LIBRARY_VERSION_BUMP_SQL
+                + " end;"
+            )
+
+
+def _migrate_ai_card_fields_repair(db: Db) -> None:
+    # The first card-field backfill read json_each's hidden column and zeroed every existing row.
+    _backfill_ai_card_fields(db)
+
+
+MIGRATIONS: list[Callable[[Db], None]] = [
+    _migrate_base,
+    _migrate_asset_search,
+    _migrate_asset_ai_latest,
+    _migrate_preview_rank,
+    _migrate_keyset_indexes,
+    _migrate_ai_card_fields,
+    _migrate_embedding_blobs,
+    _migrate_embedding_versions,
+    _migrate_search_cache,
+    _migrate_embedding_input_hash,
+    _migrate_asset_lexical,
+    _migrate_filter_indexes,
+    _migrate_perceptual_hash,
+    _migrate_media_path_indexes,
+    _migrate_url_previews,
+    _migrate_download_attempts,
+    _migrate_filter_versions,
+    _migrate_ai_card_fields_repair,
+    _migrate_asset_lexical_diacritics,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(db: Db) -> int:
+    try:
+        value = db.query_value("select version from schema_version where id=1")
+    except sqlite3.OperationalError:
+        return 0
+    return int(value or 0)
+
+
+def ensure_schema(db: Db) -> None:
+    current = schema_version(db)
+    if current >= SCHEMA_VERSION:
+        return
+    db.exec(
+        """
+        create table if not exists schema_version (
+          id integer primary key check (id = 1),
+          version integer not null,
+          updated_at text not null
+        );
+        """
+    )
+    for version, migrate in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        migrate(db)
+        db.exec(
+            """
+            insert into schema_version (id, version, updated_at) values (1, ?, ?)
+            on conflict(id) do update set version=excluded.version, updated_at=excluded.updated_at
+            """,
+            (version, datetime.now(timezone.utc).isoformat()),
+        )
@@ -4,6 +4,7 @@ import os
 import time
 from pathlib import Path
 
+from .db import DEFAULT_BUSY_TIMEOUT_MS
 from .server import run_server
 
 
@@ -35,12 +36,27 @@ def _changed(prev: dict[str, float], curr: dict[str, float]) -> bool:
     return False
 
 
-def run_with_reload(*, host: str, port: int, db_path: Path, app_dir: Path, store_dir: Path) -> None:
+def run_with_reload(
+    *,
+    host: str,
+    port: int,
+    db_path: Path,
+    app_dir: Path,
+    store_dir: Path,
+    busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+) -> None:
     root = Path.cwd()
     last = _scan(root)
     pid = os.fork()
     if pid == 0:
-        run_server(host=host, port=port, db_path=db_path, app_dir=app_dir, store_dir=store_dir)
+        run_server(
+            host=host,
+            port=port,
+            db_path=db_path,
+            app_dir=app_dir,
+            store_dir=store_dir,
+            busy_timeout_ms=busy_timeout_ms,
+        )
         return
     try:
         while True:
@@ -50,7 +66,14 @@ def run_with_reload(*, host: str, port: int, db_path: Path, app_dir: Path, store
                 os.kill(pid, 9)
                 pid = os.fork()
                 if pid == 0:
-                    run_server(host=host, port=port, db_path=db_path, app_dir=app_dir, store_dir=store_dir)
+                    run_server(
+                        host=host,
+                        port=port,
+                        db_path=db_path,
+                        app_dir=app_dir,
+                        store_dir=store_dir,
+                        busy_timeout_ms=busy_timeout_ms,
+                    )
                     return
                 last = curr
     except KeyboardInterrupt:
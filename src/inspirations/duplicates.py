@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+from .db import Db
+
+
+DHASH_WIDTH = 9
+DHASH_HEIGHT = 8
+# Hamming distance (of 64 bits) at or below which two images count as the same photo.
+DUPLICATE_MAX_DISTANCE = 8
+
+
+def dhash_from_pixels(pixels: Sequence[int]) -> int:
+    """Difference hash of a row-major 9x8 grayscale image: one bit per horizontal gradient."""
+    value = 0
+    for y in range(DHASH_HEIGHT):
+        row = y * DHASH_WIDTH
+        for x in range(DHASH_WIDTH - 1):
+            value = (value << 1) | (1 if pixels[row + x] < pixels[row + x + 1] else 0)
+    return value
+
+
+def _gray_pixels_pillow(path: Path) -> bytes:
+    from PIL import Image
+
+    with Image.open(path) as im:
+        return im.convert("L").resize((DHASH_WIDTH, DHASH_HEIGHT), Image.BILINEAR).tobytes()
+
+
+def _gray_pixels_magick(path: Path) -> bytes:
+    out = subprocess.run(
+        [
+            "magick",
+            str(path),
+            "-colorspace",
+            "gray",
+            "-resize",
+            f"{DHASH_WIDTH}x{DHASH_HEIGHT}!",
+            "-depth",
+            "8",
+            "gray:-",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return out.stdout
+
+
+def compute_dhash(path: Path) -> str | None:
+    """16-hex-digit dHash of an image file, or None when no decoder is available or it fails."""
+    readers = []
+    try:
+        import PIL  # noqa: F401
+
+        readers.append(_gray_pixels_pillow)
+    except Exception:
+        pass
+    if shutil.which("magick"):
+        readers.append(_gray_pixels_magick)
+    for read in readers:
+        try:
+            pixels = read(path)
+        except Exception:
+            continue
+        if len(pixels) == DHASH_WIDTH * DHASH_HEIGHT:
+            return f"{dhash_from_pixels(pixels):016x}"
+    return None
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming-radius lookups."""
+
+    def __init__(self) -> None:
+        self._root: tuple[int, Any, dict[int, Any]] | None = None
+        self.size = 0
+
+    def add(self, value: int, item: Any) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = (value, item, {})
+            return
+        node = self._root
+        while True:
+            d = hamming(value, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (value, item, {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, Any]]:
+        """(distance, item) pairs within max_distance, closest first."""
+        out: list[tuple[int, Any]] = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= max_distance:
+                out.append((d, node[1]))
+            for edge, child in node[2].items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        out.sort(key=lambda x: x[0])
+        return out
+
+
+def _hashed_assets(db: Db) -> Iterator[Any]:
+    return iter(
+        db.query(
+            """
+            select id, dhash, duplicate_of from assets
+            where dhash is not null and dhash != ''
+            order by imported_at asc, id asc
+            """
+        )
+    )
+
+
+def load_hash_tree(db: Db) -> BKTree:
+    """Tree of every hashed asset; items are (asset_id, canonical_id)."""
+    tree = BKTree()
+    for r in _hashed_assets(db):
+        tree.add(int(r["dhash"], 16), (r["id"], r["duplicate_of"] or r["id"]))
+    return tree
+
+
+def record_dhash(
+    db: Db,
+    tree: BKTree,
+    *,
+    asset_id: str,
+    dhash: str,
+    max_distance: int = DUPLICATE_MAX_DISTANCE,
+) -> str | None:
+    """
+    Store an asset's hash and, when an already-hashed asset is within max_distance,
+    point duplicate_of at that asset's canonical. Returns the canonical id, if any.
+    """
+    value = int(dhash, 16)
+    canonical = None
+    for _, (other_id, other_canonical) in tree.search(value, max_distance):
+        if other_id != asset_id:
+            canonical = other_canonical
+            break
+    db.exec("update assets set dhash=?, duplicate_of=? where id=?", (dhash, canonical, asset_id))
+    tree.add(value, (asset_id, canonical or asset_id))
+    return canonical
+
+
+def find_duplicate_clusters(db: Db, *, max_distance: int = DUPLICATE_MAX_DISTANCE) -> list[list[str]]:
+    """
+    Groups of assets connected by near-identical hashes (single linkage), each
+    ordered by import time so the first id is the canonical copy.
+    """
+    rows = list(_hashed_assets(db))
+    order = {r["id"]: i for i, r in enumerate(rows)}
+    parent = {r["id"]: r["id"] for r in rows}
+
+    def _find(x: str) -> str:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    tree = BKTree()
+    for r in rows:
+        value = int(r["dhash"], 16)
+        for _, other in tree.search(value, max_distance):
+            a, b = _find(r["id"]), _find(other)
+            if a != b:
+                # Keep the earliest import as the root.
+                if order[a] < order[b]:
+                    parent[b] = a
+                else:
+                    parent[a] = b
+        tree.add(value, r["id"])
+
+    clusters: dict[str, list[str]] = {}
+    for r in rows:
+        clusters.setdefault(_find(r["id"]), []).append(r["id"])
+    return [ids for ids in clusters.values() if len(ids) > 1]
+
+
+def mark_duplicates(db: Db, *, max_distance: int = DUPLICATE_MAX_DISTANCE) -> dict[str, Any]:
+    """Recompute duplicate_of for the whole library from the stored hashes."""
+    clusters = find_duplicate_clusters(db, max_distance=max_distance)
+    db.exec("update assets set duplicate_of=null where duplicate_of is not null")
+    db.executemany(
+        "update assets set duplicate_of=? where id=?",
+        [(ids[0], other) for ids in clusters for other in ids[1:]],
+    )
+    return {
+        "max_distance": max_distance,
+        "clusters": len(clusters),
+        "duplicates": sum(len(ids) - 1 for ids in clusters),
+    }
+
+
+def backfill_dhashes(db: Db, *, limit: int = 0, max_distance: int = DUPLICATE_MAX_DISTANCE) -> dict[str, Any]:
+    """Hash existing thumbnails that predate perceptual hashing."""
+    rows = db.query(
+        """
+        select id, thumb_path from assets
+        where (dhash is null or dhash = '') and thumb_path is not null and thumb_path != ''
+        order by imported_at asc
+        """
+    )
+    tree = load_hash_tree(db)
+    attempted = 0
+    hashed = 0
+    errors: list[dict[str, str]] = []
+    for r in rows:
+        if limit and attempted >= limit:
+            break
+        attempted += 1
+        dhash = compute_dhash(Path(r["thumb_path"]))
+        if dhash is None:
+            errors.append({"id": r["id"], "error": "Could not hash thumbnail (install Pillow or ImageMagick)"})
+            continue
+        record_dhash(db, tree, asset_id=r["id"], dhash=dhash, max_distance=max_distance)
+        hashed += 1
+    return {
+        "attempted": attempted,
+        "hashed": hashed,
+        "errors": errors[:25],
+        "note": "Errors are truncated to 25 in output.",
+    }
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import heapq
+import json
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+from .db import Db
+from .vectors import np, pack_vector, query_vector, unpack_vector
+
+
+class VectorGroup:
+    """All vectors of one dimensionality: an id list plus a row-aligned matrix."""
+
+    def __init__(self, dims: int, capacity: int):
+        self.dims = dims
+        self.ids: list[str] = []
+        self._positions: dict[str, int] | None = None
+        if np is not None:
+            self.matrix: Any = np.empty((capacity, dims), dtype="float32")
+        else:
+            self.matrix = []
+
+    def add(self, asset_id: str, blob: bytes) -> None:
+        if np is not None:
+            self.matrix[len(self.ids)] = unpack_vector(blob)
+        else:
+            self.matrix.append(unpack_vector(blob))
+        self.ids.append(asset_id)
+
+    def finish(self) -> None:
+        if np is not None:
+            self.matrix = self.matrix[: len(self.ids)]
+
+    def positions(self) -> dict[str, int]:
+        if self._positions is None:
+            self._positions = {asset_id: i for i, asset_id in enumerate(self.ids)}
+        return self._positions
+
+    def positions_of(self, asset_ids: Iterable[str]) -> list[int]:
+        positions = self.positions()
+        return sorted(positions[a] for a in asset_ids if a in positions)
+
+    def scores(self, query: Any, at: list[int] | None = None) -> Any:
+        """Scores for every vector, or only for positions `at` (-inf elsewhere)."""
+        if at is None:
+            if np is not None:
+                return self.matrix @ query
+            return [sum(x * y for x, y in zip(row, query)) for row in self.matrix]
+        if np is not None:
+            out = np.full(len(self.ids), -np.inf, dtype="float32")
+            if at:
+                idx = np.asarray(at)
+                out[idx] = self.matrix[idx] @ query
+            return out
+        out = [float("-inf")] * len(self.ids)
+        for i in at:
+            out[i] = sum(x * y for x, y in zip(self.matrix[i], query))
+        return out
+
+    def centroid(self, at: list[int]) -> Any:
+        """Unit-length mean of the vectors at positions `at`, usable as a query."""
+        if np is not None:
+            return query_vector(self.matrix[np.asarray(at)].sum(axis=0))
+        return query_vector([sum(col) for col in zip(*(self.matrix[i] for i in at))])
+
+    def mask(self, asset_ids: Iterable[str]) -> Any:
+        return self.mask_at(self.positions_of(asset_ids))
+
+    def mask_at(self, hits: list[int]) -> Any:
+        if np is not None:
+            allowed = np.zeros(len(self.ids), dtype=bool)
+            allowed[hits] = True
+            return allowed
+        return set(hits)
+
+
+class EmbeddingIndex:
+    def __init__(self, *, provider: str, model: str, version: int, groups: dict[int, VectorGroup]):
+        self.provider = provider
+        self.model = model
+        self.version = version
+        self.groups = groups
+
+    @property
+    def size(self) -> int:
+        return sum(len(g.ids) for g in self.groups.values())
+
+    def group(self, dims: int) -> VectorGroup | None:
+        return self.groups.get(dims)
+
+
+def top_indices(scores: Any, k: int, allowed: Any = None) -> list[int]:
+    """Positions of the k highest scores (restricted to `allowed`), best first."""
+    if np is not None:
+        scores = np.asarray(scores)
+        if allowed is not None:
+            scores = np.where(allowed, scores, -np.inf)
+            k = min(k, int(allowed.sum()))
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        part = np.argpartition(-scores, k - 1)[:k]
+        return [int(i) for i in part[np.argsort(-scores[part], kind="stable")]]
+    candidates = range(len(scores)) if allowed is None else allowed
+    return heapq.nlargest(k, candidates, key=scores.__getitem__)
+
+
+def indices_at_least(scores: Any, threshold: float, allowed: Any = None) -> list[int]:
+    if np is not None:
+        hits = np.asarray(scores) >= threshold
+        if allowed is not None:
+            hits &= allowed
+        return [int(i) for i in np.nonzero(hits)[0]]
+    candidates = range(len(scores)) if allowed is None else allowed
+    return [i for i in candidates if scores[i] >= threshold]
+
+
+def embeddings_version(db: Db, *, provider: str, model: str) -> int:
+    value = db.query_value(
+        "select version from embedding_versions where provider=? and model=?",
+        (provider, model),
+    )
+    return int(value or 0)
+
+
+def build_embedding_index(db: Db, *, provider: str, model: str) -> EmbeddingIndex:
+    version = embeddings_version(db, provider=provider, model=model)
+    groups: dict[int, VectorGroup] = {}
+    for r in db.query(
+        """
+        select dimensions, count(*) as n from asset_embeddings
+        where provider=? and model=? group by dimensions
+        """,
+        (provider, model),
+    ):
+        groups[int(r["dimensions"])] = VectorGroup(int(r["dimensions"]), int(r["n"]))
+    cur = db.conn.execute(
+        "select asset_id, dimensions, vector_f32, vector_json from asset_embeddings where provider=? and model=?",
+        (provider, model),
+    )
+    for r in cur:
+        group = groups.get(int(r["dimensions"]))
+        blob = r["vector_f32"]
+        if not blob:
+            # Rows written by older tools may still carry only vector_json.
+            try:
+                blob = pack_vector([float(x) for x in json.loads(r["vector_json"] or "[]")])
+            except (ValueError, TypeError):
+                continue
+        if group is None or len(blob) != group.dims * 4:
+            continue
+        group.add(r["asset_id"], blob)
+    for group in groups.values():
+        group.finish()
+    return EmbeddingIndex(provider=provider, model=model, version=version, groups=groups)
+
+
+_CACHE: dict[tuple[str, str, str], EmbeddingIndex] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_embedding_index(db: Db, *, provider: str, model: str) -> EmbeddingIndex:
+    """
+    Process-wide index for (provider, model), rebuilt when embedding writes bump
+    embedding_versions (from this or any other process).
+    """
+    key = (str(Path(db.path).resolve()), provider, model)
+    version = embeddings_version(db, provider=provider, model=model)
+    with _CACHE_LOCK:
+        index = _CACHE.get(key)
+        if index is not None and index.version == version:
+            return index
+        index = build_embedding_index(db, provider=provider, model=model)
+        _CACHE[key] = index
+        return index
+
+
+def clear_embedding_index_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
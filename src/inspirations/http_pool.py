@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import http.client
+import socket
+import threading
+import time
+import urllib.error
+from collections import deque
+from typing import Any, Mapping
+from urllib.parse import urljoin, urlparse
+
+from .security import is_allowlisted_host, is_public_ip, is_safe_public_url, public_addresses
+
+
+POOL_MAX_IDLE_PER_HOST = 4
+POOL_MAX_IDLE = 32
+POOL_IDLE_TIMEOUT_S = 30.0
+MAX_REDIRECTS = 5
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Small redirect/error bodies are drained so the connection can be reused; larger ones close it.
+_DRAIN_BYTES = 64 * 1024
+# Errors that mean a reused keep-alive socket was closed by the server while idle.
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+
+def _connect_any(addresses: list[str], port: int, timeout: float | None) -> socket.socket:
+    last: Exception | None = None
+    for ip in addresses:
+        try:
+            sock = socket.create_connection((ip, port), timeout)
+        except OSError as e:
+            last = e
+            continue
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+    raise last or OSError("No addresses to connect to")
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """Connects to pre-validated addresses instead of resolving the host again."""
+
+    def __init__(self, host: str, port: int, *, addresses: list[str], timeout: float):
+        super().__init__(host, port, timeout=timeout)
+        self.addresses = addresses
+
+    def connect(self) -> None:
+        self.sock = _connect_any(self.addresses, self.port, self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """Like _PinnedHTTPConnection; SNI and certificate checks still use the host name."""
+
+    def __init__(self, host: str, port: int, *, addresses: list[str], timeout: float):
+        super().__init__(host, port, timeout=timeout)
+        self.addresses = addresses
+
+    def connect(self) -> None:
+        sock = _connect_any(self.addresses, self.port, self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def _check_peer(conn: http.client.HTTPConnection, host: str) -> None:
+    """Refuse a connection whose actual peer is not a public address (SSRF guard)."""
+    if is_allowlisted_host(host):
+        return
+    peer = conn.sock.getpeername()[0] if conn.sock is not None else ""
+    if not peer or not is_public_ip(peer):
+        conn.close()
+        raise ValueError(f"Refusing to talk to non-public address {peer or '?'} for {host}")
+
+
+class PooledResponse:
+    """An http.client response that hands its connection back to the pool once fully read."""
+
+    def __init__(self, pool: HttpPool, key: tuple[str, str, int], conn: http.client.HTTPConnection, resp: http.client.HTTPResponse, url: str):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+    def read(self, n: int = -1) -> bytes:
+        return self._resp.read() if n is None or n < 0 else self._resp.read(n)
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        resp = self._resp
+        drained = True
+        # A small known-length remainder is cheaper to read off than a new handshake.
+        if not resp.isclosed() and not resp.will_close and resp.length is not None and resp.length <= _DRAIN_BYTES:
+            try:
+                resp.read()
+            except (OSError, http.client.HTTPException):
+                drained = False
+        # Only a fully consumed response leaves the socket at a request boundary.
+        if drained and resp.isclosed() and not resp.will_close:
+            self._pool._release(self._key, conn)
+        else:
+            resp.close()
+            conn.close()
+
+    def __enter__(self) -> PooledResponse:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
+
+
+class HttpPool:
+    """
+    Keep-alive connections per (scheme, host, port), so repeated fetches from the same
+    CDN skip the TCP and TLS handshakes. Idle connections are capped per host and in
+    total and are dropped after POOL_IDLE_TIMEOUT_S.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_idle_per_host: int = POOL_MAX_IDLE_PER_HOST,
+        max_idle: int = POOL_MAX_IDLE,
+        idle_timeout_s: float = POOL_IDLE_TIMEOUT_S,
+    ):
+        self.max_idle_per_host = max_idle_per_host
+        self.max_idle = max_idle
+        self.idle_timeout_s = idle_timeout_s
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[str, str, int], deque[tuple[float, http.client.HTTPConnection]]] = {}
+        self.opened = 0
+        self.reused = 0
+
+    def _idle_count(self) -> int:
+        return sum(len(q) for q in self._idle.values())
+
+    def _acquire(self, key: tuple[str, str, int], timeout_s: float) -> tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        with self._lock:
+            q = self._idle.get(key)
+            while q:
+                idle_since, conn = q.pop()
+                if now - idle_since <= self.idle_timeout_s and conn.sock is not None:
+                    self.reused += 1
+                    conn.sock.settimeout(timeout_s)
+                    return conn, True
+                conn.close()
+            self.opened += 1
+        scheme, host, port = key
+        cls = _PinnedHTTPSConnection if scheme == "https" else _PinnedHTTPConnection
+        conn = cls(host, port, addresses=public_addresses(host), timeout=timeout_s)
+        conn.connect()
+        _check_peer(conn, host)
+        return conn, False
+
+    def _release(self, key: tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            q = self._idle.setdefault(key, deque())
+            if len(q) >= self.max_idle_per_host or self._idle_count() >= self.max_idle:
+                conn.close()
+                return
+            q.append((time.monotonic(), conn))
+
+    def _request(self, url: str, headers: Mapping[str, str], timeout_s: float) -> PooledResponse:
+        p = urlparse(url)
+        key = (p.scheme, (p.hostname or "").lower(), p.port or (443 if p.scheme == "https" else 80))
+        path = p.path or "/"
+        if p.query:
+            path += "?" + p.query
+        while True:
+            conn, reused = self._acquire(key, timeout_s)
+            try:
+                conn.request("GET", path, headers=dict(headers))
+                resp = conn.getresponse()
+            except _STALE_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            return PooledResponse(self, key, conn, resp, url)
+
+    def open(self, url: str, *, headers: Mapping[str, str] | None = None, timeout_s: float = 30.0, allow_http: bool = False) -> PooledResponse:
+        """
+        GET a URL, following up to MAX_REDIRECTS redirects. Every hop must pass
+        is_safe_public_url; HTTP errors raise urllib.error.HTTPError like urlopen.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            if not is_safe_public_url(url, allow_http=allow_http):
+                raise ValueError(f"Refusing to fetch non-public or non-https url: {url}")
+            resp = self._request(url, headers or {}, timeout_s)
+            if resp.status in _REDIRECT_STATUSES and resp.headers.get("Location"):
+                location = urljoin(url, resp.headers["Location"])
+                resp.read(_DRAIN_BYTES)
+                resp.close()
+                url = location
+                continue
+            if resp.status >= 400:
+                resp.read(_DRAIN_BYTES)
+                resp.close()
+                raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            return resp
+        raise ValueError(f"Too many redirects: {url}")
+
+    def clear(self) -> None:
+        with self._lock:
+            for q in self._idle.values():
+                for _, conn in q:
+                    conn.close()
+            self._idle.clear()
+
+
+_POOL = HttpPool()
+
+
+def open_url(url: str, *, headers: Mapping[str, str] | None = None, timeout_s: float = 30.0) -> PooledResponse:
+    """Fetch through the shared process-wide pool."""
+    return _POOL.open(url, headers=headers, timeout_s=timeout_s)
+
+
+def clear_http_pool() -> None:
+    _POOL.clear()
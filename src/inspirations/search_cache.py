@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Hashable, Sequence
+
+from .db import Db
+from .vectors import pack_vector, unpack_vector
+
+
+QUERY_EMBEDDING_CACHE_ROWS = 5000
+QUERY_EMBEDDING_MEMORY_ENTRIES = 1024
+RESULT_CACHE_ENTRIES = 256
+
+
+class LruCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_QUERY_VECTORS = LruCache(QUERY_EMBEDDING_MEMORY_ENTRIES)
+_RESULTS = LruCache(RESULT_CACHE_ENTRIES)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _db_key(db: Db) -> str:
+    return str(Path(db.path).resolve())
+
+
+def normalize_query(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def cached_query_embedding(
+    db: Db,
+    *,
+    model: str,
+    task_type: str,
+    text: str,
+    embed: Callable[[], Sequence[float]],
+) -> list[float]:
+    """
+    Query vectors from the in-memory LRU, then the query_embedding_cache table, and
+    only then from `embed()`. The table keeps the QUERY_EMBEDDING_CACHE_ROWS most
+    recently used entries.
+    """
+    query_norm = normalize_query(text)
+    key = (_db_key(db), model, task_type, query_norm)
+    vector = _QUERY_VECTORS.get(key)
+    if vector is not None:
+        return vector
+    row = db.query(
+        "select vector_f32 from query_embedding_cache where model=? and task_type=? and query_norm=?",
+        (model, task_type, query_norm),
+    )
+    now = _now_iso()
+    if row:
+        vector = [float(x) for x in unpack_vector(row[0]["vector_f32"])]
+        db.exec(
+            "update query_embedding_cache set last_used_at=? where model=? and task_type=? and query_norm=?",
+            (now, model, task_type, query_norm),
+        )
+    else:
+        blob = pack_vector(embed())
+        vector = [float(x) for x in unpack_vector(blob)]
+        db.exec(
+            """
+            insert into query_embedding_cache (model, task_type, query_norm, vector_f32, dimensions, created_at, last_used_at)
+            values (?, ?, ?, ?, ?, ?, ?)
+            on conflict(model, task_type, query_norm) do update set
+              vector_f32=excluded.vector_f32,
+              dimensions=excluded.dimensions,
+              last_used_at=excluded.last_used_at
+            """,
+            (model, task_type, query_norm, blob, len(vector), now, now),
+        )
+        db.exec(
+            """
+            delete from query_embedding_cache where rowid in (
+              select rowid from query_embedding_cache order by last_used_at desc limit -1 offset ?
+            )
+            """,
+            (QUERY_EMBEDDING_CACHE_ROWS,),
+        )
+    _QUERY_VECTORS.put(key, vector)
+    return vector
+
+
+def library_version(db: Db) -> int:
+    return int(db.query_value("select version from data_versions where name='library'") or 0)
+
+
+def get_cached_results(db: Db, key: tuple[Any, ...]) -> Any:
+    return _RESULTS.get((_db_key(db),) + key)
+
+
+def put_cached_results(db: Db, key: tuple[Any, ...], value: Any) -> None:
+    _RESULTS.put((_db_key(db),) + key, value)
+
+
+def clear_search_caches() -> None:
+    _QUERY_VECTORS.clear()
+    _RESULTS.clear()
@@ -2,9 +2,16 @@ from __future__ import annotations
 
 import ipaddress
 import socket
+import threading
+import time
 from urllib.parse import urlparse
 
 
+DNS_CACHE_TTL_S = 300.0
+# Failed lookups are remembered briefly so a dead host is not re-resolved for every asset.
+DNS_NEGATIVE_TTL_S = 30.0
+
+
 ALLOWLIST_HOSTS = {
     "i.pinimg.com",
     "s.pinimg.com",
@@ -13,7 +20,7 @@ ALLOWLIST_HOSTS = {
 }
 
 
-def _is_allowlisted(host: str) -> bool:
+def is_allowlisted_host(host: str) -> bool:
     host = host.lower().strip(".")
     if host in ALLOWLIST_HOSTS:
         return True
@@ -31,6 +38,62 @@ def resolve_host(host: str) -> list[str]:
     return addrs
 
 
+_DNS_CACHE: dict[str, tuple[float, list[str]]] = {}
+_DNS_LOCK = threading.Lock()
+_DNS_HOST_LOCKS: dict[str, threading.Lock] = {}
+
+
+def cached_resolve_host(host: str) -> list[str]:
+    """
+    resolve_host with a process-wide TTL cache shared across threads. Concurrent
+    misses for the same host wait for a single lookup. Failures cache as [].
+    """
+    host = host.lower().strip(".")
+    now = time.monotonic()
+    with _DNS_LOCK:
+        hit = _DNS_CACHE.get(host)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        host_lock = _DNS_HOST_LOCKS.setdefault(host, threading.Lock())
+    with host_lock:
+        with _DNS_LOCK:
+            hit = _DNS_CACHE.get(host)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+        try:
+            ips = list(dict.fromkeys(resolve_host(host)))
+        except Exception:
+            ips = []
+        ttl = DNS_CACHE_TTL_S if ips else DNS_NEGATIVE_TTL_S
+        with _DNS_LOCK:
+            _DNS_CACHE[host] = (time.monotonic() + ttl, ips)
+        return ips
+
+
+def clear_dns_cache() -> None:
+    with _DNS_LOCK:
+        _DNS_CACHE.clear()
+        _DNS_HOST_LOCKS.clear()
+
+
+def public_addresses(host: str) -> list[str]:
+    """
+    Addresses to connect to for host: the cached resolution, which must be all
+    public unless the host is allowlisted. Connecting to exactly these addresses
+    means the IP that was validated is the IP that is used.
+    """
+    try:
+        ipaddress.ip_address(host)
+        ips = [host]
+    except ValueError:
+        ips = cached_resolve_host(host)
+    if not ips:
+        raise ValueError(f"Could not resolve host: {host}")
+    if not is_allowlisted_host(host) and not all(is_public_ip(ip) for ip in ips):
+        raise ValueError(f"Refusing non-public address for host: {host}")
+    return ips
+
+
 def is_public_ip(ip: str) -> bool:
     addr = ipaddress.ip_address(ip)
     if addr.is_private:
@@ -71,7 +134,7 @@ def is_safe_public_url(url: str, *, allow_http: bool = False) -> bool:
         return False
 
     # Allowlist shortcut for known public CDNs (useful in offline environments).
-    if _is_allowlisted(host):
+    if is_allowlisted_host(host):
         return True
 
     # If host is an IP literal, validate directly; otherwise DNS resolve.
@@ -79,10 +142,7 @@ def is_safe_public_url(url: str, *, allow_http: bool = False) -> bool:
         ipaddress.ip_address(host)
         ips = [host]
     except ValueError:
-        try:
-            ips = resolve_host(host)
-        except Exception:
-            return False
+        ips = cached_resolve_host(host)
 
     if not ips:
         return False
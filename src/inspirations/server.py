@@ -12,16 +12,20 @@ from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 
-from .ai import DEFAULT_GEMINI_EMBEDDING_MODEL, run_similarity_search
-from .db import Db, ensure_schema
+from .ai import DEFAULT_GEMINI_EMBEDDING_MODEL, run_similar_assets, run_similarity_search
+from .ann import ANN_INDEXES, DEFAULT_IVF_NPROBE
+from .db import DEFAULT_BUSY_TIMEOUT_MS, ConnectionPool, Db, ensure_schema
 from .store import (
+    ASSET_FIELDS,
     add_items_to_collection,
+    asset_card,
     create_annotation,
     create_collection,
     delete_annotation,
     delete_assets,
+    get_asset,
     list_annotations,
-    list_assets,
+    list_assets_page,
     list_collection_items,
     list_collections,
     delete_collection,
@@ -59,6 +63,40 @@ def _send(handler: BaseHTTPRequestHandler, status: int, payload: dict) -> None:
     handler.wfile.write(data)
 
 
+def _similar_options(q: dict[str, list[str]]) -> dict:
+    """Ranking and filter params shared by the similarity endpoints; raises ValueError."""
+    index = (q.get("index", ["exact"])[0] or "exact").strip()
+    if index not in ANN_INDEXES:
+        raise ValueError("index must be one of: " + ", ".join(ANN_INDEXES))
+    try:
+        nprobe = int((q.get("nprobe", [str(DEFAULT_IVF_NPROBE)])[0] or str(DEFAULT_IVF_NPROBE)).strip())
+    except ValueError:
+        raise ValueError("nprobe must be integer") from None
+    try:
+        limit = max(1, min(500, int((q.get("limit", ["25"])[0] or "25").strip())))
+    except ValueError:
+        raise ValueError("limit must be integer") from None
+    try:
+        offset = max(0, int((q.get("offset", ["0"])[0] or "0").strip()))
+    except ValueError:
+        raise ValueError("offset must be integer") from None
+    try:
+        min_score = float((q.get("min_score", ["0.0"])[0] or "0.0").strip())
+    except ValueError:
+        raise ValueError("min_score must be number") from None
+    return {
+        "model": (q.get("model", [""])[0] or "").strip() or DEFAULT_GEMINI_EMBEDDING_MODEL,
+        "source": (q.get("source", [""])[0] or "").strip(),
+        "board": (q.get("board", [""])[0] or "").strip(),
+        "label": (q.get("label", [""])[0] or "").strip(),
+        "limit": limit,
+        "offset": offset,
+        "min_score": min_score,
+        "index": index,
+        "nprobe": nprobe,
+    }
+
+
 class ApiHandler(BaseHTTPRequestHandler):
     server_version = "Inspirations/0.1"
 
@@ -78,17 +116,59 @@ class ApiHandler(BaseHTTPRequestHandler):
 
         if parsed.path == "/api/assets":
             q = parse_qs(parsed.query)
-            assets = self._with_db(
-                list_assets,
-                q=q.get("q", [""])[0],
-                source=q.get("source", [""])[0],
-                board=q.get("board", [""])[0],
-                label=q.get("label", [""])[0],
-                collection_id=q.get("collection_id", [""])[0],
-                limit=int(q.get("limit", ["200"])[0]),
-                offset=int(q.get("offset", ["0"])[0]),
-            )
-            return _send(self, 200, {"assets": assets})
+            try:
+                limit = int(q.get("limit", ["200"])[0])
+                offset = int(q.get("offset", ["0"])[0])
+            except ValueError:
+                return _send(self, 400, {"error": "limit and offset must be integers"})
+            try:
+                page = self._with_db(
+                    list_assets_page,
+                    q=q.get("q", [""])[0],
+                    source=q.get("source", [""])[0],
+                    board=q.get("board", [""])[0],
+                    label=q.get("label", [""])[0],
+                    collection_id=q.get("collection_id", [""])[0],
+                    hide_duplicates=q.get("hide_duplicates", [""])[0] in ("1", "true"),
+                    limit=limit,
+                    offset=offset,
+                    cursor=q.get("cursor", [""])[0],
+                    fields=q.get("fields", ["full"])[0] or "full",
+                )
+            except ValueError as e:
+                return _send(self, 400, {"error": str(e)})
+            return _send(self, 200, page)
+
+        m = re.match(r"^/api/(?:assets/([^/]+)|collections/([^/]+)|(tray))/similar$", parsed.path)
+        if m:
+            q = parse_qs(parsed.query)
+            fields = (q.get("fields", ["full"])[0] or "full").strip()
+            if fields not in ASSET_FIELDS:
+                return _send(self, 400, {"error": "fields must be one of: " + ", ".join(ASSET_FIELDS)})
+            if m.group(1) and not self._with_db(get_asset, asset_id=m.group(1)):
+                return _send(self, 404, {"error": "asset not found"})
+            try:
+                report = self._with_db(
+                    run_similar_assets,
+                    asset_id=m.group(1) or "",
+                    collection_id=m.group(2) or "",
+                    tray=bool(m.group(3)),
+                    **_similar_options(q),
+                )
+            except ValueError as e:
+                return _send(self, 400, {"error": str(e)})
+            except RuntimeError as e:
+                return _send(self, 503, {"error": str(e)})
+            if fields == "card":
+                report = {**report, "results": [asset_card(r) for r in report.get("results", [])]}
+            return _send(self, 200, report)
+
+        m = re.match(r"^/api/assets/([^/]+)$", parsed.path)
+        if m:
+            asset = self._with_db(get_asset, asset_id=m.group(1))
+            if not asset:
+                return _send(self, 404, {"error": "asset not found"})
+            return _send(self, 200, {"asset": asset})
 
         if parsed.path == "/api/search/similar":
             q = parse_qs(parsed.query)
@@ -98,40 +178,38 @@ class ApiHandler(BaseHTTPRequestHandler):
             api_key = (os.environ.get("GEMINI_API_KEY") or "").strip()
             if not api_key:
                 return _send(self, 503, {"error": "GEMINI_API_KEY is required for semantic search"})
-            source = (q.get("source", [""])[0] or "").strip()
-            model = (q.get("model", [""])[0] or "").strip() or DEFAULT_GEMINI_EMBEDDING_MODEL
-            limit_raw = (q.get("limit", ["25"])[0] or "25").strip()
-            semantic_weight_raw = (q.get("semantic_weight", ["0.85"])[0] or "0.85").strip()
-            lexical_weight_raw = (q.get("lexical_weight", ["0.15"])[0] or "0.15").strip()
-            min_score_raw = (q.get("min_score", ["0.0"])[0] or "0.0").strip()
+            fields = (q.get("fields", ["full"])[0] or "full").strip()
+            if fields not in ASSET_FIELDS:
+                return _send(self, 400, {"error": "fields must be one of: " + ", ".join(ASSET_FIELDS)})
             try:
-                limit = max(1, min(500, int(limit_raw)))
-            except ValueError:
-                return _send(self, 400, {"error": "limit must be integer"})
+                options = _similar_options(q)
+            except ValueError as e:
+                return _send(self, 400, {"error": str(e)})
             try:
-                semantic_weight = float(semantic_weight_raw)
+                semantic_weight = float((q.get("semantic_weight", ["0.85"])[0] or "0.85").strip())
             except ValueError:
                 return _send(self, 400, {"error": "semantic_weight must be number"})
             try:
-                lexical_weight = float(lexical_weight_raw)
+                lexical_weight = float((q.get("lexical_weight", ["0.15"])[0] or "0.15").strip())
             except ValueError:
                 return _send(self, 400, {"error": "lexical_weight must be number"})
+
             try:
-                min_score = float(min_score_raw)
-            except ValueError:
-                return _send(self, 400, {"error": "min_score must be number"})
-
-            report = self._with_db(
-                run_similarity_search,
-                api_key=api_key,
-                query=query_text,
-                model=model,
-                source=source,
-                limit=limit,
-                semantic_weight=semantic_weight,
-                lexical_weight=lexical_weight,
-                min_score=min_score,
-            )
+                report = self._with_db(
+                    run_similarity_search,
+                    api_key=api_key,
+                    query=query_text,
+                    collection_id=(q.get("collection_id", [""])[0] or "").strip(),
+                    semantic_weight=semantic_weight,
+                    lexical_weight=lexical_weight,
+                    **options,
+                )
+            except ValueError as e:
+                return _send(self, 400, {"error": str(e)})
+            except RuntimeError as e:
+                return _send(self, 503, {"error": str(e)})
+            if fields == "card":
+                report = {**report, "results": [asset_card(r) for r in report.get("results", [])]}
             return _send(self, 200, report)
 
         if parsed.path == "/api/collections":
@@ -368,8 +446,6 @@ class ApiHandler(BaseHTTPRequestHandler):
 
     def _backup_primary_db(self) -> str:
         db_path = Path(self.server.db_path).resolve()
-        with Db(db_path) as db:
-            ensure_schema(db)
         backups_dir = db_path.parent / "backups"
         backups_dir.mkdir(parents=True, exist_ok=True)
         stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%SZ")
@@ -411,9 +487,17 @@ class ApiHandler(BaseHTTPRequestHandler):
                 continue
         return deleted
 
+    def _db(self) -> Db:
+        pool = getattr(self.server, "db_pool", None)
+        if pool is None:
+            pool = ConnectionPool(self.server.db_path)
+            with Db(self.server.db_path, pool=pool) as db:
+                ensure_schema(db)
+            self.server.db_pool = pool
+        return Db(self.server.db_path, pool=pool)
+
     def _with_db(self, fn, **kwargs):
-        with Db(self.server.db_path) as db:
-            ensure_schema(db)
+        with self._db() as db:
             return fn(db, **kwargs)
 
     def _serve_file(self, rel: str, mime: str) -> None:
@@ -434,10 +518,9 @@ class ApiHandler(BaseHTTPRequestHandler):
 
     def _serve_media(self, asset_id: str, kind: str) -> None:
         kind = kind if kind in ("thumb", "original") else "thumb"
-        with Db(self.server.db_path) as db:
-            ensure_schema(db)
+        with self._db() as db:
             row = db.query(
-                "select id, stored_path, thumb_path from assets where id=?",
+                "select id, stored_path, thumb_path, sha256 from assets where id=?",
                 (asset_id,),
             )
             if not row:
@@ -454,10 +537,20 @@ class ApiHandler(BaseHTTPRequestHandler):
                 return self.send_error(403)
             if not target.exists() or not target.is_file():
                 return self.send_error(404)
+            # Assets with identical bytes share one file; the content hash lets the
+            # browser revalidate instead of downloading it again.
+            stat = target.stat()
+            etag = f'"{r["sha256"] or r["id"]}-{kind}-{stat.st_size}-{stat.st_mtime_ns}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
             data = target.read_bytes()
             self.send_response(200)
             self.send_header("Content-Type", _guess_mime(str(target)))
             self.send_header("Content-Length", str(len(data)))
+            self.send_header("ETag", etag)
             self.end_headers()
             self.wfile.write(data)
 
@@ -478,11 +571,25 @@ def _guess_mime(path: str) -> str:
     return "application/octet-stream"
 
 
-def run_server(*, host: str, port: int, db_path: Path, app_dir: Path, store_dir: Path) -> None:
+def run_server(
+    *,
+    host: str,
+    port: int,
+    db_path: Path,
+    app_dir: Path,
+    store_dir: Path,
+    busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+) -> None:
     server = HTTPServer((host, port), ApiHandler)
     server.db_path = db_path
+    server.db_pool = ConnectionPool(db_path, busy_timeout_ms=busy_timeout_ms)
+    with Db(db_path, pool=server.db_pool) as db:
+        ensure_schema(db)
     server.app_dir = app_dir
     server.store_dir = store_dir
     server.admin_tokens = {}
     print(f"Serving on http://{host}:{port}")
-    server.serve_forever()
+    try:
+        server.serve_forever()
+    finally:
+        server.db_pool.close()
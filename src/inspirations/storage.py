@@ -1,19 +1,47 @@
 from __future__ import annotations
 
+import codecs
 import hashlib
+import http.client
 import html as html_lib
+import json
 import os
 import re
-import urllib.request
-from dataclasses import dataclass
+import threading
+import time
+import urllib.error
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, fields as fields_of, replace
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 from urllib.parse import urlparse, urljoin, parse_qs
 
 from .db import Db
+from .http_pool import open_url
 from .security import is_safe_public_url
 
 
+DOWNLOAD_WORKERS = 16
+DOWNLOAD_PER_HOST = 4
+DOWNLOAD_HOST_INTERVAL_S = 0.05
+DOWNLOAD_WRITE_BATCH = 50
+# download_attempts: a failed URL waits base * 2^(failures-1), capped, before it is retried.
+DOWNLOAD_BACKOFF_BASE_S = 600
+DOWNLOAD_BACKOFF_MAX_S = 7 * 24 * 3600
+# Consecutive transient failures (timeouts, resets, 5xx, 429) before a host is skipped.
+DOWNLOAD_BREAKER_THRESHOLD = 5
+DOWNLOAD_BREAKER_COOLDOWN_S = 60.0
+# url_previews: how long a resolved preview is trusted without revalidation, and when
+# pages with no preview, missing pages, and other failures are retried.
+PREVIEW_FRESH_S = 24 * 3600
+PREVIEW_NONE_RETRY_S = 7 * 24 * 3600
+PREVIEW_GONE_RETRY_S = 7 * 24 * 3600
+PREVIEW_ERROR_RETRY_S = 3600
+_HTML_CHUNK_BYTES = 16 * 1024
+
+
 @dataclass(frozen=True)
 class DownloadResult:
     asset_id: str
@@ -66,47 +94,83 @@ def _extract_preview_image(html: str) -> str | None:
     return candidates[0] if candidates else None
 
 
-def _extract_preview_image_candidates(html: str) -> list[str]:
-    # Small HTML parser for preview image tags plus a best-effort <img> fallback.
-    meta_patterns = [
-        r'<meta[^>]+property=["\']og:image:secure_url["\'][^>]+content=["\']([^"\']+)["\']',
-        r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:image:secure_url["\']',
-        r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']',
-        r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:image["\']',
-        r'<meta[^>]+name=["\']twitter:image:src["\'][^>]+content=["\']([^"\']+)["\']',
-        r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+name=["\']twitter:image:src["\']',
-        r'<meta[^>]+name=["\']twitter:image["\'][^>]+content=["\']([^"\']+)["\']',
-        r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+name=["\']twitter:image["\']',
-        r'<meta[^>]+itemprop=["\']image["\'][^>]+content=["\']([^"\']+)["\']',
-        r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+itemprop=["\']image["\']',
-        r'<link[^>]+rel=["\']image_src["\'][^>]+href=["\']([^"\']+)["\']',
-        r'<link[^>]+href=["\']([^"\']+)["\'][^>]+rel=["\']image_src["\']',
-    ]
-    candidates: list[str] = []
-    seen: set[str] = set()
-    for pat in meta_patterns:
-        for m in re.finditer(pat, html, re.IGNORECASE):
-            val = html_lib.unescape((m.group(1) or "").strip())
-            if not val or val in seen:
-                continue
-            seen.add(val)
-            candidates.append(val)
-    if candidates:
-        return candidates
-
-    image_patterns = [
-        r'<img[^>]+src=["\']([^"\']+)["\']',
-        r'<img[^>]+data-src=["\']([^"\']+)["\']',
-        r'<img[^>]+data-original=["\']([^"\']+)["\']',
-    ]
-    for pat in image_patterns:
-        for m in re.finditer(pat, html, re.IGNORECASE):
-            val = html_lib.unescape((m.group(1) or "").strip())
-            if not val or val.startswith("data:") or val in seen:
+# One pass over the markup: only <meta>, <link> and <img> tags plus the end of <head>.
+_PREVIEW_TAG_RE = re.compile(r"<(meta|link|img)\b([^>]*)>|</head\s*>|<body\b", re.IGNORECASE)
+_ATTR_RE = re.compile(r"""([^\s=/>"']+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+# Lower rank wins; <meta>/<link> previews (ranks 0-5) always beat <img> fallbacks.
+_META_RANKS = {
+    ("property", "og:image:secure_url"): 0,
+    ("property", "og:image"): 1,
+    ("name", "twitter:image:src"): 2,
+    ("name", "twitter:image"): 3,
+    ("itemprop", "image"): 4,
+}
+_LINK_RANK = 5
+_IMG_RANKS = {"src": 6, "data-src": 7, "data-original": 8}
+
+
+class _PreviewScanner:
+    """
+    Incremental preview-candidate collector. feed() takes decoded chunks;
+    `done` turns true once </head> (or <body>) is reached with a meta candidate.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._seen: set[str] = set()
+        self._found: list[tuple[int, int, str]] = []
+        self._has_meta = False
+        self.done = False
+
+    def _add(self, rank: int, value: str | None) -> None:
+        val = html_lib.unescape((value or "").strip())
+        if not val or val in self._seen or (rank >= _IMG_RANKS["src"] and val.startswith("data:")):
+            return
+        self._seen.add(val)
+        self._found.append((rank, len(self._found), val))
+        self._has_meta = self._has_meta or rank < _IMG_RANKS["src"]
+
+    def feed(self, text: str) -> None:
+        buf = self._buf + text
+        pos = 0
+        for m in _PREVIEW_TAG_RE.finditer(buf):
+            pos = m.end()
+            tag = (m.group(1) or "").lower()
+            if not tag:
+                if self._has_meta:
+                    self.done = True
                 continue
-            seen.add(val)
-            candidates.append(val)
-    return candidates
+            attrs: dict[str, str] = {}
+            for am in _ATTR_RE.finditer(m.group(2)):
+                attrs.setdefault(am.group(1).lower(), next(v for v in am.groups()[1:] if v is not None))
+            if tag == "meta":
+                for key in ("property", "name", "itemprop"):
+                    rank = _META_RANKS.get((key, attrs.get(key, "").strip().lower()))
+                    if rank is not None:
+                        self._add(rank, attrs.get("content"))
+                        break
+            elif tag == "link":
+                if attrs.get("rel", "").strip().lower() == "image_src":
+                    self._add(_LINK_RANK, attrs.get("href"))
+            else:
+                for key, rank in _IMG_RANKS.items():
+                    if key in attrs:
+                        self._add(rank, attrs[key])
+        # Keep an unterminated trailing tag for the next chunk.
+        tail = buf.rfind("<", pos)
+        self._buf = buf[tail:] if tail >= 0 and ">" not in buf[tail:] else ""
+
+    def candidates(self) -> list[str]:
+        found = sorted(self._found)
+        if self._has_meta:
+            found = [f for f in found if f[0] < _IMG_RANKS["src"]]
+        return [val for _, _, val in found]
+
+
+def _extract_preview_image_candidates(html: str) -> list[str]:
+    scanner = _PreviewScanner()
+    scanner.feed(html)
+    return scanner.candidates()
 
 
 def _normalize_preview_candidate(base_url: str, candidate: str) -> str | None:
@@ -165,36 +229,214 @@ def _youtube_thumb_url(url: str) -> str | None:
     return None
 
 
-def resolve_image_url(url: str, *, timeout_s: float = 20.0, max_html_bytes: int = 512 * 1024) -> str | None:
+@dataclass(frozen=True)
+class UrlPreview:
+    url: str
+    status: str  # image | preview | none | error
+    image_url: str | None = None
+    http_status: int | None = None
+    error: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: str = ""
+    retry_after: str | None = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _retry_at(now: datetime, seconds: float) -> str:
+    return (now + timedelta(seconds=seconds)).isoformat()
+
+
+def _error_retry_s(code: int | None, retry_after_header: str | None) -> float:
+    if retry_after_header and retry_after_header.strip().isdigit():
+        return max(float(retry_after_header.strip()), PREVIEW_ERROR_RETRY_S)
+    if code in (404, 410):
+        return PREVIEW_GONE_RETRY_S
+    return PREVIEW_ERROR_RETRY_S
+
+
+def _cached_preview_usable(cached: UrlPreview, now: datetime) -> bool:
+    if cached.status in ("image", "preview"):
+        return bool(cached.fetched_at) and now - datetime.fromisoformat(cached.fetched_at) < timedelta(seconds=PREVIEW_FRESH_S)
+    return bool(cached.retry_after) and datetime.fromisoformat(cached.retry_after) > now
+
+
+def fetch_url_preview(
+    url: str,
+    *,
+    cached: UrlPreview | None = None,
+    timeout_s: float = 20.0,
+    max_html_bytes: int = 512 * 1024,
+) -> UrlPreview:
+    """
+    Resolve a page URL to an image URL. A fresh positive or unexpired negative
+    `cached` result is returned as-is (no request); otherwise the page is fetched,
+    conditionally when `cached` has an ETag or Last-Modified.
+    """
+    now = _now()
+    if cached is not None and _cached_preview_usable(cached, now):
+        return cached
     if not is_safe_public_url(url, allow_http=False):
-        return None
+        return UrlPreview(
+            url=url,
+            status="error",
+            error="Refusing non-public or non-https url",
+            fetched_at=now.isoformat(),
+            retry_after=_retry_at(now, PREVIEW_ERROR_RETRY_S),
+        )
     yt = _youtube_thumb_url(url)
     if yt:
-        return yt
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        },
-    )
-    with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+        return UrlPreview(url=url, status="preview", image_url=yt, fetched_at=now.isoformat())
+    if _ext_from_url(url):
+        # A direct image link needs no probe; an unread probe body would also cost the
+        # following download its pooled keep-alive connection.
+        return UrlPreview(url=url, status="preview", image_url=url, fetched_at=now.isoformat())
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    }
+    if cached is not None and cached.status != "error":
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    try:
+        resp = open_url(url, headers=headers, timeout_s=timeout_s)
+    except urllib.error.HTTPError as e:
+        return UrlPreview(
+            url=url,
+            status="error",
+            http_status=e.code,
+            error=str(e),
+            fetched_at=now.isoformat(),
+            retry_after=_retry_at(now, _error_retry_s(e.code, e.headers.get("Retry-After") if e.headers else None)),
+        )
+    except Exception as e:
+        return UrlPreview(
+            url=url,
+            status="error",
+            error=str(e),
+            fetched_at=now.isoformat(),
+            retry_after=_retry_at(now, PREVIEW_ERROR_RETRY_S),
+        )
+    with resp:
+        http_status = getattr(resp, "status", 200)
+        if http_status == 304 and cached is not None:
+            retry = _retry_at(now, PREVIEW_NONE_RETRY_S) if cached.status == "none" else None
+            return replace(cached, http_status=304, fetched_at=now.isoformat(), retry_after=retry)
         ct = (resp.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        image_url = None
         if ct.startswith("image/"):
-            return url
-        if ct in ("text/html", "application/xhtml+xml"):
-            raw = resp.read(max_html_bytes).decode("utf-8", errors="ignore")
-            for candidate in _extract_preview_image_candidates(raw):
+            image_url = url
+        elif ct in ("text/html", "application/xhtml+xml"):
+            scanner = _PreviewScanner()
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+            remaining = max_html_bytes
+            # Stop reading (and drop the connection) as soon as the <head> yields a preview.
+            while remaining > 0 and not scanner.done:
+                chunk = resp.read(min(_HTML_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                scanner.feed(decoder.decode(chunk))
+            for candidate in scanner.candidates():
                 preview = _normalize_preview_candidate(url, candidate)
                 if not preview or _is_tracking_preview(preview):
                     continue
                 if is_safe_public_url(preview, allow_http=False):
-                    return preview
-            return None
-        # if content-type missing, try sniff from the first chunk
-        first = resp.read(64 * 1024)
-        ext = _sniff_image_ext(first)
-        return url if ext else None
+                    image_url = preview
+                    break
+        else:
+            # if content-type missing, try sniff from the first chunk
+            first = resp.read(64 * 1024)
+            image_url = url if _sniff_image_ext(first) else None
+        return UrlPreview(
+            url=url,
+            status="none" if image_url is None else "image" if image_url == url else "preview",
+            image_url=image_url,
+            http_status=http_status,
+            error=None if image_url else "No image preview found for URL",
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            fetched_at=now.isoformat(),
+            retry_after=None if image_url else _retry_at(now, PREVIEW_NONE_RETRY_S),
+        )
+
+
+def resolve_image_url(url: str, *, timeout_s: float = 20.0, max_html_bytes: int = 512 * 1024) -> str | None:
+    return fetch_url_preview(url, timeout_s=timeout_s, max_html_bytes=max_html_bytes).image_url
+
+
+def load_url_previews(db: Db, urls: list[str]) -> dict[str, UrlPreview]:
+    out: dict[str, UrlPreview] = {}
+    fields = [f.name for f in fields_of(UrlPreview)]
+    for start in range(0, len(urls), 500):
+        chunk = urls[start : start + 500]
+        rows = db.query(
+            f"select {', '.join(fields)} from url_previews where url in ({','.join('?' * len(chunk))})",
+            tuple(chunk),
+        )
+        for r in rows:
+            out[r["url"]] = UrlPreview(**{k: r[k] for k in fields})
+    return out
+
+
+def save_url_previews(db: Db, previews: list[UrlPreview]) -> None:
+    db.executemany(
+        """
+        insert into url_previews (url, status, image_url, http_status, error, etag, last_modified, fetched_at, retry_after)
+        values (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        on conflict(url) do update set
+          status=excluded.status,
+          image_url=excluded.image_url,
+          http_status=excluded.http_status,
+          error=excluded.error,
+          etag=excluded.etag,
+          last_modified=excluded.last_modified,
+          fetched_at=excluded.fetched_at,
+          retry_after=excluded.retry_after
+        """,
+        [
+            (p.url, p.status, p.image_url, p.http_status, p.error, p.etag, p.last_modified, p.fetched_at, p.retry_after)
+            for p in previews
+        ],
+    )
+
+
+def _resume_validator(headers: Any) -> str | None:
+    """A validator usable in If-Range: a strong ETag, else Last-Modified."""
+    etag = (headers.get("ETag") or "").strip()
+    if etag and not etag.startswith("W/"):
+        return etag
+    return (headers.get("Last-Modified") or "").strip() or None
+
+
+def _find_resumable_part(dest_dir: Path, filename_stem: str, url: str) -> tuple[Path, str] | None:
+    if not dest_dir.exists():
+        return None
+    for part in dest_dir.glob("*.part"):
+        if not part.name.startswith(filename_stem + "."):
+            continue
+        try:
+            meta = json.loads(part.with_name(part.name + ".json").read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if meta.get("url") == url and meta.get("validator") and part.stat().st_size > 0:
+            return part, meta["validator"]
+    return None
+
+
+def _discard_part(part: Path) -> None:
+    part.unlink(missing_ok=True)
+    part.with_name(part.name + ".json").unlink(missing_ok=True)
+
+
+def _content_range_start(value: str | None) -> int | None:
+    m = re.match(r"bytes\s+(\d+)-", value or "")
+    return int(m.group(1)) if m else None
 
 
 def download_url_to_store(
@@ -205,69 +447,327 @@ def download_url_to_store(
     timeout_s: float = 30.0,
     max_bytes: int = 25 * 1024 * 1024,
 ) -> tuple[Path, str, int]:
+    """
+    Stream an image into dest_dir/<stem><ext>. An interrupted download leaves its
+    .part file (plus a .part.json with the URL and an If-Range validator), and the
+    next call for the same URL and stem resumes it with a Range request when the
+    server still has the same representation.
+    """
     if not is_safe_public_url(url, allow_http=False):
         raise ValueError(f"Refusing to download non-public or non-https url: {url}")
 
     dest_dir.mkdir(parents=True, exist_ok=True)
 
-    req = urllib.request.Request(url, headers={"User-Agent": "Inspirations/0.1"})
+    headers = {"User-Agent": "Inspirations/0.1"}
+    resume = _find_resumable_part(dest_dir, filename_stem, url)
+    if resume is not None:
+        headers["Range"] = f"bytes={resume[0].stat().st_size}-"
+        headers["If-Range"] = resume[1]
+
     sha = hashlib.sha256()
     total = 0
 
-    with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+    try:
+        resp = open_url(url, headers=headers, timeout_s=timeout_s)
+    except urllib.error.HTTPError as e:
+        if resume is not None and e.code == 416:
+            # The server no longer agrees on the partial file; start over.
+            _discard_part(resume[0])
+            return download_url_to_store(
+                url=url, dest_dir=dest_dir, filename_stem=filename_stem, timeout_s=timeout_s, max_bytes=max_bytes
+            )
+        raise
+
+    offset = resume[0].stat().st_size if resume is not None else 0
+    partial = getattr(resp, "status", 200) == 206
+    if partial and (resume is None or _content_range_start(resp.headers.get("Content-Range")) != offset):
+        # A range body that does not continue our .part is never a whole file.
+        resp.close()
+        if resume is None:
+            raise ValueError(f"Unexpected partial response for {url}")
+        _discard_part(resume[0])
+        return download_url_to_store(
+            url=url, dest_dir=dest_dir, filename_stem=filename_stem, timeout_s=timeout_s, max_bytes=max_bytes
+        )
+
+    with resp:
         ct = resp.headers.get("Content-Type")
-        ct_short = (ct or "").split(";")[0].strip().lower()
-        if ct_short and not ct_short.startswith("image/"):
-            # Some hosts return octet-stream for images (e.g., .bmp).
-            if ct_short not in ("application/octet-stream",):
-                raise ValueError(f"Non-image content-type: {ct_short}")
-        ext = _ext_from_content_type(ct) or _ext_from_url(url)
-
-        # pre-check size if available
         clen = resp.headers.get("Content-Length")
-        if clen:
-            try:
-                if int(clen) > max_bytes:
-                    raise ValueError(f"Refusing to download >{max_bytes} bytes: {url}")
-            except ValueError:
-                pass
-
-        first = resp.read(1024 * 64)
-        if first:
-            total += len(first)
-            if total > max_bytes:
+        clen_n = int(clen) if clen and clen.strip().isdigit() else None
+        if partial:
+            tmp_path = resume[0]
+            if clen_n is not None and offset + clen_n > max_bytes:
+                _discard_part(tmp_path)
+                raise ValueError(f"Refusing to download >{max_bytes} bytes: {url}")
+            with open(tmp_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            total = offset
+            first = b""
+            mode = "ab"
+        else:
+            if resume is not None:
+                _discard_part(resume[0])
+            ct_short = (ct or "").split(";")[0].strip().lower()
+            if ct_short and not ct_short.startswith("image/"):
+                # Some hosts return octet-stream for images (e.g., .bmp).
+                if ct_short not in ("application/octet-stream",):
+                    raise ValueError(f"Non-image content-type: {ct_short}")
+            ext = _ext_from_content_type(ct) or _ext_from_url(url)
+
+            # pre-check size if available
+            if clen_n is not None and clen_n > max_bytes:
                 raise ValueError(f"Refusing to download >{max_bytes} bytes: {url}")
-        if ext is None:
-            sniff = _sniff_image_ext(first)
-            if not sniff:
-                raise ValueError("Unknown image type (missing content-type)")
-            ext = sniff
-
-        out_path = dest_dir / f"{filename_stem}{ext}"
-        tmp_path = out_path.with_suffix(out_path.suffix + ".part")
-        with open(tmp_path, "wb") as f:
+
+            first = resp.read(1024 * 64)
             if first:
-                sha.update(first)
-                f.write(first)
-            while True:
-                chunk = resp.read(1024 * 64)
-                if not chunk:
-                    break
-                total += len(chunk)
+                total += len(first)
                 if total > max_bytes:
                     raise ValueError(f"Refusing to download >{max_bytes} bytes: {url}")
-                sha.update(chunk)
-                f.write(chunk)
+            if ext is None:
+                sniff = _sniff_image_ext(first)
+                if not sniff:
+                    raise ValueError("Unknown image type (missing content-type)")
+                ext = sniff
+
+            tmp_path = dest_dir / f"{filename_stem}{ext}.part"
+            mode = "wb"
+            validator = _resume_validator(resp.headers)
+            meta_path = tmp_path.with_name(tmp_path.name + ".json")
+            if validator:
+                meta_path.write_text(json.dumps({"url": url, "validator": validator}), encoding="utf-8")
+            else:
+                meta_path.unlink(missing_ok=True)
+
+        out_path = tmp_path.with_suffix("")
+        try:
+            with open(tmp_path, mode) as f:
+                if first:
+                    sha.update(first)
+                    f.write(first)
+                while True:
+                    chunk = resp.read(1024 * 64)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise ValueError(f"Refusing to download >{max_bytes} bytes: {url}")
+                    sha.update(chunk)
+                    f.write(chunk)
+        except ValueError:
+            _discard_part(tmp_path)
+            raise
 
         os.replace(tmp_path, out_path)
+        tmp_path.with_name(tmp_path.name + ".json").unlink(missing_ok=True)
         return out_path, sha.hexdigest(), total
 
 
+def blob_path(store_dir: Path, sha256: str, ext: str) -> Path:
+    """Content-addressed location for an original: originals/sha256/<ab>/<sha256><ext>."""
+    return store_dir / "originals" / "sha256" / sha256[:2] / f"{sha256}{ext}"
+
+
+def _adopt_blob(db: Db, store_dir: Path, tmp_path: Path, sha256: str) -> Path:
+    """
+    Move a finished download into content-addressed storage, or drop it when the
+    same bytes are already stored (including files from the older per-asset layout).
+    Assets with identical content then share one stored_path.
+    """
+    existing = db.query(
+        "select stored_path from assets where sha256=? and stored_path is not null and stored_path != ''",
+        (sha256,),
+    )
+    for r in existing:
+        if Path(r["stored_path"]).exists():
+            tmp_path.unlink(missing_ok=True)
+            return Path(r["stored_path"])
+    dest = blob_path(store_dir, sha256, tmp_path.suffix)
+    if dest.exists():
+        tmp_path.unlink(missing_ok=True)
+        return dest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, dest)
+    return dest
+
+
+class HostLimiter:
+    """Caps concurrent requests per host and spaces out request starts to each host."""
+
+    def __init__(self, per_host: int = DOWNLOAD_PER_HOST, min_interval_s: float = DOWNLOAD_HOST_INTERVAL_S):
+        self.per_host = max(1, int(per_host))
+        self.min_interval_s = max(0.0, float(min_interval_s))
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.Semaphore] = {}
+        self._next_start: dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        host = (urlparse(url).hostname or "").lower()
+        with self._lock:
+            sem = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with sem:
+            if self.min_interval_s:
+                with self._lock:
+                    now = time.monotonic()
+                    start = max(now, self._next_start.get(host, 0.0))
+                    self._next_start[host] = start + self.min_interval_s
+                if start > now:
+                    time.sleep(start - now)
+            yield
+
+
+class HostCircuitBreaker:
+    """
+    Stops requests to a host after `threshold` consecutive transient failures. After
+    `cooldown_s` one trial request is let through; success closes the circuit again.
+    """
+
+    def __init__(self, threshold: int = DOWNLOAD_BREAKER_THRESHOLD, cooldown_s: float = DOWNLOAD_BREAKER_COOLDOWN_S):
+        self.threshold = max(1, int(threshold))
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._state: dict[str, tuple[int, float]] = {}
+
+    def allow(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        with self._lock:
+            failures, open_until = self._state.get(host, (0, 0.0))
+            if failures < self.threshold:
+                return True
+            now = time.monotonic()
+            if now < open_until:
+                return False
+            # Half-open: this caller is the trial; everyone else waits another cooldown.
+            self._state[host] = (failures, now + self.cooldown_s)
+            return True
+
+    def record(self, url: str, *, ok: bool) -> None:
+        host = (urlparse(url).hostname or "").lower()
+        with self._lock:
+            if ok:
+                self._state.pop(host, None)
+                return
+            failures = self._state.get(host, (0, 0.0))[0] + 1
+            open_until = time.monotonic() + self.cooldown_s if failures >= self.threshold else 0.0
+            self._state[host] = (failures, open_until)
+
+    def open_hosts(self) -> list[str]:
+        with self._lock:
+            return sorted(h for h, (failures, _) in self._state.items() if failures >= self.threshold)
+
+
+def _is_transient(e: BaseException) -> bool:
+    """Failures that say something about the host (and may succeed later), not the URL."""
+    if isinstance(e, urllib.error.HTTPError):
+        return e.code == 429 or e.code >= 500
+    if isinstance(e, ValueError):
+        return False
+    return isinstance(e, (OSError, http.client.HTTPException))
+
+
+def _error_class(e: BaseException) -> str:
+    if isinstance(e, urllib.error.HTTPError):
+        return f"HTTP{e.code}"
+    return type(e).__name__
+
+
+@dataclass
+class _FetchOutcome:
+    preview: UrlPreview | None
+    result: tuple[str, Path, str, int] | None = None
+    error: str = ""
+    error_class: str = ""
+    latency_ms: int = 0
+    circuit_open: bool = False
+    # Failed from an unexpired negative url_previews entry, without any request.
+    from_cache: bool = False
+
+
+def _fetch_original(
+    url: str,
+    *,
+    cached: UrlPreview | None,
+    staging_dir: Path,
+    stem: str,
+    limiter: HostLimiter,
+    breaker: HostCircuitBreaker,
+) -> _FetchOutcome:
+    started = time.perf_counter()
+
+    def _done(out: _FetchOutcome) -> _FetchOutcome:
+        out.latency_ms = int(1000 * (time.perf_counter() - started))
+        return out
+
+    if cached is not None and _cached_preview_usable(cached, _now()):
+        preview = cached
+    else:
+        if not breaker.allow(url):
+            return _done(_FetchOutcome(None, error=f"Circuit open for host: {urlparse(url).hostname}", circuit_open=True))
+        with limiter.slot(url):
+            preview = fetch_url_preview(url, cached=cached)
+        if preview is not cached:
+            code = preview.http_status or 0
+            breaker.record(url, ok=not (preview.status == "error" and (code == 429 or code >= 500)))
+    if not preview.image_url:
+        if preview.status == "error":
+            error_class = f"HTTP{preview.http_status}" if preview.http_status else "PreviewError"
+        else:
+            error_class = "NoPreview"
+        return _done(
+            _FetchOutcome(
+                preview,
+                error=preview.error or "No image preview found for URL",
+                error_class=error_class,
+                from_cache=preview is cached,
+            )
+        )
+    if not breaker.allow(preview.image_url):
+        return _done(
+            _FetchOutcome(preview, error=f"Circuit open for host: {urlparse(preview.image_url).hostname}", circuit_open=True)
+        )
+    try:
+        with limiter.slot(preview.image_url):
+            tmp_path, sha, n = download_url_to_store(url=preview.image_url, dest_dir=staging_dir, filename_stem=stem)
+    except Exception as e:
+        breaker.record(preview.image_url, ok=not _is_transient(e))
+        return _done(_FetchOutcome(preview, error=str(e), error_class=_error_class(e)))
+    breaker.record(preview.image_url, ok=True)
+    return _done(_FetchOutcome(preview, result=(preview.image_url, tmp_path, sha, n)))
+
+
+def _backoff_s(attempts: int) -> float:
+    return min(DOWNLOAD_BACKOFF_BASE_S * 2 ** max(0, attempts - 1), DOWNLOAD_BACKOFF_MAX_S)
+
+
+def load_download_attempts(db: Db, urls: list[str]) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for start in range(0, len(urls), 500):
+        chunk = urls[start : start + 500]
+        for r in db.query(
+            f"select * from download_attempts where url in ({','.join('?' * len(chunk))})",
+            tuple(chunk),
+        ):
+            out[r["url"]] = r
+    return out
+
+
 def download_and_attach_originals(
-    db: Db, store_dir: Path, source: str, limit: int = 0, *, retry_non_image: bool = False
+    db: Db,
+    store_dir: Path,
+    source: str,
+    limit: int = 0,
+    *,
+    retry_non_image: bool = False,
+    workers: int = DOWNLOAD_WORKERS,
+    per_host: int = DOWNLOAD_PER_HOST,
+    host_interval_s: float = DOWNLOAD_HOST_INTERVAL_S,
+    ignore_backoff: bool = False,
 ) -> dict[str, Any]:
     """
     Downloads originals for assets where stored_path is null and image_url is present.
+    Each distinct URL is fetched once per run, and identical bytes are stored once.
+    URLs still backing off in download_attempts are skipped unless ignore_backoff.
     """
     if retry_non_image:
         rows = db.query(
@@ -279,31 +779,152 @@ def download_and_attach_originals(
             "select id, image_url, stored_path from assets where source=? and stored_path is null and image_url is not null order by imported_at asc",
             (source,),
         )
+    now_iso = _now().isoformat()
+    attempts = load_download_attempts(db, list(dict.fromkeys(r["image_url"] for r in rows)))
+    deferred = 0
+    if not ignore_backoff:
+        eligible = []
+        for r in rows:
+            a = attempts.get(r["image_url"])
+            if a is not None and a["next_eligible_at"] and a["next_eligible_at"] > now_iso:
+                deferred += 1
+            else:
+                eligible.append(r)
+        rows = eligible
+    if limit:
+        rows = rows[:limit]
+    by_url: dict[str, list[str]] = {}
+    for r in rows:
+        by_url.setdefault(r["image_url"], []).append(r["id"])
+
+    started = time.perf_counter()
     downloaded: list[DownloadResult] = []
     errors: list[dict[str, str]] = []
-    for i, r in enumerate(rows):
-        if limit and i >= limit:
-            break
-        asset_id = r["id"]
-        url = r["image_url"]
-        try:
-            resolved = resolve_image_url(url) or None
-            if not resolved:
-                raise ValueError("No image preview found for URL")
-            out_path, sha, n = download_url_to_store(
-                url=resolved, dest_dir=store_dir / "originals" / source, filename_stem=asset_id
-            )
-            db.exec(
-                "update assets set stored_path=?, sha256=?, image_url=? where id=?",
-                (str(out_path), sha, resolved, asset_id),
+    pending_updates: list[tuple[str, str, str, str]] = []
+    pending_attempts: list[tuple[Any, ...]] = []
+    fetched = 0
+    preview_hits = 0
+    circuit_open = 0
+    cached_previews = load_url_previews(db, list(by_url))
+    pending_previews: list[UrlPreview] = []
+    limiter = HostLimiter(per_host, host_interval_s)
+    breaker = HostCircuitBreaker(DOWNLOAD_BREAKER_THRESHOLD, DOWNLOAD_BREAKER_COOLDOWN_S)
+    staging_dir = store_dir / "originals" / ".incoming"
+
+    def _record_attempt(url: str, out: _FetchOutcome, ok: bool) -> None:
+        failures = 0 if ok else int(attempts[url]["attempts"] if url in attempts else 0) + 1
+        at = _now()
+        pending_attempts.append(
+            (
+                url,
+                (urlparse(url).hostname or "").lower(),
+                "ok" if ok else "failed",
+                failures,
+                out.result[3] if ok and out.result else None,
+                out.latency_ms,
+                None if ok else out.error_class,
+                None if ok else out.error[:500],
+                at.isoformat(),
+                None if ok else _retry_at(at, _backoff_s(failures)),
             )
-            downloaded.append(DownloadResult(asset_id=asset_id, stored_path=str(out_path), sha256=sha, bytes=n))
-        except Exception as e:
-            errors.append({"id": asset_id, "url": str(url), "error": str(e)})
+        )
 
+    def _flush() -> None:
+        if pending_previews:
+            save_url_previews(db, pending_previews)
+            pending_previews.clear()
+        if pending_attempts:
+            db.executemany(
+                """
+                insert into download_attempts
+                  (url, host, status, attempts, bytes, latency_ms, error_class, error, last_attempt_at, next_eligible_at)
+                values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                on conflict(url) do update set
+                  host=excluded.host,
+                  status=excluded.status,
+                  attempts=excluded.attempts,
+                  bytes=excluded.bytes,
+                  latency_ms=excluded.latency_ms,
+                  error_class=excluded.error_class,
+                  error=excluded.error,
+                  last_attempt_at=excluded.last_attempt_at,
+                  next_eligible_at=excluded.next_eligible_at
+                """,
+                pending_attempts,
+            )
+            pending_attempts.clear()
+        if pending_updates:
+            db.executemany("update assets set stored_path=?, sha256=?, image_url=? where id=?", pending_updates)
+            pending_updates.clear()
+        db.commit()
+
+    # Workers only do network and file I/O; this thread is the single DB writer and
+    # keeps at most 2 * workers URLs in flight.
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as exe:
+        in_flight: dict[Any, str] = {}
+        queue = iter(by_url)
+        while True:
+            while len(in_flight) < 2 * max(1, int(workers)):
+                url = next(queue, None)
+                if url is None:
+                    break
+                future = exe.submit(
+                    _fetch_original,
+                    url,
+                    cached=cached_previews.get(url),
+                    staging_dir=staging_dir,
+                    stem=by_url[url][0],
+                    limiter=limiter,
+                    breaker=breaker,
+                )
+                in_flight[future] = url
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = in_flight.pop(future)
+                asset_ids = by_url[url]
+                try:
+                    out = future.result()
+                    if out.preview is not None:
+                        if out.preview is cached_previews.get(url):
+                            preview_hits += 1
+                        else:
+                            pending_previews.append(out.preview)
+                    if out.circuit_open:
+                        # Not the URL's fault: no attempt is recorded, so it is retried next run.
+                        circuit_open += 1
+                        raise ValueError(out.error)
+                    # A cached negative preview made no request, so there is no attempt to record.
+                    if not out.from_cache:
+                        _record_attempt(url, out, ok=out.result is not None)
+                    if out.result is None:
+                        raise ValueError(out.error)
+                    resolved, tmp_path, sha, n = out.result
+                    fetched += 1
+                    out_path = _adopt_blob(db, store_dir, tmp_path, sha)
+                except Exception as e:
+                    errors.extend({"id": asset_id, "url": str(url), "error": str(e)} for asset_id in asset_ids)
+                    continue
+                for asset_id in asset_ids:
+                    pending_updates.append((str(out_path), sha, resolved, asset_id))
+                    downloaded.append(DownloadResult(asset_id=asset_id, stored_path=str(out_path), sha256=sha, bytes=n))
+            if len(pending_updates) + len(pending_previews) + len(pending_attempts) >= DOWNLOAD_WRITE_BATCH:
+                _flush()
+        _flush()
+
+    elapsed = time.perf_counter() - started
     return {
-        "attempted": min(len(rows), limit) if limit else len(rows),
+        "attempted": len(rows),
         "downloaded": len(downloaded),
+        "fetched": fetched,
+        "deferred": deferred,
+        "circuit_open": circuit_open,
+        "open_hosts": breaker.open_hosts(),
+        "preview_cache_hits": preview_hits,
+        "unique_files": len({d.stored_path for d in downloaded}),
+        "bytes": sum(d.bytes for d in downloaded),
+        "elapsed_s": round(elapsed, 3),
         "errors": errors[:25],
         "note": "Errors are truncated to 25 in output.",
     }
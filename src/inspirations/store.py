@@ -1,16 +1,64 @@
 from __future__ import annotations
 
+import base64
+import json
+import re
 import uuid
 from datetime import datetime, timezone
 from typing import Any
 
-from .db import Db
+from .db import Db, has_asset_search
 
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _fts_match_query(q: str) -> str:
+    # Every term must match; the trailing * turns each term into a prefix query.
+    terms = re.findall(r"\w+", (q or "").lower())
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def encode_cursor(values: list[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("invalid cursor") from e
+    # Values are bound straight into SQL, so only scalar types are accepted.
+    if not isinstance(values, list) or not all(v is None or isinstance(v, (str, int, float)) for v in values):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def _asset_cursor(row: dict[str, Any]) -> str:
+    keys = [row["preview_rank"], row["imported_at"], row["id"]]
+    if "search_score" in row:
+        keys.insert(0, row["search_score"])
+    return encode_cursor(keys)
+
+
+ASSET_FIELDS = ("full", "card")
+
+
+def _asset_row(row: Any) -> dict[str, Any]:
+    out = dict(row)
+    if "ai_top_tags" in out:
+        out["ai_top_tags"] = json.loads(out["ai_top_tags"] or "[]")
+    return out
+
+
+def asset_card(row: dict[str, Any]) -> dict[str, Any]:
+    # Grid cards carry precomputed top tags and label counts instead of the full AI JSON.
+    return {k: v for k, v in row.items() if k != "ai_json"}
+
+
 def list_assets(
     db: Db,
     *,
@@ -19,12 +67,20 @@ def list_assets(
     board: str = "",
     label: str = "",
     collection_id: str = "",
+    hide_duplicates: bool = False,
     limit: int = 200,
     offset: int = 0,
+    cursor: str = "",
+    fields: str = "full",
 ) -> list[dict[str, Any]]:
+    if fields not in ASSET_FIELDS:
+        raise ValueError("fields must be one of: " + ", ".join(ASSET_FIELDS))
     clauses = []
     params: list[Any] = []
     joins: list[str] = []
+    join_params: list[Any] = []
+    rank_sql = ""
+    score_sql = ""
     if source:
         sources = [s.strip() for s in source.split(",") if s.strip()]
         clauses.append("a.source in (%s)" % ",".join(["?"] * len(sources)))
@@ -35,67 +91,141 @@ def list_assets(
         params.extend(boards)
     if label:
         labels = [s.strip() for s in label.split(",") if s.strip()]
-        joins.append("left join asset_labels al on al.asset_id = a.id")
-        clauses.append("al.label in (%s)" % ",".join(["?"] * len(labels)))
-        params.extend(labels)
-    if q:
-        if not any(j.startswith("left join asset_labels") for j in joins):
-            joins.append("left join asset_labels al on al.asset_id = a.id")
         clauses.append(
-            "(a.title like ? or a.description like ? or a.board like ? or a.source_ref like ? or a.notes like ? or a.ai_summary like ? or al.label like ?)"
+            "exists (select 1 from asset_labels al where al.asset_id = a.id and al.label in (%s))"
+            % ",".join(["?"] * len(labels))
         )
-        qv = f"%{q}%"
-        params += [qv, qv, qv, qv, qv, qv, qv]
+        params.extend(labels)
+    if q:
+        match = _fts_match_query(q)
+        if match and has_asset_search(db):
+            joins.append(
+                """join (
+                  select d.asset_id, bm25(asset_search, 4.0, 1.0, 2.0, 0.5, 2.0, 1.5, 2.0, 1.0, 1.5) as score
+                  from asset_search
+                  join asset_search_docs d on d.doc_id = asset_search.rowid
+                  where asset_search match ?
+                ) fts on fts.asset_id = a.id"""
+            )
+            join_params.append(match)
+            rank_sql = "fts.score asc,"
+            score_sql = "fts.score as search_score,"
+        else:
+            clauses.append(
+                "(a.title like ? or a.description like ? or a.board like ? or a.source_ref like ? or a.notes like ? or a.ai_summary like ?"
+                " or exists (select 1 from asset_labels al where al.asset_id = a.id and al.label like ?))"
+            )
+            qv = f"%{q}%"
+            params += [qv, qv, qv, qv, qv, qv, qv]
+    if hide_duplicates:
+        clauses.append("a.duplicate_of is null")
     if collection_id:
         joins.append("join collection_items ci on ci.asset_id = a.id")
         clauses.append("ci.collection_id = ?")
         params.append(collection_id)
+    if cursor:
+        keys = decode_cursor(cursor)
+        if len(keys) != (4 if score_sql else 3):
+            raise ValueError("invalid cursor")
+        after = "(a.preview_rank, a.imported_at, a.id) < (?, ?, ?)"
+        if score_sql:
+            # bm25 depends on corpus statistics, so search pages are only stable while the library is unchanged.
+            clauses.append(f"(fts.score > ? or (fts.score = ? and {after}))")
+            params.extend([keys[0], keys[0], *keys[1:]])
+        else:
+            clauses.append(after)
+            params.extend(keys)
     where = "where " + " and ".join(clauses) if clauses else ""
     join_sql = "\n    " + "\n    ".join(joins) if joins else ""
+    ai_json_sql = "ail.json as ai_json," if fields == "full" else ""
 
     sql = f"""
-    select distinct a.id, a.source, a.source_ref, a.title, a.description, a.board, a.notes,
-           coalesce(
-             (select ai.summary from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1),
-             a.ai_summary
-           ) as ai_summary,
-           (select ai.json from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_json,
-           (select ai.model from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_model,
-           (select ai.provider from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_provider,
-           (select ai.created_at from asset_ai ai where ai.asset_id=a.id order by ai.created_at desc limit 1) as ai_created_at,
-           a.created_at, a.imported_at, a.image_url, a.stored_path, a.thumb_path
+    select a.id, a.source, a.source_ref, a.title, a.description, a.board, a.notes,
+           coalesce(ail.summary, a.ai_summary) as ai_summary,
+           {ai_json_sql}
+           ail.model as ai_model,
+           ail.provider as ai_provider,
+           ail.created_at as ai_created_at,
+           ail.image_type as ai_image_type,
+           coalesce(ail.label_count, 0) as ai_label_count,
+           ail.top_tags as ai_top_tags,
+           {score_sql}
+           a.created_at, a.imported_at, a.image_url, a.stored_path, a.thumb_path, a.preview_rank
     from assets a
+    left join asset_ai_latest ail on ail.asset_id = a.id
     {join_sql}
     {where}
     order by
-      case
-        when a.thumb_path is not null and a.thumb_path != '' then 3
-        when a.stored_path is not null and (
-          lower(a.stored_path) like '%.jpg'
-          or lower(a.stored_path) like '%.jpeg'
-          or lower(a.stored_path) like '%.png'
-          or lower(a.stored_path) like '%.webp'
-          or lower(a.stored_path) like '%.gif'
-          or lower(a.stored_path) like '%.bmp'
-          or lower(a.stored_path) like '%.svg'
-        ) then 2
-        when a.image_url is not null and (
-          lower(a.image_url) like '%.jpg%'
-          or lower(a.image_url) like '%.jpeg%'
-          or lower(a.image_url) like '%.png%'
-          or lower(a.image_url) like '%.webp%'
-          or lower(a.image_url) like '%.gif%'
-          or lower(a.image_url) like '%.bmp%'
-          or lower(a.image_url) like '%.svg%'
-        ) then 1
-        else 0
-      end desc,
-      a.imported_at desc
+      {rank_sql}
+      a.preview_rank desc,
+      a.imported_at desc,
+      a.id desc
     limit ? offset ?;
     """
-    params += [limit, offset]
+    params = join_params + params + [limit, offset]
     rows = db.query(sql, tuple(params))
-    return [dict(r) for r in rows]
+    return [_asset_row(r) for r in rows]
+
+
+def get_asset(db: Db, *, asset_id: str) -> dict[str, Any] | None:
+    rows = db.query(
+        """
+        select a.id, a.source, a.source_ref, a.title, a.description, a.board, a.notes,
+               coalesce(ail.summary, a.ai_summary) as ai_summary,
+               ail.json as ai_json,
+               ail.model as ai_model,
+               ail.provider as ai_provider,
+               ail.created_at as ai_created_at,
+               ail.image_type as ai_image_type,
+               coalesce(ail.label_count, 0) as ai_label_count,
+               ail.top_tags as ai_top_tags,
+               a.created_at, a.imported_at, a.image_url, a.stored_path, a.thumb_path, a.preview_rank
+        from assets a
+        left join asset_ai_latest ail on ail.asset_id = a.id
+        where a.id = ?
+        """,
+        (asset_id,),
+    )
+    return _asset_row(rows[0]) if rows else None
+
+
+def filter_asset_ids(
+    db: Db,
+    *,
+    source: str = "",
+    board: str = "",
+    label: str = "",
+    collection_id: str = "",
+) -> set[str] | None:
+    """
+    Ids matching the list_assets filters (comma-separated values OR within a filter,
+    filters AND together), each resolved through its own index. None when unfiltered.
+    """
+    parts: list[str] = []
+    params: list[Any] = []
+    for column, value in (("source", source), ("board", board)):
+        values = [s.strip() for s in (value or "").split(",") if s.strip()]
+        if values:
+            parts.append("select id from assets where %s in (%s)" % (column, ",".join(["?"] * len(values))))
+            params.extend(values)
+    labels = [s.strip() for s in (label or "").split(",") if s.strip()]
+    if labels:
+        parts.append("select asset_id from asset_labels where label in (%s)" % ",".join(["?"] * len(labels)))
+        params.extend(labels)
+    if collection_id:
+        parts.append("select asset_id from collection_items where collection_id = ?")
+        params.append(collection_id)
+    if not parts:
+        return None
+    return {r[0] for r in db.query(" intersect ".join(parts), tuple(params))}
+
+
+def list_assets_page(db: Db, *, limit: int = 200, cursor: str = "", **filters: Any) -> dict[str, Any]:
+    # Fetch one extra row to learn whether another page exists.
+    limit = max(1, int(limit))
+    rows = list_assets(db, limit=limit + 1, cursor=cursor, **filters)
+    next_cursor = _asset_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"assets": rows[:limit], "next_cursor": next_cursor}
 
 
 def list_facets(db: Db) -> dict[str, Any]:
@@ -224,8 +354,29 @@ def delete_assets(db: Db, *, asset_ids: list[str]) -> dict[str, Any]:
         if r["thumb_path"]:
             paths.append(r["thumb_path"])
 
+    # Near-duplicates of a deleted canonical regroup under their earliest remaining copy.
+    orphans = db.query(
+        f"""
+        select id, duplicate_of from assets
+        where duplicate_of in ({placeholders}) and id not in ({placeholders})
+        order by imported_at asc, id asc
+        """,
+        tuple(unique_ids) * 2,
+    )
+    promoted: dict[str, str] = {}
+    for r in orphans:
+        canonical = promoted.setdefault(r["duplicate_of"], r["id"])
+        db.exec("update assets set duplicate_of=? where id=?", (None if canonical == r["id"] else canonical, r["id"]))
+
     db.exec(f"delete from assets where id in ({placeholders})", tuple(unique_ids))
-    return {"deleted": len(rows), "paths": paths}
+    # Originals and thumbnails are shared by assets with identical bytes, so only
+    # paths that no remaining asset references are handed back for removal.
+    unreferenced = [
+        p
+        for p in dict.fromkeys(paths)
+        if not db.query_value("select 1 from assets where stored_path = ? or thumb_path = ? limit 1", (p, p))
+    ]
+    return {"deleted": len(rows), "paths": unreferenced, "shared_paths_kept": len(set(paths)) - len(unreferenced)}
 
 
 def update_asset_notes(db: Db, *, asset_id: str, notes: str) -> None:
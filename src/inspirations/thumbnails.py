@@ -1,11 +1,24 @@
 from __future__ import annotations
 
+import multiprocessing
+import os
 import shutil
+import signal
 import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from .db import Db
+from .duplicates import BKTree, compute_dhash, load_hash_tree, record_dhash
+
+
+THUMB_TASK_TIMEOUT_S = 120.0
+# Pool-side deadline slack, so a tool subprocess hits its own timeout (and is killed)
+# before the worker running it is abandoned.
+THUMB_TIMEOUT_GRACE_S = 5.0
+THUMB_WRITE_BATCH = 100
 
 
 def _can_use_pillow() -> bool:
@@ -38,13 +51,13 @@ def _select_tool(tool: str) -> str | None:
     return None
 
 
-def _make_thumb(tool: str, src: Path, dst: Path, size: int) -> None:
+def _make_thumb(tool: str, src: Path, dst: Path, size: int, *, timeout_s: float | None = None) -> None:
     dst.parent.mkdir(parents=True, exist_ok=True)
     if tool == "sips":
-        subprocess.run(["sips", "-Z", str(size), str(src), "--out", str(dst)], check=True)
+        subprocess.run(["sips", "-Z", str(size), str(src), "--out", str(dst)], check=True, timeout=timeout_s)
         return
     if tool == "magick":
-        subprocess.run(["magick", str(src), "-resize", f"{size}x{size}", str(dst)], check=True)
+        subprocess.run(["magick", str(src), "-resize", f"{size}x{size}", str(dst)], check=True, timeout=timeout_s)
         return
     if tool == "pillow":
         _make_thumb_pillow(src, dst, size)
@@ -52,6 +65,50 @@ def _make_thumb(tool: str, src: Path, dst: Path, size: int) -> None:
     raise ValueError(f"Unknown thumbnail tool: {tool}")
 
 
+def _render_thumb(tool: str, stored: str, dst: str, size: int, timeout_s: float | None) -> tuple[str | None, str | None, str]:
+    """
+    One thumbnail through the tool -> pillow -> SVG passthrough chain, plus its
+    perceptual hash. Returns (thumb_path, dhash, error); runs in pool workers.
+    """
+    src, out = Path(stored), Path(dst)
+    try:
+        _make_thumb(tool, src, out, size, timeout_s=timeout_s)
+        return str(out), compute_dhash(out), ""
+    except Exception as e:
+        if tool != "pillow" and _can_use_pillow():
+            try:
+                _make_thumb("pillow", src, out, size)
+                return str(out), compute_dhash(out), ""
+            except Exception:
+                pass
+        # When raster tools cannot convert SVG, use the original SVG as preview.
+        if src.suffix.lower() == ".svg" and src.exists():
+            return str(src), None, ""
+        return None, None, str(e)
+
+
+def _report_pid(pids: Any) -> None:
+    pids.put(os.getpid())
+
+
+def _start_pool(workers: int) -> tuple[ProcessPoolExecutor, Any]:
+    # Workers report their PIDs so a pool with a stuck task can be torn down.
+    pids = multiprocessing.SimpleQueue()
+    return ProcessPoolExecutor(max_workers=workers, initializer=_report_pid, initargs=(pids,)), pids
+
+
+def _stop_pool(exe: ProcessPoolExecutor, pids: Any) -> None:
+    # Timed-out tasks cannot be cancelled once running; end their worker processes
+    # so shutdown does not wait on them.
+    while not pids.empty():
+        try:
+            os.kill(pids.get(), signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+    exe.shutdown(wait=True, cancel_futures=True)
+    pids.close()
+
+
 def generate_thumbnails(
     db: Db,
     store_dir: Path,
@@ -60,7 +117,13 @@ def generate_thumbnails(
     limit: int = 0,
     source: str | None = None,
     tool: str = "auto",
+    workers: int = 1,
+    timeout_s: float = THUMB_TASK_TIMEOUT_S,
 ) -> dict[str, Any]:
+    """
+    Thumbnails for stored originals that have none. With workers > 1 the conversions
+    run in a process pool; this process stays the only DB writer either way.
+    """
     tool = _select_tool(tool)
     if tool is None:
         return {
@@ -73,56 +136,161 @@ def generate_thumbnails(
     if source:
         args.append(source)
         rows = db.query(
-            "select id, stored_path, source from assets where source=? and stored_path is not null and (thumb_path is null or thumb_path='') order by imported_at asc",
+            "select id, stored_path, source, sha256 from assets where source=? and stored_path is not null and (thumb_path is null or thumb_path='') order by imported_at asc",
             tuple(args),
         )
     else:
         rows = db.query(
-            "select id, stored_path, source from assets where stored_path is not null and (thumb_path is null or thumb_path='') order by imported_at asc"
+            "select id, stored_path, source, sha256 from assets where stored_path is not null and (thumb_path is null or thumb_path='') order by imported_at asc"
         )
 
     attempted = 0
     generated = 0
+    duplicates = 0
+    reused = 0
     errors: list[dict[str, str]] = []
+    tree: BKTree | None = None
+    pending: list[tuple[str, str]] = []
+    # sha256 -> asset ids waiting on a thumbnail that is already being rendered, and
+    # sha256 -> (thumb_path, dhash) rendered in this run but possibly not yet written.
+    followers: dict[str, list[str]] = {}
+    rendered: dict[str, tuple[str, str | None]] = {}
 
-    for r in rows:
-        if limit and attempted >= limit:
-            break
-        attempted += 1
-        asset_id = r["id"]
-        stored = Path(r["stored_path"])
-        src = r["source"]
-        try:
-            if str(stored).lower().endswith(".bin"):
-                errors.append({"id": asset_id, "error": "Skipping .bin (not an image)"})
-                continue
-            dst = store_dir / "thumbs" / src / f"{asset_id}.jpg"
+    def _record_hash(asset_id: str, dhash: str | None) -> None:
+        # Perceptual hash of the fresh thumbnail, matched against the library for near-duplicates.
+        nonlocal tree, duplicates
+        if dhash is None:
+            return
+        if tree is None:
+            tree = load_hash_tree(db)
+        if record_dhash(db, tree, asset_id=asset_id, dhash=dhash):
+            duplicates += 1
+
+    def _flush() -> None:
+        if pending:
+            db.executemany("update assets set thumb_path=? where id=?", pending)
+            pending.clear()
+        db.commit()
+
+    def _finish(asset_id: str, sha: str | None, thumb: str | None, dhash: str | None, error: str) -> None:
+        nonlocal generated, reused
+        waiting = followers.pop(sha, []) if sha else []
+        if thumb is None:
+            errors.append({"id": asset_id, "error": error})
+            errors.extend({"id": other, "error": error} for other in waiting)
+            return
+        pending.append((thumb, asset_id))
+        generated += 1
+        if sha:
+            rendered[sha] = (thumb, dhash)
+        _record_hash(asset_id, dhash)
+        for other in waiting:
+            pending.append((thumb, other))
+            reused += 1
+            _record_hash(other, dhash)
+        if len(pending) >= THUMB_WRITE_BATCH:
+            _flush()
+
+    def _jobs() -> Iterator[tuple[str, str | None, tuple[Any, ...]]]:
+        # Yields (asset_id, sha256, render args) for the assets that need rendering.
+        nonlocal attempted, reused
+        for r in rows:
+            if limit and attempted >= limit:
+                break
+            attempted += 1
+            asset_id = r["id"]
+            stored = Path(r["stored_path"])
+            sha = r["sha256"] or None
             try:
-                _make_thumb(tool, stored, dst, size)
-                db.exec("update assets set thumb_path=? where id=?", (str(dst), asset_id))
-                generated += 1
-            except Exception as e:
-                if tool != "pillow" and _can_use_pillow():
-                    try:
-                        _make_thumb("pillow", stored, dst, size)
-                        db.exec("update assets set thumb_path=? where id=?", (str(dst), asset_id))
-                        generated += 1
-                        continue
-                    except Exception:
-                        pass
-                # When raster tools cannot convert SVG, use the original SVG as preview.
-                if stored.suffix.lower() == ".svg" and stored.exists():
-                    db.exec("update assets set thumb_path=? where id=?", (str(stored), asset_id))
-                    generated += 1
+                if str(stored).lower().endswith(".bin"):
+                    errors.append({"id": asset_id, "error": "Skipping .bin (not an image)"})
                     continue
+                if sha:
+                    if sha in followers:
+                        followers[sha].append(asset_id)
+                        continue
+                    if sha in rendered:
+                        pending.append((rendered[sha][0], asset_id))
+                        reused += 1
+                        _record_hash(asset_id, rendered[sha][1])
+                        continue
+                    # Identical bytes share one thumbnail.
+                    twin = db.query(
+                        """
+                        select thumb_path, dhash from assets
+                        where sha256=? and id != ? and thumb_path is not null and thumb_path != ''
+                        limit 1
+                        """,
+                        (sha, asset_id),
+                    )
+                    if twin and Path(twin[0]["thumb_path"]).exists():
+                        pending.append((twin[0]["thumb_path"], asset_id))
+                        reused += 1
+                        _record_hash(asset_id, twin[0]["dhash"])
+                        continue
+                    followers[sha] = []
+                dst = store_dir / "thumbs" / r["source"] / f"{asset_id}.jpg"
+                yield asset_id, sha, (tool, str(stored), str(dst), size, timeout_s)
+            except Exception as e:
                 errors.append({"id": asset_id, "error": str(e)})
-        except Exception as e:
-            errors.append({"id": asset_id, "error": str(e)})
+
+    if workers <= 1:
+        for asset_id, sha, job in _jobs():
+            _finish(asset_id, sha, *_render_thumb(*job))
+    else:
+        exe, pids = _start_pool(workers)
+        timed_out = False
+        try:
+            in_flight: dict[Any, tuple[str, str | None, float]] = {}
+            jobs = _jobs()
+            while True:
+                if timed_out and not in_flight:
+                    # A timed-out task still occupies its worker; replace the pool once idle.
+                    _stop_pool(exe, pids)
+                    exe, pids = _start_pool(workers)
+                    timed_out = False
+                # Only as many tasks as workers, so a task's clock starts when it can run.
+                while not timed_out and len(in_flight) < workers:
+                    nxt = next(jobs, None)
+                    if nxt is None:
+                        break
+                    asset_id, sha, job = nxt
+                    in_flight[exe.submit(_render_thumb, *job)] = (
+                        asset_id,
+                        sha,
+                        time.monotonic() + timeout_s + THUMB_TIMEOUT_GRACE_S,
+                    )
+                if not in_flight:
+                    break
+                next_deadline = min(d for _, _, d in in_flight.values())
+                done, _ = wait(in_flight, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    asset_id, sha, _ = in_flight.pop(future)
+                    try:
+                        _finish(asset_id, sha, *future.result())
+                    except Exception as e:
+                        _finish(asset_id, sha, None, None, str(e))
+                now = time.monotonic()
+                for future, (asset_id, sha, deadline) in list(in_flight.items()):
+                    if deadline <= now and not future.done():
+                        del in_flight[future]
+                        timed_out = True
+                        _finish(asset_id, sha, None, None, f"Timed out after {timeout_s:g}s")
+        finally:
+            if timed_out:
+                _stop_pool(exe, pids)
+            else:
+                exe.shutdown(wait=True)
+                pids.close()
+    _flush()
 
     return {
         "tool": tool,
+        "workers": max(1, workers),
         "attempted": attempted,
         "generated": generated,
+        "reused": reused,
+        "duplicates": duplicates,
         "errors": errors[:25],
         "note": "Errors are truncated to 25 in output.",
     }
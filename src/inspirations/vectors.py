@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from typing import Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the array/memoryview paths below cover it.
+    np = None
+
+
+def normalize(values: Sequence[float]) -> list[float]:
+    vec = [float(x) for x in values]
+    norm = math.sqrt(sum(x * x for x in vec))
+    if norm <= 0.0:
+        return vec
+    return [x / norm for x in vec]
+
+
+def pack_vector(values: Sequence[float]) -> bytes:
+    """Unit-normalize and encode as little-endian float32."""
+    arr = array("f", normalize(values))
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def unpack_vector(blob: bytes) -> Any:
+    """Decode a pack_vector blob without copying where the platform allows it."""
+    if np is not None:
+        return np.frombuffer(blob, dtype="<f4")
+    if sys.byteorder == "little":
+        return memoryview(blob).cast("f")
+    arr = array("f")
+    arr.frombytes(blob)
+    arr.byteswap()
+    return arr
+
+
+def query_vector(values: Sequence[float]) -> Any:
+    """Unit-normalize a query vector into the type unpack_vector produces."""
+    unit = normalize(values)
+    if np is not None:
+        return np.asarray(unit, dtype="float32")
+    return unit
+
+
+def vector_dimensions(blob: bytes) -> int:
+    return len(blob) // 4
+
+
+def dot(a: Any, b: Any) -> float:
+    if np is not None:
+        return float(np.dot(a, b))
+    return sum(x * y for x, y in zip(a, b))
@@ -1,6 +1,8 @@
+import io
 import json
 import tempfile
 import unittest
+import urllib.error
 from pathlib import Path
 from unittest import mock
 
@@ -9,11 +11,19 @@ from inspirations.ai import (
     _build_embedding_input_text,
     _classify_ai_error,
     _cosine_similarity,
+    _gemini_batch_embed_texts,
+    _lexical_overlap_score,
+    _lexical_scores,
+    embedding_freshness,
     run_ai_error_triage,
     run_gemini_text_embedder,
+    run_similar_assets,
     run_similarity_search,
 )
-from inspirations.db import Db, ensure_schema
+from inspirations.db import Db, ensure_schema, has_asset_lexical
+from inspirations.search_cache import clear_search_caches
+from inspirations.store import add_items_to_collection, create_collection
+from inspirations.vectors import pack_vector
 
 
 class TestAiSemantic(unittest.TestCase):
@@ -149,7 +159,10 @@ class TestAiSemantic(unittest.TestCase):
                     """,
                     ("a1", "pinterest", "pin://1", "Kitchen", "Warm oak kitchen"),
                 )
-                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[0.1, 0.2, 0.3]):
+                with mock.patch(
+                    "inspirations.ai._gemini_batch_embed_texts",
+                    side_effect=lambda **kw: [[0.1, 0.2, 0.3] for _ in kw["texts"]],
+                ):
                     report = run_gemini_text_embedder(
                         db,
                         api_key="fake",
@@ -163,6 +176,96 @@ class TestAiSemantic(unittest.TestCase):
                 )
                 self.assertEqual(len(row), 1)
                 self.assertEqual(int(row[0]["dimensions"]), 3)
+                stored = db.query("select vector_json, vector_f32 from asset_embeddings where asset_id='a1'")[0]
+                self.assertEqual(stored["vector_json"], "")
+                self.assertEqual(stored["vector_f32"], pack_vector([0.1, 0.2, 0.3]))
+
+    def test_run_gemini_text_embedder_batches_and_reports_throughput(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            calls: list[int] = []
+
+            def _fake_batch(**kw):
+                calls.append(len(kw["texts"]))
+                if any("Broken" in t for t in kw["texts"]):
+                    raise RuntimeError("Gemini batch embed HTTP 400: bad")
+                return [[1.0, 0.0] for _ in kw["texts"]]
+
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for i, title in enumerate(["One", "Two", "Three", "Four", "Broken"]):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"a{i}", "pinterest", f"pin://{i}", title, f"2026-02-0{i + 1}T00:00:00+00:00"),
+                    )
+                with mock.patch("inspirations.ai._gemini_batch_embed_texts", side_effect=_fake_batch):
+                    report = run_gemini_text_embedder(
+                        db, api_key="fake", model=DEFAULT_GEMINI_EMBEDDING_MODEL, batch_size=2, workers=2
+                    )
+                stored = db.query_value("select count(*) from asset_embeddings")
+            self.assertEqual(sorted(calls), [1, 2, 2])
+            self.assertEqual(report["batches"], 3)
+            self.assertEqual(report["embedded_assets"], 4)
+            self.assertEqual(stored, 4)
+            self.assertEqual([e["id"] for e in report["errors"]], ["a4"])
+            self.assertIn("assets_per_s", report)
+
+    def test_run_gemini_text_embedder_only_changed_reembeds_stale_assets(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            embedded: list[str] = []
+
+            def _fake_batch(**kw):
+                embedded.extend(kw["texts"])
+                return [[1.0, 0.0] for _ in kw["texts"]]
+
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for i, title in enumerate(["One", "Two"]):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"a{i}", "pinterest", f"pin://{i}", title, f"2026-02-0{i + 1}T00:00:00+00:00"),
+                    )
+                with mock.patch("inspirations.ai._gemini_batch_embed_texts", side_effect=_fake_batch):
+                    run_gemini_text_embedder(db, api_key="fake", model=DEFAULT_GEMINI_EMBEDDING_MODEL)
+                    hashes = [r["input_hash"] for r in db.query("select input_hash from asset_embeddings")]
+                    self.assertTrue(all(len(h) == 64 for h in hashes))
+                    self.assertEqual(embedding_freshness(db)["stale"], 0)
+
+                    db.exec("update assets set notes='Brass pulls' where id='a1'")
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                        ("a2", "pinterest", "pin://2", "Three", "2026-02-03T00:00:00+00:00"),
+                    )
+                    self.assertEqual(
+                        embedding_freshness(db),
+                        {"provider": "gemini", "model": DEFAULT_GEMINI_EMBEDDING_MODEL, "embedded": 2, "stale": 1, "missing": 1},
+                    )
+
+                    embedded.clear()
+                    report = run_gemini_text_embedder(
+                        db, api_key="fake", model=DEFAULT_GEMINI_EMBEDDING_MODEL, only_changed=True
+                    )
+                self.assertEqual(report["embedded_assets"], 2)
+                self.assertEqual(len(embedded), 2)
+                self.assertTrue(any("Brass pulls" in t for t in embedded))
+                self.assertEqual(embedding_freshness(db)["stale"], 0)
+
+    def test_gemini_batch_embed_retries_rate_limits(self):
+        ok = mock.MagicMock()
+        ok.__enter__.return_value.read.return_value = json.dumps(
+            {"embeddings": [{"values": [0.1, 0.2]}, {"values": [0.3, 0.4]}]}
+        ).encode("utf-8")
+        limited = urllib.error.HTTPError("u", 429, "Too Many Requests", {"Retry-After": "0"}, io.BytesIO(b""))
+        with mock.patch("inspirations.ai.urllib.request.urlopen", side_effect=[limited, ok]) as urlopen:
+            with mock.patch("inspirations.ai.time.sleep") as sleep:
+                vectors = _gemini_batch_embed_texts(api_key="k", model="m", texts=["a", "b"])
+        self.assertEqual(vectors, [[0.1, 0.2], [0.3, 0.4]])
+        self.assertEqual(urlopen.call_count, 2)
+        sleep.assert_called_once_with(0.0)
+        payload = json.loads(urlopen.call_args.args[0].data.decode("utf-8"))
+        self.assertEqual(len(payload["requests"]), 2)
+        self.assertEqual(payload["requests"][0]["taskType"], "RETRIEVAL_DOCUMENT")
 
     def test_run_similarity_search_orders_scores(self):
         with tempfile.TemporaryDirectory() as td:
@@ -205,6 +308,38 @@ class TestAiSemantic(unittest.TestCase):
             self.assertEqual(report["compared_assets"], 2)
             self.assertEqual(report["results"][0]["id"], "a1")
 
+    def test_run_similarity_search_reads_float32_vectors(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for asset_id, vector in (("a1", [1.0, 0.0]), ("a2", [0.6, 0.8]), ("a3", [1.0, 0.0, 0.0])):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                        (asset_id, "pinterest", f"pin://{asset_id}", asset_id),
+                    )
+                    db.exec(
+                        """
+                        insert into asset_embeddings
+                          (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+                        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+                        """,
+                        (f"em-{asset_id}", asset_id, "gemini", DEFAULT_GEMINI_EMBEDDING_MODEL, "doc", pack_vector(vector), len(vector)),
+                    )
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[0.0, 2.0]):
+                    report = run_similarity_search(
+                        db,
+                        api_key="fake",
+                        query="zzz",
+                        model=DEFAULT_GEMINI_EMBEDDING_MODEL,
+                        source="pinterest",
+                        semantic_weight=1.0,
+                        lexical_weight=0.0,
+                    )
+            self.assertEqual([r["id"] for r in report["results"]], ["a2", "a1"])
+            self.assertAlmostEqual(report["results"][0]["semantic_score"], 0.8, places=5)
+            self.assertEqual(report["skipped_dimension_mismatch"], 1)
+
     def test_run_similarity_search_blends_semantic_and_lexical(self):
         with tempfile.TemporaryDirectory() as td:
             db_path = Path(td) / "t.sqlite"
@@ -277,6 +412,172 @@ class TestAiSemantic(unittest.TestCase):
             self.assertEqual(filtered["compared_assets"], 1)
             self.assertEqual(filtered["results"][0]["id"], "a2")
 
+    def test_run_similarity_search_scores_only_filtered_candidates(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for i in range(6):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, board, imported_at) values (?, ?, ?, ?, ?, ?)",
+                        (f"a{i}", "pinterest", f"pin://{i}", f"Asset {i}", "Kitchens" if i % 2 else "Baths", "2026-02-01T00:00:00+00:00"),
+                    )
+                    db.exec(
+                        """
+                        insert into asset_embeddings (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+                        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+                        """,
+                        (f"em{i}", f"a{i}", "gemini", DEFAULT_GEMINI_EMBEDDING_MODEL, "doc", pack_vector([1.0, i / 10.0]), 2),
+                    )
+                db.exec(
+                    """
+                    insert into asset_labels (id, asset_id, label, confidence, source, model, run_id, created_at)
+                    values ('l1', 'a3', 'brass', 0.9, 'ai', 'test', 'r1', datetime('now'))
+                    """
+                )
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[1.0, 0.0]):
+                    by_board = run_similarity_search(db, api_key="fake", query="asset", board="Kitchens", lexical_weight=0.0)
+                    by_label = run_similarity_search(
+                        db, api_key="fake", query="asset", board="Kitchens", label="brass", lexical_weight=0.0
+                    )
+                    nothing = run_similarity_search(db, api_key="fake", query="asset", label="missing")
+            self.assertEqual([r["id"] for r in by_board["results"]], ["a1", "a3", "a5"])
+            self.assertEqual(by_board["searched_vectors"], 3)
+            self.assertEqual([r["id"] for r in by_label["results"]], ["a3"])
+            self.assertEqual(by_label["searched_vectors"], 1)
+            self.assertEqual(nothing["results"], [])
+
+    def test_filtered_search_cache_invalidates_on_membership_changes(self):
+        clear_search_caches()
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for i in range(2):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"a{i}", "pinterest", f"pin://{i}", f"Asset {i}", "2026-02-01T00:00:00+00:00"),
+                    )
+                    db.exec(
+                        """
+                        insert into asset_embeddings (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+                        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+                        """,
+                        (f"em{i}", f"a{i}", "gemini", DEFAULT_GEMINI_EMBEDDING_MODEL, "doc", pack_vector([1.0, i / 10.0]), 2),
+                    )
+                col = create_collection(db, name="Kitchen")
+                add_items_to_collection(db, collection_id=col["id"], asset_ids=["a0"])
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[1.0, 0.0]):
+                    before = run_similarity_search(db, api_key="fake", query="asset", collection_id=col["id"], lexical_weight=0.0)
+                    add_items_to_collection(db, collection_id=col["id"], asset_ids=["a1"])
+                    after_collection = run_similarity_search(
+                        db, api_key="fake", query="asset", collection_id=col["id"], lexical_weight=0.0
+                    )
+                    by_label = run_similarity_search(db, api_key="fake", query="asset", label="brass", lexical_weight=0.0)
+                    db.exec(
+                        """
+                        insert into asset_labels (id, asset_id, label, confidence, source, model, run_id, created_at)
+                        values ('l1', 'a1', 'brass', 0.9, 'ai', 'test', 'r1', datetime('now'))
+                        """
+                    )
+                    after_label = run_similarity_search(db, api_key="fake", query="asset", label="brass", lexical_weight=0.0)
+            self.assertEqual([r["id"] for r in before["results"]], ["a0"])
+            self.assertFalse(after_collection.get("cached"))
+            self.assertEqual(sorted(r["id"] for r in after_collection["results"]), ["a0", "a1"])
+            self.assertEqual(by_label["results"], [])
+            self.assertFalse(after_label.get("cached"))
+            self.assertEqual([r["id"] for r in after_label["results"]], ["a1"])
+
+    def test_run_similar_assets_uses_stored_vectors_and_centroids(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                vectors = {"a0": [1.0, 0.0], "a1": [0.9, 0.1], "a2": [0.0, 1.0], "a3": [0.1, 0.9], "a4": [0.7, 0.7]}
+                for i, (aid, vec) in enumerate(vectors.items()):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                        (aid, "pinterest", f"pin://{aid}", aid, "2026-02-01T00:00:00+00:00"),
+                    )
+                    db.exec(
+                        """
+                        insert into asset_embeddings (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+                        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+                        """,
+                        (f"em{i}", aid, "gemini", DEFAULT_GEMINI_EMBEDDING_MODEL, aid, pack_vector(vec), 2),
+                    )
+                db.exec("insert into tray_items (asset_id, added_at) values ('a0', datetime('now'))")
+                db.exec("insert into tray_items (asset_id, added_at) values ('a2', datetime('now'))")
+                with mock.patch("inspirations.ai._gemini_embed_text") as embed:
+                    like_one = run_similar_assets(db, asset_id="a0", limit=2)
+                    like_tray = run_similar_assets(db, tray=True, limit=1)
+                embed.assert_not_called()
+                with self.assertRaises(ValueError):
+                    run_similar_assets(db, asset_id="missing")
+            self.assertEqual([r["id"] for r in like_one["results"]], ["a1", "a4"])
+            self.assertEqual(like_one["seed"], {"asset_id": "a0", "embedded_assets": 1, "assets": 1})
+            self.assertEqual([r["id"] for r in like_tray["results"]], ["a4"])
+
+    def test_lexical_index_matches_document_scorer_and_follows_ai_updates(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                if not has_asset_lexical(db):
+                    self.skipTest("SQLite build without FTS5")
+                for i, (title, notes) in enumerate(
+                    [("Oak kitchen island", ""), ("Walnut kitchen", "island seating"), ("Living room", "")]
+                ):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, notes, imported_at) values (?, ?, ?, ?, ?, ?)",
+                        (f"a{i}", "pinterest", f"pin://{i}", title, notes, "2026-02-01T00:00:00+00:00"),
+                    )
+                    db.exec(
+                        """
+                        insert into asset_embeddings (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+                        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+                        """,
+                        (f"em{i}", f"a{i}", "gemini", DEFAULT_GEMINI_EMBEDDING_MODEL, title, pack_vector([1.0, i]), 2),
+                    )
+                db.exec(
+                    """
+                    insert into asset_ai (id, asset_id, provider, model, summary, json, created_at)
+                    values ('ai1', 'a2', 'gemini', 'm', 'Bright room', '{"elements": ["island"]}', datetime('now'))
+                    """
+                )
+
+                def _search():
+                    with mock.patch("inspirations.ai._gemini_embed_text", return_value=[1.0, 0.0]):
+                        report = run_similarity_search(
+                            db, api_key="fake", query="kitchen island", model=DEFAULT_GEMINI_EMBEDDING_MODEL
+                        )
+                    return {r["id"]: r["lexical_score"] for r in report["results"]}
+
+                indexed = _search()
+                with mock.patch("inspirations.ai.has_asset_lexical", return_value=False):
+                    clear_search_caches()
+                    scanned = _search()
+                self.assertEqual(indexed, scanned)
+                self.assertEqual(indexed, {"a0": 1.0, "a1": 1.0, "a2": 0.5})
+
+                db.exec("update asset_ai set json='{}' where id='ai1'")
+                self.assertEqual(_search()["a2"], 0.0)
+
+    def test_lexical_index_matches_accented_terms(self):
+        with tempfile.TemporaryDirectory() as td:
+            with Db(Path(td) / "t.sqlite") as db:
+                ensure_schema(db)
+                if not has_asset_lexical(db):
+                    self.skipTest("SQLite build without FTS5")
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                    ("a0", "pinterest", "pin://0", "Café kitchen", "2026-02-01T00:00:00+00:00"),
+                )
+                for query in ("café", "CAFE", "café kitchen"):
+                    self.assertEqual(_lexical_scores(db, query), {"a0": 1.0}, query)
+                    self.assertEqual(_lexical_overlap_score(query, "Café kitchen"), 1.0, query)
+
+
 
 if __name__ == "__main__":
     unittest.main()
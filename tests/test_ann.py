@@ -0,0 +1,89 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from inspirations.ai import DEFAULT_GEMINI_EMBEDDING_MODEL, run_similarity_search
+from inspirations.ann import IvfIndex, build_ivf_index, clear_ivf_cache, ivf_path
+from inspirations.db import Db, ensure_schema
+from inspirations.embedding_index import clear_embedding_index_cache
+from inspirations.vectors import np, pack_vector
+
+MODEL = DEFAULT_GEMINI_EMBEDDING_MODEL
+
+
+def _insert(db: Db, asset_id: str, vector: list[float]) -> None:
+    db.exec(
+        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+        (asset_id, "pinterest", f"pin://{asset_id}", asset_id),
+    )
+    db.exec(
+        """
+        insert into asset_embeddings
+          (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+        """,
+        (f"em-{asset_id}", asset_id, "gemini", MODEL, asset_id, pack_vector(vector), len(vector)),
+    )
+
+
+@unittest.skipIf(np is None, "NumPy not installed")
+class TestAnn(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_embedding_index_cache()
+        clear_ivf_cache()
+
+    def _seed(self, db: Db, n: int = 300) -> None:
+        rng = np.random.default_rng(1)
+        centers = rng.standard_normal((6, 16))
+        for i in range(n):
+            _insert(db, f"a{i:03d}", list(centers[i % 6] + 0.05 * rng.standard_normal(16)))
+
+    def test_build_persists_index_and_reports_recall(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                self._seed(db)
+                report = build_ivf_index(db, provider="gemini", model=MODEL, nlist=6)
+            built = report["indexes"][0]
+            self.assertEqual(built["vectors"], 300)
+            self.assertEqual(built["nlist"], 6)
+            self.assertTrue(ivf_path(db_path, provider="gemini", model=MODEL, dims=16).exists())
+            self.assertEqual(built["recall"][-1]["recall_at_k"], 1.0)
+
+    def test_ivf_search_matches_exact_and_inserts_new_vectors(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            query = [1.0] + [0.0] * 15
+            with Db(db_path) as db:
+                ensure_schema(db)
+                self._seed(db)
+                build_ivf_index(db, provider="gemini", model=MODEL, nlist=6, evaluate=False)
+                _insert(db, "fresh", query)
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=query):
+                    exact = run_similarity_search(db, api_key="fake", query="zzz", model=MODEL, lexical_weight=0.0, limit=5)
+                    approx = run_similarity_search(
+                        db, api_key="fake", query="zzz", model=MODEL, lexical_weight=0.0, limit=5, index="ivf", nprobe=2
+                    )
+            persisted = IvfIndex.load(ivf_path(db_path, provider="gemini", model=MODEL, dims=16))
+            self.assertEqual(approx["results"][0]["id"], "fresh")
+            self.assertEqual(approx["results"][0]["id"], exact["results"][0]["id"])
+            self.assertLess(approx["searched_vectors"], exact["searched_vectors"])
+            self.assertIn("fresh", persisted.ids)
+
+    def test_ivf_trains_on_first_search(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                self._seed(db, n=50)
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[1.0] + [0.0] * 15):
+                    report = run_similarity_search(db, api_key="fake", query="zzz", model=MODEL, index="ivf")
+            self.assertEqual(report["index"], "ivf")
+            self.assertTrue(report["results"])
+            self.assertTrue(ivf_path(db_path, provider="gemini", model=MODEL, dims=16).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from inspirations.db import SCHEMA_VERSION, ConnectionPool, Db, ensure_schema, schema_version
+from inspirations.vectors import pack_vector
+
+
+class TestDb(unittest.TestCase):
+    def test_pool_reuses_connection_in_wal_mode(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            pool = ConnectionPool(db_path, busy_timeout_ms=1234)
+            try:
+                with Db(db_path, pool=pool) as db:
+                    ensure_schema(db)
+                    first = db.conn
+                    mode = db.query_value("pragma journal_mode;")
+                    timeout = db.query_value("pragma busy_timeout;")
+                    fk = db.query_value("pragma foreign_keys;")
+                with Db(db_path, pool=pool) as db:
+                    second = db.conn
+            finally:
+                pool.close()
+            self.assertIs(first, second)
+            self.assertEqual(mode, "wal")
+            self.assertEqual(timeout, 1234)
+            self.assertEqual(fk, 1)
+
+    def test_pool_rolls_back_on_error_and_keeps_connection(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            pool = ConnectionPool(db_path)
+            try:
+                with Db(db_path, pool=pool) as db:
+                    ensure_schema(db)
+                with self.assertRaises(RuntimeError):
+                    with Db(db_path, pool=pool) as db:
+                        db.exec(
+                            "insert into assets (id, source, source_ref, imported_at) values (?, ?, ?, datetime('now'))",
+                            ("a1", "pinterest", "pin://1"),
+                        )
+                        raise RuntimeError("boom")
+                with Db(db_path, pool=pool) as db:
+                    count = db.query_value("select count(*) from assets")
+            finally:
+                pool.close()
+            self.assertEqual(count, 0)
+
+    def test_pool_readers_see_writes_from_other_threads(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            pool = ConnectionPool(db_path)
+            try:
+                with Db(db_path, pool=pool) as db:
+                    ensure_schema(db)
+
+                def _writer() -> None:
+                    with Db(db_path) as db:
+                        db.exec(
+                            "insert into assets (id, source, source_ref, imported_at) values (?, ?, ?, datetime('now'))",
+                            ("a1", "pinterest", "pin://1"),
+                        )
+
+                t = threading.Thread(target=_writer)
+                t.start()
+                t.join()
+                with Db(db_path, pool=pool) as db:
+                    count = db.query_value("select count(*) from assets")
+            finally:
+                pool.close()
+            self.assertEqual(count, 1)
+
+    def test_ensure_schema_records_version_and_skips_ddl_when_current(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                self.assertEqual(schema_version(db), 0)
+                ensure_schema(db)
+                self.assertEqual(schema_version(db), SCHEMA_VERSION)
+            statements: list[str] = []
+            with Db(db_path) as db:
+                db.conn.set_trace_callback(statements.append)
+                ensure_schema(db)
+                db.conn.set_trace_callback(None)
+            self.assertEqual(len(statements), 1)
+            self.assertTrue(statements[0].lstrip().lower().startswith("select version"))
+
+    def test_ensure_schema_upgrades_unversioned_database(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, imported_at) values (?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1"),
+                )
+                db.exec("drop table schema_version")
+            with Db(db_path) as db:
+                ensure_schema(db)
+                version = schema_version(db)
+                count = db.query_value("select count(*) from assets")
+            self.assertEqual(version, SCHEMA_VERSION)
+            self.assertEqual(count, 1)
+
+    def test_embedding_blob_migration_backfills_json_vectors(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, imported_at) values (?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1"),
+                )
+                db.exec(
+                    """
+                    insert into asset_embeddings (id, asset_id, provider, model, input_text, vector_json, dimensions, created_at)
+                    values (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+                    """,
+                    ("em1", "a1", "gemini", "m", "doc", "[3.0, 4.0]", 2),
+                )
+                db.exec("drop table schema_version")
+            with Db(db_path) as db:
+                ensure_schema(db)
+                row = db.query("select vector_json, vector_f32 from asset_embeddings where id='em1'")[0]
+            self.assertEqual(row["vector_json"], "")
+            self.assertEqual(row["vector_f32"], pack_vector([3.0, 4.0]))
+
+    def test_upgrade_backfills_card_fields_for_existing_ai_rows(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, imported_at) values (?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1"),
+                )
+                db.exec(
+                    "insert into asset_ai (id, asset_id, provider, json, created_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("ai1", "a1", "mock", '{"rooms": ["kitchen"], "colors": ["red"], "image_type": "photo"}'),
+                )
+                # Simulate a library written before the card columns were populated.
+                db.exec("update asset_ai_latest set label_count = 0, top_tags = '[]', image_type = null")
+                db.exec("drop table schema_version")
+            with Db(db_path) as db:
+                ensure_schema(db)
+                row = db.query("select image_type, label_count, top_tags from asset_ai_latest where asset_id='a1'")[0]
+            self.assertEqual(row["image_type"], "photo")
+            self.assertEqual(row["label_count"], 2)
+            self.assertEqual(row["top_tags"], '["kitchen","red"]')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from inspirations.ai import DEFAULT_GEMINI_EMBEDDING_MODEL, run_gemini_image_labeler, run_gemini_text_embedder
+from inspirations.db import Db, ensure_schema
+from inspirations.duplicates import (
+    BKTree,
+    dhash_from_pixels,
+    find_duplicate_clusters,
+    hamming,
+    load_hash_tree,
+    mark_duplicates,
+    record_dhash,
+)
+from inspirations.store import delete_assets, list_assets
+from inspirations.thumbnails import generate_thumbnails
+
+
+def _insert(db: Db, asset_id: str, imported_at: str, dhash: str | None = None) -> None:
+    db.exec(
+        "insert into assets (id, source, source_ref, title, imported_at, dhash) values (?, ?, ?, ?, ?, ?)",
+        (asset_id, "pinterest", f"pin://{asset_id}", asset_id, imported_at, dhash),
+    )
+
+
+class TestDuplicates(unittest.TestCase):
+    def test_dhash_from_pixels_tracks_gradients(self):
+        rising = list(range(9)) * 8
+        self.assertEqual(dhash_from_pixels(rising), (1 << 64) - 1)
+        self.assertEqual(dhash_from_pixels([5] * 72), 0)
+        brighter = [min(255, p * 20 + 10) for p in rising]
+        self.assertEqual(dhash_from_pixels(brighter), dhash_from_pixels(rising))
+
+    def test_bk_tree_matches_brute_force(self):
+        rng = random.Random(7)
+        values = [rng.getrandbits(64) for _ in range(300)]
+        tree = BKTree()
+        for i, v in enumerate(values):
+            tree.add(v, i)
+        for probe in values[:20] + [rng.getrandbits(64) for _ in range(5)]:
+            expected = sorted(i for i, v in enumerate(values) if hamming(v, probe) <= 24)
+            self.assertEqual(sorted(i for _, i in tree.search(probe, 24)), expected)
+
+    def test_record_dhash_clusters_and_hide_filter(self):
+        with tempfile.TemporaryDirectory() as td:
+            with Db(Path(td) / "t.sqlite") as db:
+                ensure_schema(db)
+                _insert(db, "pin", "2026-01-01T00:00:00+00:00", "f0f0f0f0f0f0f0f0")
+                _insert(db, "fb", "2026-01-02T00:00:00+00:00")
+                _insert(db, "scan", "2026-01-03T00:00:00+00:00")
+                _insert(db, "other", "2026-01-04T00:00:00+00:00")
+                tree = load_hash_tree(db)
+                self.assertEqual(record_dhash(db, tree, asset_id="fb", dhash="f0f0f0f0f0f0f0f1"), "pin")
+                self.assertEqual(record_dhash(db, tree, asset_id="scan", dhash="f0f0f0f0f0f0f0f3"), "pin")
+                self.assertIsNone(record_dhash(db, tree, asset_id="other", dhash="0f0f0f0f0f0f0f0f"))
+
+                self.assertEqual(find_duplicate_clusters(db), [["pin", "fb", "scan"]])
+                self.assertEqual(sorted(a["id"] for a in list_assets(db, hide_duplicates=True)), ["other", "pin"])
+
+                delete_assets(db, asset_ids=["pin"])
+                rows = {r["id"]: r["duplicate_of"] for r in db.query("select id, duplicate_of from assets")}
+                self.assertEqual(rows, {"fb": None, "scan": "fb", "other": None})
+
+    def test_mark_duplicates_recomputes_with_distance(self):
+        with tempfile.TemporaryDirectory() as td:
+            with Db(Path(td) / "t.sqlite") as db:
+                ensure_schema(db)
+                _insert(db, "a", "2026-01-01T00:00:00+00:00", "0000000000000000")
+                _insert(db, "b", "2026-01-02T00:00:00+00:00", "000000000000000f")
+                _insert(db, "c", "2026-01-03T00:00:00+00:00", "00000000000000ff")
+                self.assertEqual(mark_duplicates(db, max_distance=4)["duplicates"], 2)
+                self.assertEqual(
+                    [r["duplicate_of"] for r in db.query("select duplicate_of from assets order by id")],
+                    [None, "a", "a"],
+                )
+                self.assertEqual(mark_duplicates(db, max_distance=2)["clusters"], 0)
+
+    def test_generate_thumbnails_records_hashes(self):
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                for i, aid in enumerate(["a1", "a2"]):
+                    stored = base / f"{aid}.jpg"
+                    stored.write_bytes(b"jpg")
+                    db.exec(
+                        "insert into assets (id, source, source_ref, imported_at, stored_path) values (?, ?, ?, ?, ?)",
+                        (aid, "facebook", f"fb://{aid}", f"2026-01-0{i + 1}T00:00:00+00:00", str(stored)),
+                    )
+                with mock.patch("inspirations.thumbnails._make_thumb"), mock.patch(
+                    "inspirations.thumbnails.compute_dhash", return_value="1234123412341234"
+                ):
+                    report = generate_thumbnails(db, store_dir=base / "store", tool="sips")
+                rows = db.query("select id, dhash, duplicate_of from assets order by id")
+            self.assertEqual(report["generated"], 2)
+            self.assertEqual(report["duplicates"], 1)
+            self.assertEqual([(r["dhash"], r["duplicate_of"]) for r in rows], [("1234123412341234", None), ("1234123412341234", "a1")])
+
+    def test_skip_duplicates_shares_canonical_tags_and_embedding(self):
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            (base / "pin.jpg").write_bytes(b"\xff\xd8\xff")
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                _insert(db, "pin", "2026-01-01T00:00:00+00:00")
+                _insert(db, "fb", "2026-01-02T00:00:00+00:00")
+                db.exec("update assets set thumb_path=? where id='pin'", (str(base / "pin.jpg"),))
+                db.exec("update assets set duplicate_of='pin' where id='fb'")
+                payload = '{"summary": "Oak kitchen", "rooms": ["kitchen"], "materials": ["oak"]}'
+                with mock.patch(
+                    "inspirations.ai._maybe_retry_with_recitation_fallback", return_value=({}, "m")
+                ) as call, mock.patch("inspirations.ai._extract_response_text", return_value=payload):
+                    tagged = run_gemini_image_labeler(db, api_key="fake", model="m", preflight=False, skip_duplicates=True)
+                with mock.patch(
+                    "inspirations.ai._gemini_batch_embed_texts", side_effect=lambda **kw: [[1.0, 0.0] for _ in kw["texts"]]
+                ) as embed:
+                    embedded = run_gemini_text_embedder(db, api_key="fake", skip_duplicates=True)
+                labels = {
+                    r["asset_id"]: r["labels"]
+                    for r in db.query(
+                        "select asset_id, group_concat(label, ',') as labels from "
+                        "(select asset_id, label from asset_labels order by label) group by asset_id"
+                    )
+                }
+                cards = {r["asset_id"]: (r["label_count"], r["top_tags"]) for r in db.query("select * from asset_ai_latest")}
+                vectors = {
+                    r["asset_id"]: r["vector_f32"]
+                    for r in db.query("select asset_id, vector_f32 from asset_embeddings where model=?", (DEFAULT_GEMINI_EMBEDDING_MODEL,))
+                }
+
+            self.assertEqual((call.call_count, tagged["attempted"], tagged["shared_with_duplicates"]), (1, 1, 1))
+            self.assertEqual(labels["fb"], labels["pin"])
+            self.assertEqual(cards["fb"], cards["pin"])
+            self.assertEqual((embed.call_count, embedded["embedded_assets"], embedded["shared_with_duplicates"]), (1, 1, 1))
+            self.assertEqual(vectors["fb"], vectors["pin"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from inspirations.ai import DEFAULT_GEMINI_EMBEDDING_MODEL, run_similarity_search
+from inspirations.db import Db, ensure_schema
+from inspirations.embedding_index import clear_embedding_index_cache, get_embedding_index, top_indices
+from inspirations.vectors import pack_vector
+
+
+def _insert(db: Db, asset_id: str, title: str, vector: list[float]) -> None:
+    db.exec(
+        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+        (asset_id, "pinterest", f"pin://{asset_id}", title),
+    )
+    db.exec(
+        """
+        insert into asset_embeddings
+          (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+        """,
+        (f"em-{asset_id}", asset_id, "gemini", DEFAULT_GEMINI_EMBEDDING_MODEL, title, pack_vector(vector), len(vector)),
+    )
+
+
+class TestEmbeddingIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_embedding_index_cache()
+
+    def test_index_is_cached_until_embeddings_change(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                _insert(db, "a1", "one", [1.0, 0.0])
+                first = get_embedding_index(db, provider="gemini", model=DEFAULT_GEMINI_EMBEDDING_MODEL)
+                again = get_embedding_index(db, provider="gemini", model=DEFAULT_GEMINI_EMBEDDING_MODEL)
+                _insert(db, "a2", "two", [0.0, 1.0])
+                rebuilt = get_embedding_index(db, provider="gemini", model=DEFAULT_GEMINI_EMBEDDING_MODEL)
+                db.exec("delete from assets where id='a1'")
+                after_delete = get_embedding_index(db, provider="gemini", model=DEFAULT_GEMINI_EMBEDDING_MODEL)
+            self.assertIs(first, again)
+            self.assertEqual(first.size, 1)
+            self.assertEqual(rebuilt.size, 2)
+            self.assertEqual(after_delete.group(2).ids, ["a2"])
+
+    def test_top_indices_with_and_without_numpy(self):
+        scores = [0.1, 0.9, 0.5, 0.7]
+        self.assertEqual(top_indices(scores, 2), [1, 3])
+        with mock.patch("inspirations.embedding_index.np", None):
+            self.assertEqual(top_indices(scores, 2), [1, 3])
+            self.assertEqual(top_indices(scores, 2, {0, 2}), [2, 0])
+
+    def test_search_matches_without_numpy(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                _insert(db, "a1", "one", [1.0, 0.0])
+                _insert(db, "a2", "two", [0.6, 0.8])
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[0.0, 1.0]):
+                    with mock.patch("inspirations.embedding_index.np", None), mock.patch("inspirations.vectors.np", None):
+                        report = run_similarity_search(
+                            db, api_key="fake", query="zzz", model=DEFAULT_GEMINI_EMBEDDING_MODEL, lexical_weight=0.0
+                        )
+            self.assertEqual([r["id"] for r in report["results"]], ["a2", "a1"])
+            self.assertAlmostEqual(report["results"][0]["semantic_score"], 0.8, places=5)
+
+    def test_blended_search_reaches_lexical_matches_outside_vector_pool(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for i in range(150):
+                    _insert(db, f"n{i:03d}", "plain", [1.0, 0.01 * i])
+                _insert(db, "match", "walnut credenza", [0.0, 1.0])
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[1.0, 0.0]):
+                    report = run_similarity_search(
+                        db,
+                        api_key="fake",
+                        query="walnut credenza",
+                        model=DEFAULT_GEMINI_EMBEDDING_MODEL,
+                        limit=5,
+                        semantic_weight=0.3,
+                        lexical_weight=0.7,
+                    )
+            self.assertEqual(report["results"][0]["id"], "match")
+            self.assertEqual(report["searched_vectors"], 151)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import contextlib
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from inspirations.http_pool import HttpPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/redirect-private":
+            self.send_response(302)
+            self.send_header("Location", "http://10.0.0.1/secret")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = f"ok {self.path}".encode()
+        if self.path == "/image":
+            body = b"\xff\xd8\xff" + b"x" * 1024
+        if self.path == "/host":
+            body = self.headers["Host"].encode()
+        self.send_response(404 if self.path == "/missing" else 200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def _loopback_allowed(public_peer=True):
+    with mock.patch("inspirations.http_pool.is_safe_public_url", return_value=True), mock.patch(
+        "inspirations.http_pool.public_addresses", return_value=["127.0.0.1"]
+    ), mock.patch("inspirations.http_pool.is_public_ip", return_value=public_peer):
+        yield
+
+
+class TestHttpPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _open(self, pool, path):
+        with pool.open(self.base + path, allow_http=True, timeout_s=5) as resp:
+            return resp.read()
+
+    def test_reuses_connections_to_the_same_host(self):
+        pool = HttpPool()
+        with _loopback_allowed():
+            self.assertEqual(self._open(pool, "/a"), b"ok /a")
+            self.assertEqual(self._open(pool, "/b"), b"ok /b")
+            with self.assertRaises(Exception) as ctx:
+                self._open(pool, "/missing")
+            self.assertIn("404", str(ctx.exception))
+            self.assertEqual(self._open(pool, "/c"), b"ok /c")
+        self.assertEqual((pool.opened, pool.reused), (1, 3))
+        pool.clear()
+
+    def test_small_unread_bodies_are_drained_and_connection_reused(self):
+        pool = HttpPool()
+        with _loopback_allowed():
+            for _ in range(3):
+                with pool.open(self.base + "/image", allow_http=True, timeout_s=5) as resp:
+                    self.assertEqual(resp.status, 200)
+            self.assertEqual(self._open(pool, "/a"), b"ok /a")
+        self.assertEqual((pool.opened, pool.reused), (1, 3))
+        pool.clear()
+
+    def test_idle_connections_expire(self):
+        pool = HttpPool(idle_timeout_s=0)
+        with _loopback_allowed():
+            self._open(pool, "/a")
+            self._open(pool, "/b")
+        self.assertEqual((pool.opened, pool.reused), (2, 0))
+        pool.clear()
+
+    def test_refuses_non_public_peer(self):
+        pool = HttpPool()
+        with _loopback_allowed(public_peer=False):
+            with self.assertRaises(ValueError) as ctx:
+                self._open(pool, "/a")
+        self.assertIn("non-public address 127.0.0.1", str(ctx.exception))
+
+    def test_connects_to_validated_address_and_keeps_host_header(self):
+        pool = HttpPool()
+        port = self.server.server_address[1]
+        with _loopback_allowed():
+            with pool.open(f"http://images.example.invalid:{port}/host", allow_http=True, timeout_s=5) as resp:
+                self.assertEqual(resp.read(), f"images.example.invalid:{port}".encode())
+        pool.clear()
+
+    def test_checks_every_redirect_hop(self):
+        pool = HttpPool()
+        with _loopback_allowed(), mock.patch(
+            "inspirations.http_pool.is_safe_public_url", side_effect=lambda u, allow_http=False: "10.0.0.1" not in u
+        ):
+            with self.assertRaises(ValueError) as ctx:
+                self._open(pool, "/redirect-private")
+        self.assertIn("http://10.0.0.1/secret", str(ctx.exception))
+        pool.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
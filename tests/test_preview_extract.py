@@ -1,7 +1,13 @@
 import unittest
 from unittest import mock
 
-from inspirations.storage import _extract_preview_image, _youtube_thumb_url, resolve_image_url
+from inspirations.storage import (
+    _extract_preview_image,
+    _extract_preview_image_candidates,
+    _PreviewScanner,
+    _youtube_thumb_url,
+    resolve_image_url,
+)
 
 
 class _FakeResponse:
@@ -63,10 +69,10 @@ class TestPreviewExtract(unittest.TestCase):
         self.assertEqual(_youtube_thumb_url(url), "https://img.youtube.com/vi/Ipm3nwuABmQ/hqdefault.jpg")
 
     @mock.patch("inspirations.storage.is_safe_public_url")
-    @mock.patch("inspirations.storage.urllib.request.urlopen")
-    def test_resolve_image_url_upgrades_http_preview_to_https(self, mock_urlopen, mock_is_safe):
+    @mock.patch("inspirations.storage.open_url")
+    def test_resolve_image_url_upgrades_http_preview_to_https(self, mock_open_url, mock_is_safe):
         html = '<meta property="og:image" content="http://cdn.example.com/hero.jpg" />'
-        mock_urlopen.return_value = _FakeResponse("text/html; charset=utf-8", html)
+        mock_open_url.return_value = _FakeResponse("text/html; charset=utf-8", html)
         mock_is_safe.side_effect = lambda u, allow_http=False: u in (
             "https://site.example/page",
             "https://cdn.example.com/hero.jpg",
@@ -74,19 +80,60 @@ class TestPreviewExtract(unittest.TestCase):
         self.assertEqual(resolve_image_url("https://site.example/page"), "https://cdn.example.com/hero.jpg")
 
     @mock.patch("inspirations.storage.is_safe_public_url", return_value=True)
-    @mock.patch("inspirations.storage.urllib.request.urlopen")
-    def test_resolve_image_url_skips_tracking_pixel_candidates(self, mock_urlopen, _mock_is_safe):
+    @mock.patch("inspirations.storage.open_url")
+    def test_resolve_image_url_skips_tracking_pixel_candidates(self, mock_open_url, _mock_is_safe):
         html = '<meta property="og:image" content="https://ct.pinterest.com/v3/?event=init&tid=1" />'
-        mock_urlopen.return_value = _FakeResponse("text/html; charset=utf-8", html)
+        mock_open_url.return_value = _FakeResponse("text/html; charset=utf-8", html)
         self.assertIsNone(resolve_image_url("https://site.example/page"))
 
     @mock.patch("inspirations.storage.is_safe_public_url", return_value=True)
-    @mock.patch("inspirations.storage.urllib.request.urlopen")
-    def test_resolve_image_url_uses_img_fallback(self, mock_urlopen, _mock_is_safe):
+    @mock.patch("inspirations.storage.open_url")
+    def test_resolve_image_url_uses_img_fallback(self, mock_open_url, _mock_is_safe):
         html = '<html><body><img src="/assets/hero.png" /></body></html>'
-        mock_urlopen.return_value = _FakeResponse("text/html; charset=utf-8", html)
+        mock_open_url.return_value = _FakeResponse("text/html; charset=utf-8", html)
         self.assertEqual(resolve_image_url("https://site.example/page"), "https://site.example/assets/hero.png")
 
+    def test_candidates_are_ranked_by_tag_priority(self):
+        html = """
+        <html><head>
+        <link rel="image_src" href="https://example.com/link.jpg">
+        <meta name="twitter:image" content="https://example.com/tw.jpg">
+        <meta property="og:image" content="https://example.com/og.jpg">
+        <meta property="OG:IMAGE:SECURE_URL" content='https://example.com/secure.jpg?a=1&amp;b=2'>
+        </head><body><img src="https://example.com/img.jpg"></body></html>
+        """
+        self.assertEqual(
+            _extract_preview_image_candidates(html),
+            [
+                "https://example.com/secure.jpg?a=1&b=2",
+                "https://example.com/og.jpg",
+                "https://example.com/tw.jpg",
+                "https://example.com/link.jpg",
+            ],
+        )
+        self.assertEqual(
+            _extract_preview_image_candidates('<img src="data:image/png;base64,xx"><img data-src="/lazy.jpg"><img src="/a.jpg">'),
+            ["/a.jpg", "/lazy.jpg"],
+        )
+
+    def test_scanner_handles_tags_split_across_chunks(self):
+        html = '<head><title>x</title><meta content="https://example.com/c.webp" property="og:image" /></head><body>'
+        for cut in range(1, len(html)):
+            scanner = _PreviewScanner()
+            scanner.feed(html[:cut])
+            scanner.feed(html[cut:])
+            self.assertEqual(scanner.candidates(), ["https://example.com/c.webp"], cut)
+            self.assertTrue(scanner.done)
+
+    @mock.patch("inspirations.storage.is_safe_public_url", return_value=True)
+    @mock.patch("inspirations.storage.open_url")
+    def test_resolve_image_url_stops_reading_after_head(self, mock_open_url, _mock_is_safe):
+        html = '<html><head><meta property="og:image" content="https://cdn.example.com/a.jpg"></head><body>' + "x" * 400_000
+        resp = _FakeResponse("text/html", html)
+        mock_open_url.return_value = resp
+        self.assertEqual(resolve_image_url("https://site.example/page"), "https://cdn.example.com/a.jpg")
+        self.assertLessEqual(resp._cursor, 16 * 1024)
+
 
 if __name__ == "__main__":
     unittest.main()
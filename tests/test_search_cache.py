@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from inspirations.ai import DEFAULT_GEMINI_EMBEDDING_MODEL, run_similarity_search
+from inspirations.db import Db, ensure_schema
+from inspirations.search_cache import cached_query_embedding, clear_search_caches
+from inspirations.vectors import pack_vector
+
+MODEL = DEFAULT_GEMINI_EMBEDDING_MODEL
+
+
+def _insert(db: Db, asset_id: str, vector: list[float]) -> None:
+    db.exec(
+        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+        (asset_id, "pinterest", f"pin://{asset_id}", asset_id),
+    )
+    db.exec(
+        """
+        insert into asset_embeddings
+          (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+        values (?, ?, ?, ?, ?, '', ?, ?, datetime('now'))
+        """,
+        (f"em-{asset_id}", asset_id, "gemini", MODEL, asset_id, pack_vector(vector), len(vector)),
+    )
+
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_search_caches()
+
+    def test_query_embedding_survives_process_cache_and_evicts_by_size(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            embed = mock.Mock(return_value=[3.0, 4.0])
+            with Db(db_path) as db:
+                ensure_schema(db)
+                first = cached_query_embedding(db, model=MODEL, task_type="RETRIEVAL_QUERY", text="Oak  Kitchen", embed=embed)
+                clear_search_caches()
+                second = cached_query_embedding(db, model=MODEL, task_type="RETRIEVAL_QUERY", text="oak kitchen", embed=embed)
+                with mock.patch("inspirations.search_cache.QUERY_EMBEDDING_CACHE_ROWS", 1):
+                    cached_query_embedding(db, model=MODEL, task_type="RETRIEVAL_QUERY", text="walnut", embed=embed)
+                rows = [r["query_norm"] for r in db.query("select query_norm from query_embedding_cache")]
+            self.assertEqual(embed.call_count, 2)
+            self.assertAlmostEqual(first[0], 0.6, places=6)
+            self.assertEqual(first, second)
+            self.assertEqual(rows, ["walnut"])
+
+    def test_repeated_and_paginated_searches_skip_embedding_until_library_changes(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for i in range(5):
+                    _insert(db, f"a{i}", [1.0, 0.1 * i])
+                with mock.patch("inspirations.ai._gemini_embed_text", return_value=[0.0, 1.0]) as embed:
+                    first = run_similarity_search(db, api_key="fake", query="zzz", model=MODEL, limit=2)
+                    calls_after_first = embed.call_count
+                    page2 = run_similarity_search(db, api_key="fake", query="ZZZ", model=MODEL, limit=2, offset=2)
+                    _insert(db, "a5", [0.0, 1.0])
+                    after_change = run_similarity_search(db, api_key="fake", query="zzz", model=MODEL, limit=2)
+            self.assertEqual(calls_after_first, 1)
+            self.assertEqual(embed.call_count, 1)
+            self.assertFalse(first["cached"])
+            self.assertTrue(page2["cached"])
+            self.assertEqual([r["id"] for r in first["results"]], ["a4", "a3"])
+            self.assertEqual([r["id"] for r in page2["results"]], ["a2", "a1"])
+            self.assertFalse(after_change["cached"])
+            self.assertEqual(after_change["results"][0]["id"], "a5")
+
+
+if __name__ == "__main__":
+    unittest.main()
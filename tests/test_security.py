@@ -5,6 +5,9 @@ from inspirations import security
 
 
 class TestSecurity(unittest.TestCase):
+    def setUp(self):
+        security.clear_dns_cache()
+
     def test_blocks_non_http(self):
         self.assertFalse(security.is_safe_public_url("file:///etc/passwd"))
         self.assertFalse(security.is_safe_public_url("ftp://example.com/x"))
@@ -24,6 +27,31 @@ class TestSecurity(unittest.TestCase):
     def test_allowlisted_hosts_pass_without_dns(self):
         self.assertTrue(security.is_safe_public_url("https://i.pinimg.com/originals/a/b/c.jpg"))
 
+    def test_dns_lookups_are_cached_per_ttl(self):
+        with mock.patch.object(security, "resolve_host", return_value=["93.184.216.34"]) as resolve:
+            for _ in range(3):
+                self.assertTrue(security.is_safe_public_url("https://example.com/x"))
+            self.assertEqual(security.public_addresses("example.com"), ["93.184.216.34"])
+            self.assertEqual(resolve.call_count, 1)
+            with mock.patch.object(security, "DNS_CACHE_TTL_S", 0):
+                security.clear_dns_cache()
+                security.is_safe_public_url("https://example.com/x")
+                security.is_safe_public_url("https://example.com/x")
+            self.assertEqual(resolve.call_count, 3)
+
+    def test_failed_lookups_are_negatively_cached(self):
+        with mock.patch.object(security, "resolve_host", side_effect=OSError("nxdomain")) as resolve:
+            self.assertFalse(security.is_safe_public_url("https://gone.example/x"))
+            self.assertFalse(security.is_safe_public_url("https://gone.example/y"))
+            with self.assertRaises(ValueError):
+                security.public_addresses("gone.example")
+            self.assertEqual(resolve.call_count, 1)
+
+    def test_public_addresses_refuses_private_resolution(self):
+        with mock.patch.object(security, "resolve_host", return_value=["93.184.216.34", "10.0.0.5"]):
+            with self.assertRaises(ValueError):
+                security.public_addresses("mixed.example")
+
 
 if __name__ == "__main__":
     unittest.main()
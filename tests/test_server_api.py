@@ -10,8 +10,11 @@ from http.server import HTTPServer
 from pathlib import Path
 from unittest import mock
 
+from inspirations.ai import DEFAULT_GEMINI_EMBEDDING_MODEL
 from inspirations.db import Db, ensure_schema
 from inspirations.server import ApiHandler
+from inspirations.store import encode_cursor
+from inspirations.vectors import pack_vector
 
 
 class TestServerApi(unittest.TestCase):
@@ -160,6 +163,53 @@ class TestServerApi(unittest.TestCase):
         self.assertEqual(remaining_collection_rows, 0)
         self.assertEqual(remaining_annotations, 0)
 
+    def test_assets_cursor_pagination(self):
+        status, first = self._request("/api/assets?limit=1")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(first["assets"]), 1)
+        self.assertTrue(first.get("next_cursor"))
+
+        status, second = self._request(f"/api/assets?limit=1&cursor={first['next_cursor']}")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(second["assets"]), 1)
+        self.assertIsNone(second.get("next_cursor"))
+        self.assertEqual({first["assets"][0]["id"], second["assets"][0]["id"]}, {"a1", "a2"})
+
+    def test_assets_rejects_invalid_cursor(self):
+        status, body = self._request("/api/assets?cursor=not-a-cursor")
+        self.assertEqual(status, 400)
+        self.assertEqual(body.get("error"), "invalid cursor")
+
+        nested = encode_cursor([[1], {"a": 2}, "a1"])
+        status, body = self._request(f"/api/assets?cursor={nested}")
+        self.assertEqual(status, 400)
+        self.assertEqual(body.get("error"), "invalid cursor")
+
+    def test_assets_card_fields_and_detail_endpoint(self):
+        with Db(self.db_path) as db:
+            db.exec(
+                """
+                insert into asset_ai (id, asset_id, provider, model, summary, json, created_at)
+                values (?, ?, ?, ?, ?, ?, datetime('now'))
+                """,
+                ("ai1", "a1", "gemini", "m", "summary", json.dumps({"rooms": ["kitchen"], "tags": ["oak"]})),
+            )
+        status, body = self._request("/api/assets?fields=card")
+        self.assertEqual(status, 200)
+        card = next(a for a in body["assets"] if a["id"] == "a1")
+        self.assertNotIn("ai_json", card)
+        self.assertEqual(card["ai_top_tags"], ["kitchen", "oak"])
+        self.assertEqual(card["ai_label_count"], 2)
+
+        status, body = self._request("/api/assets/a1")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body["asset"]["ai_json"])["tags"], ["oak"])
+
+        status, _ = self._request("/api/assets/missing")
+        self.assertEqual(status, 404)
+        status, _ = self._request("/api/assets?fields=bogus")
+        self.assertEqual(status, 400)
+
     def test_semantic_search_requires_api_key(self):
         with mock.patch.dict(os.environ, {"GEMINI_API_KEY": ""}, clear=False):
             status, body = self._request("/api/search/similar?q=oak")
@@ -197,12 +247,64 @@ class TestServerApi(unittest.TestCase):
         self.assertEqual(mocked.call_args.kwargs["lexical_weight"], 0.3)
         self.assertEqual(mocked.call_args.kwargs["min_score"], 0.25)
 
+    def test_semantic_search_passes_filters(self):
+        with mock.patch.dict(os.environ, {"GEMINI_API_KEY": "fake"}, clear=False):
+            with mock.patch("inspirations.server.run_similarity_search", return_value={"results": []}) as mocked:
+                status, _ = self._request("/api/search/similar?q=oak&board=Kitchens&label=oak,walnut&collection_id=c1")
+        self.assertEqual(status, 200)
+        self.assertEqual(mocked.call_args.kwargs["board"], "Kitchens")
+        self.assertEqual(mocked.call_args.kwargs["label"], "oak,walnut")
+        self.assertEqual(mocked.call_args.kwargs["collection_id"], "c1")
+
+    def test_asset_similar_uses_stored_vector(self):
+        with Db(self.db_path) as db:
+            for i, aid in enumerate(["a1", "a2"]):
+                db.exec(
+                    """
+                    insert into asset_embeddings (id, asset_id, provider, model, input_text, vector_json, vector_f32, dimensions, created_at)
+                    values (?, ?, 'gemini', ?, 'doc', '', ?, 2, datetime('now'))
+                    """,
+                    (f"em{i}", aid, DEFAULT_GEMINI_EMBEDDING_MODEL, pack_vector([1.0, float(i)])),
+                )
+        with mock.patch.dict(os.environ, {"GEMINI_API_KEY": ""}, clear=False):
+            status, body = self._request("/api/assets/a1/similar?fields=card")
+            missing_status, _ = self._request("/api/assets/nope/similar")
+            col_status, col_body = self._request("/api/collections/c1/similar")
+        self.assertEqual(status, 200)
+        self.assertEqual([r["id"] for r in body["results"]], ["a2"])
+        self.assertNotIn("ai_json", body["results"][0])
+        self.assertEqual(body["seed"]["asset_id"], "a1")
+        self.assertEqual(missing_status, 404)
+        self.assertEqual(col_status, 200)
+        self.assertEqual(col_body["results"], [])
+
+    def test_semantic_search_card_fields_drop_ai_json(self):
+        fake_report = {"query": "oak", "results": [{"id": "a1", "ai_json": "{}", "ai_top_tags": ["oak"], "score": 0.9}]}
+        with mock.patch.dict(os.environ, {"GEMINI_API_KEY": "fake"}, clear=False):
+            with mock.patch("inspirations.server.run_similarity_search", return_value=fake_report):
+                status, body = self._request("/api/search/similar?q=oak&fields=card")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["results"], [{"id": "a1", "ai_top_tags": ["oak"], "score": 0.9}])
+
+    def test_semantic_search_rejects_unknown_index(self):
+        with mock.patch.dict(os.environ, {"GEMINI_API_KEY": "fake"}, clear=False):
+            status, body = self._request("/api/search/similar?q=oak&index=hnsw")
+        self.assertEqual(status, 400)
+        self.assertIn("index", body.get("error", ""))
+
     def test_semantic_search_rejects_non_numeric_weights(self):
         with mock.patch.dict(os.environ, {"GEMINI_API_KEY": "fake"}, clear=False):
             status, body = self._request("/api/search/similar?q=oak&semantic_weight=fast")
         self.assertEqual(status, 400)
         self.assertEqual(body.get("error"), "semantic_weight must be number")
 
+    def test_semantic_search_value_errors_are_bad_requests(self):
+        with mock.patch.dict(os.environ, {"GEMINI_API_KEY": "fake"}, clear=False):
+            with mock.patch("inspirations.server.run_similarity_search", side_effect=ValueError("bad filter")):
+                status, body = self._request("/api/search/similar?q=oak&label=x")
+        self.assertEqual(status, 400)
+        self.assertEqual(body.get("error"), "bad filter")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+from pathlib import Path
+from unittest import mock
+
+from inspirations.db import Db, ensure_schema
+from inspirations.storage import (
+    HostLimiter,
+    UrlPreview,
+    blob_path,
+    download_and_attach_originals,
+    download_url_to_store,
+    fetch_url_preview,
+    load_url_previews,
+    save_url_previews,
+)
+
+
+def _image_preview(url, cached=None):
+    return UrlPreview(url=url, status="image", image_url=url, fetched_at="2026-01-01T00:00:00+00:00")
+
+
+class _FakeResponse:
+    def __init__(self, status, content_type="", body=b"", headers=None):
+        self.status = status
+        self.headers = {"Content-Type": content_type, **(headers or {})}
+        self._body = body
+
+    def read(self, n=-1):
+        out, self._body = (self._body, b"") if n < 0 else (self._body[:n], self._body[n:])
+        return out
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _TruncatedResponse(_FakeResponse):
+    """Delivers the first 600 bytes, then times out."""
+
+    def read(self, n=-1):
+        if len(self._body) <= len(self._full) - 600:
+            raise TimeoutError("timed out")
+        return super().read(min(n, 300) if n > 0 else 300)
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._full = self._body
+
+
+class TestStorage(unittest.TestCase):
+    def test_originals_are_coalesced_by_url_and_stored_by_content(self):
+        payloads = {
+            "https://cdn.example.com/a.jpg": b"same-bytes",
+            "https://cdn.example.com/b.jpg": b"same-bytes",
+            "https://cdn.example.com/c.jpg": b"other-bytes",
+        }
+        fetched: list[str] = []
+
+        def _fake_download(*, url, dest_dir, filename_stem, **kw):
+            fetched.append(url)
+            dest_dir.mkdir(parents=True, exist_ok=True)
+            out = dest_dir / f"{filename_stem}.jpg"
+            out.write_bytes(payloads[url])
+            return out, hashlib.sha256(payloads[url]).hexdigest(), len(payloads[url])
+
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            store = base / "store"
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                urls = ["a.jpg", "a.jpg", "b.jpg", "c.jpg"]
+                for i, name in enumerate(urls):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, image_url, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"f{i}", "facebook", f"fb://{i}", f"https://cdn.example.com/{name}", f"2026-01-0{i + 1}T00:00:00+00:00"),
+                    )
+                with mock.patch("inspirations.storage.fetch_url_preview", side_effect=_image_preview), mock.patch(
+                    "inspirations.storage.download_url_to_store", side_effect=_fake_download
+                ):
+                    report = download_and_attach_originals(db, store, "facebook")
+                rows = {r["id"]: r["stored_path"] for r in db.query("select id, stored_path from assets")}
+
+            self.assertEqual(report["downloaded"], 4)
+            self.assertEqual(report["fetched"], 3)
+            self.assertEqual(report["unique_files"], 2)
+            self.assertEqual(sorted(fetched), sorted(set(payloads)))
+            same = blob_path(store, hashlib.sha256(b"same-bytes").hexdigest(), ".jpg")
+            self.assertEqual({rows["f0"], rows["f1"], rows["f2"]}, {str(same)})
+            self.assertNotEqual(rows["f3"], str(same))
+            self.assertEqual(same.read_bytes(), b"same-bytes")
+            self.assertEqual(list((store / "originals" / ".incoming").iterdir()), [])
+
+    def test_downloads_run_concurrently_within_per_host_limit(self):
+        lock = threading.Lock()
+        active: dict[str, int] = {}
+        peak: dict[str, int] = {}
+
+        def _fake_download(*, url, dest_dir, filename_stem, **kw):
+            host = url.split("/")[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            dest_dir.mkdir(parents=True, exist_ok=True)
+            out = dest_dir / f"{filename_stem}.jpg"
+            out.write_bytes(url.encode())
+            return out, hashlib.sha256(url.encode()).hexdigest(), len(url)
+
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                for i in range(12):
+                    host = "a.example.com" if i % 2 else "b.example.com"
+                    db.exec(
+                        "insert into assets (id, source, source_ref, image_url, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"p{i}", "pinterest", f"pin://{i}", f"https://{host}/{i}.jpg", f"2026-01-01T00:00:{i:02d}+00:00"),
+                    )
+                with mock.patch("inspirations.storage.fetch_url_preview", side_effect=_image_preview), mock.patch(
+                    "inspirations.storage.download_url_to_store", side_effect=_fake_download
+                ):
+                    report = download_and_attach_originals(
+                        db, base / "store", "pinterest", workers=8, per_host=2, host_interval_s=0
+                    )
+                missing = db.query_value("select count(*) from assets where stored_path is null")
+
+            self.assertEqual(report["downloaded"], 12)
+            self.assertEqual(missing, 0)
+            self.assertEqual(peak, {"a.example.com": 2, "b.example.com": 2})
+
+    def test_host_limiter_spaces_request_starts(self):
+        limiter = HostLimiter(per_host=4, min_interval_s=0.05)
+        starts: list[float] = []
+
+        def _hit():
+            with limiter.slot("https://cdn.example.com/x.jpg"):
+                starts.append(time.monotonic())
+
+        threads = [threading.Thread(target=_hit) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        starts.sort()
+        self.assertGreaterEqual(starts[2] - starts[0], 0.09)
+
+    def test_preview_results_are_cached_and_revalidated(self):
+        page = b'<meta property="og:image" content="https://cdn.example.com/p.jpg">'
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                for i, url in enumerate(["https://example.com/dead", "https://example.com/empty"]):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, image_url, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"f{i}", "facebook", f"fb://{i}", url, f"2026-01-0{i + 1}T00:00:00+00:00"),
+                    )
+
+                def _open(url, **kw):
+                    if url.endswith("/dead"):
+                        raise urllib.error.HTTPError(url, 404, "Not Found", {}, None)
+                    return _FakeResponse(200, "text/html", b"<html></html>", {"ETag": '"v1"'})
+
+                with mock.patch("inspirations.storage.is_safe_public_url", return_value=True), mock.patch(
+                    "inspirations.storage.open_url", side_effect=_open
+                ) as open_mock:
+                    first = download_and_attach_originals(db, base / "store", "facebook")
+                    second = download_and_attach_originals(db, base / "store", "facebook", ignore_backoff=True)
+                cached = load_url_previews(db, ["https://example.com/dead", "https://example.com/empty"])
+
+            self.assertEqual(open_mock.call_count, 2)
+            self.assertEqual((first["preview_cache_hits"], second["preview_cache_hits"]), (0, 2))
+            self.assertEqual(len(second["errors"]), 2)
+            self.assertEqual(cached["https://example.com/dead"].http_status, 404)
+            self.assertEqual(cached["https://example.com/empty"].status, "none")
+            self.assertEqual(cached["https://example.com/empty"].etag, '"v1"')
+
+        stale = UrlPreview(
+            url="https://example.com/pin",
+            status="preview",
+            image_url="https://cdn.example.com/p.jpg",
+            etag='"v1"',
+            fetched_at="2020-01-01T00:00:00+00:00",
+        )
+        with mock.patch("inspirations.storage.is_safe_public_url", return_value=True), mock.patch(
+            "inspirations.storage.open_url", return_value=_FakeResponse(304)
+        ) as open_mock:
+            revalidated = fetch_url_preview(stale.url, cached=stale)
+        self.assertEqual(open_mock.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+        self.assertEqual(revalidated.image_url, "https://cdn.example.com/p.jpg")
+        self.assertNotEqual(revalidated.fetched_at, stale.fetched_at)
+        with mock.patch("inspirations.storage.open_url") as open_mock:
+            self.assertIs(fetch_url_preview(stale.url, cached=revalidated), revalidated)
+        open_mock.assert_not_called()
+        with mock.patch("inspirations.storage.is_safe_public_url", return_value=True), mock.patch(
+            "inspirations.storage.open_url", return_value=_FakeResponse(200, "text/html", page)
+        ):
+            self.assertEqual(fetch_url_preview(stale.url).status, "preview")
+
+    def test_direct_image_urls_skip_the_preview_request(self):
+        with mock.patch("inspirations.storage.is_safe_public_url", return_value=True), mock.patch(
+            "inspirations.storage.open_url"
+        ) as open_mock:
+            preview = fetch_url_preview("https://i.pinimg.com/originals/ab/cd/ef.JPG")
+        open_mock.assert_not_called()
+        self.assertEqual((preview.status, preview.image_url), ("preview", "https://i.pinimg.com/originals/ab/cd/ef.JPG"))
+
+    def test_failed_urls_back_off_and_success_resets(self):
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, image_url, imported_at) values (?, ?, ?, ?, ?)",
+                    ("p0", "pinterest", "pin://0", "https://cdn.example.com/a.jpg", "2026-01-01T00:00:00+00:00"),
+                )
+                with mock.patch("inspirations.storage.fetch_url_preview", side_effect=_image_preview), mock.patch(
+                    "inspirations.storage.download_url_to_store", side_effect=urllib.error.HTTPError("u", 503, "Busy", {}, None)
+                ):
+                    first = download_and_attach_originals(db, base / "store", "pinterest")
+                    second = download_and_attach_originals(db, base / "store", "pinterest")
+                    third = download_and_attach_originals(db, base / "store", "pinterest", ignore_backoff=True)
+                row = db.query("select * from download_attempts")[0]
+                self.assertEqual((first["attempted"], second["attempted"], second["deferred"]), (1, 0, 1))
+                self.assertEqual(third["attempted"], 1)
+                self.assertEqual((row["status"], row["attempts"], row["error_class"], row["host"]), ("failed", 2, "HTTP503", "cdn.example.com"))
+                self.assertGreater(row["next_eligible_at"], row["last_attempt_at"])
+
+                def _ok(*, url, dest_dir, filename_stem, **kw):
+                    dest_dir.mkdir(parents=True, exist_ok=True)
+                    out = dest_dir / f"{filename_stem}.jpg"
+                    out.write_bytes(b"img")
+                    return out, hashlib.sha256(b"img").hexdigest(), 3
+
+                with mock.patch("inspirations.storage.fetch_url_preview", side_effect=_image_preview), mock.patch(
+                    "inspirations.storage.download_url_to_store", side_effect=_ok
+                ):
+                    download_and_attach_originals(db, base / "store", "pinterest", ignore_backoff=True)
+                row = db.query("select * from download_attempts")[0]
+            self.assertEqual((row["status"], row["attempts"], row["bytes"], row["next_eligible_at"]), ("ok", 0, 3, None))
+
+    def test_cached_negative_previews_are_not_recorded_as_attempts(self):
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, image_url, imported_at) values (?, ?, ?, ?, ?)",
+                    ("f0", "facebook", "fb://0", "https://example.com/empty", "2026-01-01T00:00:00+00:00"),
+                )
+                save_url_previews(
+                    db,
+                    [
+                        UrlPreview(
+                            url="https://example.com/empty",
+                            status="none",
+                            error="No image preview found for URL",
+                            fetched_at="2026-01-01T00:00:00+00:00",
+                            retry_after="2999-01-01T00:00:00+00:00",
+                        )
+                    ],
+                )
+                with mock.patch("inspirations.storage.open_url") as open_mock:
+                    reports = [download_and_attach_originals(db, base / "store", "facebook") for _ in range(2)]
+                recorded = db.query_value("select count(*) from download_attempts")
+
+            open_mock.assert_not_called()
+            self.assertEqual(recorded, 0)
+            self.assertEqual([(r["attempted"], r["preview_cache_hits"], len(r["errors"])) for r in reports], [(1, 1, 1)] * 2)
+
+    def test_circuit_breaker_stops_hammering_a_failing_host(self):
+        calls: list[str] = []
+
+        def _timeout(*, url, **kw):
+            calls.append(url)
+            raise TimeoutError("timed out")
+
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                for i in range(12):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, image_url, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"p{i}", "pinterest", f"pin://{i}", f"https://www.example.com/pin/{i}", f"2026-01-01T00:00:{i:02d}+00:00"),
+                    )
+
+                def _preview(url, cached=None):
+                    image = url.replace("www.example.com/pin", "down.example.com") + ".jpg"
+                    return UrlPreview(url=url, status="preview", image_url=image, fetched_at="2026-01-01T00:00:00+00:00")
+
+                with mock.patch("inspirations.storage.fetch_url_preview", side_effect=_preview), mock.patch(
+                    "inspirations.storage.download_url_to_store", side_effect=_timeout
+                ), mock.patch("inspirations.storage.DOWNLOAD_BREAKER_THRESHOLD", 3):
+                    report = download_and_attach_originals(db, base / "store", "pinterest", workers=1, host_interval_s=0)
+                recorded = db.query_value("select count(*) from download_attempts")
+
+            self.assertEqual(len(calls), 3)
+            self.assertEqual((report["circuit_open"], recorded), (9, 3))
+            self.assertEqual(report["open_hosts"], ["down.example.com"])
+
+    def test_interrupted_download_resumes_with_range(self):
+        body = b"\xff\xd8\xff" + bytes(range(256)) * 4
+
+        def _open(url, headers=None, **kw):
+            if "Range" in (headers or {}):
+                start = int(headers["Range"].split("=")[1].rstrip("-"))
+                self.assertEqual(headers["If-Range"], '"v1"')
+                return _FakeResponse(
+                    206, "image/jpeg", body[start:], {"Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}", "ETag": '"v1"'}
+                )
+            return _TruncatedResponse(200, "image/jpeg", body, {"ETag": '"v1"', "Content-Length": str(len(body))})
+
+        with tempfile.TemporaryDirectory() as td:
+            dest = Path(td)
+            with mock.patch("inspirations.storage.is_safe_public_url", return_value=True), mock.patch(
+                "inspirations.storage.open_url", side_effect=_open
+            ) as open_mock:
+                with self.assertRaises(TimeoutError):
+                    download_url_to_store(url="https://cdn.example.com/a.jpg", dest_dir=dest, filename_stem="a1")
+                self.assertEqual(sorted(p.name for p in dest.iterdir()), ["a1.jpg.part", "a1.jpg.part.json"])
+                out, sha, n = download_url_to_store(url="https://cdn.example.com/a.jpg", dest_dir=dest, filename_stem="a1")
+
+            self.assertEqual(open_mock.call_count, 2)
+            self.assertEqual((out.name, n, sha), ("a1.jpg", len(body), hashlib.sha256(body).hexdigest()))
+            self.assertEqual(out.read_bytes(), body)
+            self.assertEqual([p.name for p in dest.iterdir()], ["a1.jpg"])
+
+    def test_mismatched_content_range_restarts_without_range(self):
+        body = b"\xff\xd8\xff" + bytes(range(256)) * 4
+        requests: list[dict] = []
+
+        def _open(url, headers=None, **kw):
+            requests.append(dict(headers or {}))
+            if "Range" in requests[-1] or url.endswith("/unsolicited.jpg"):
+                # Server ignores our offset and sends a different slice.
+                return _FakeResponse(206, "image/jpeg", body[:100], {"Content-Range": f"bytes 0-99/{len(body)}", "ETag": '"v1"'})
+            return _FakeResponse(200, "image/jpeg", body, {"ETag": '"v1"'})
+
+        with tempfile.TemporaryDirectory() as td:
+            dest = Path(td)
+            part = dest / "a1.jpg.part"
+            part.write_bytes(body[:300])
+            part.with_name(part.name + ".json").write_text(
+                json.dumps({"url": "https://cdn.example.com/a.jpg", "validator": '"v1"'}), encoding="utf-8"
+            )
+            with mock.patch("inspirations.storage.is_safe_public_url", return_value=True), mock.patch(
+                "inspirations.storage.open_url", side_effect=_open
+            ):
+                out, sha, n = download_url_to_store(url="https://cdn.example.com/a.jpg", dest_dir=dest, filename_stem="a1")
+                with self.assertRaises(ValueError):
+                    download_url_to_store(url="https://cdn.example.com/unsolicited.jpg", dest_dir=dest / "fresh", filename_stem="b1")
+
+            self.assertEqual(["Range" in r for r in requests[:2]], [True, False])
+            self.assertEqual((n, sha), (len(body), hashlib.sha256(body).hexdigest()))
+            self.assertEqual(out.read_bytes(), body)
+            self.assertEqual([p.name for p in dest.iterdir() if p.is_file()], ["a1.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
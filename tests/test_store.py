@@ -1,6 +1,8 @@
+import json
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from inspirations.db import Db, ensure_schema
 from inspirations.store import (
@@ -8,11 +10,15 @@ from inspirations.store import (
     create_annotation,
     create_collection,
     delete_assets,
+    filter_asset_ids,
+    get_asset,
     list_annotations,
     list_assets,
+    list_assets_page,
     list_collection_items,
     list_collections,
     remove_items_from_collection,
+    update_annotation,
 )
 
 
@@ -84,6 +90,177 @@ class TestStore(unittest.TestCase):
             self.assertEqual(len(res_label), 1)
             self.assertEqual(len(res_summary), 1)
 
+    def test_list_assets_full_text_covers_annotations_and_collections(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1", "Mudroom bench"),
+                )
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("a2", "pinterest", "pin://2", "Entry"),
+                )
+                ann = create_annotation(db, asset_id="a1", x=0.1, y=0.1, text="terrazzo floor")
+                col = create_collection(db, name="Cottage refresh")
+                add_items_to_collection(db, collection_id=col["id"], asset_ids=["a2"])
+                by_annotation = list_assets(db, q="terrazz")
+                by_collection = list_assets(db, q="cottage")
+                update_annotation(db, annotation_id=ann["id"], text="slate floor")
+                after_edit = list_assets(db, q="terrazzo")
+                db.exec("update collections set name=? where id=?", ("Lake house", col["id"]))
+                after_rename = list_assets(db, q="lake house")
+            self.assertEqual([r["id"] for r in by_annotation], ["a1"])
+            self.assertEqual([r["id"] for r in by_collection], ["a2"])
+            self.assertEqual(after_edit, [])
+            self.assertEqual([r["id"] for r in after_rename], ["a2"])
+
+    def test_list_assets_ranks_full_text_matches(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, notes, imported_at, thumb_path) values (?, ?, ?, ?, ?, datetime('now'), ?)",
+                    ("a1", "pinterest", "pin://1", "Living room", "a little brass here", "/tmp/a1.jpg"),
+                )
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("a2", "pinterest", "pin://2", "Brass sconce with brass shade"),
+                )
+                ranked = list_assets(db, q="brass")
+            self.assertEqual([r["id"] for r in ranked], ["a2", "a1"])
+
+    def test_filter_asset_ids_intersects_filters(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for aid, source, board in [("a1", "pinterest", "Kitchens"), ("a2", "pinterest", "Baths"), ("a3", "facebook", "Kitchens")]:
+                    db.exec(
+                        "insert into assets (id, source, source_ref, board, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                        (aid, source, f"ref://{aid}", board),
+                    )
+                for aid in ("a1", "a2", "a3"):
+                    db.exec(
+                        """
+                        insert into asset_labels (id, asset_id, label, confidence, source, model, run_id, created_at)
+                        values (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+                        """,
+                        (f"l-{aid}", aid, "oak" if aid != "a2" else "tile", 0.9, "ai", "test", "r1"),
+                    )
+                col = create_collection(db, name="Picks")
+                add_items_to_collection(db, collection_id=col["id"], asset_ids=["a1", "a2"])
+
+                self.assertIsNone(filter_asset_ids(db))
+                self.assertEqual(filter_asset_ids(db, board="Kitchens"), {"a1", "a3"})
+                self.assertEqual(filter_asset_ids(db, source="pinterest,facebook", label="oak"), {"a1", "a3"})
+                self.assertEqual(filter_asset_ids(db, board="Kitchens", collection_id=col["id"]), {"a1"})
+                self.assertEqual(filter_asset_ids(db, label="tile", board="Kitchens"), set())
+
+    def test_delete_assets_keeps_shared_media(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for aid in ("a1", "a2"):
+                    db.exec(
+                        """
+                        insert into assets (id, source, source_ref, imported_at, stored_path, thumb_path, sha256)
+                        values (?, 'facebook', ?, datetime('now'), '/store/originals/x.jpg', '/store/thumbs/x.jpg', 'abc')
+                        """,
+                        (aid, f"fb://{aid}"),
+                    )
+                first = delete_assets(db, asset_ids=["a1"])
+                second = delete_assets(db, asset_ids=["a2"])
+            self.assertEqual(first["paths"], [])
+            self.assertEqual(first["shared_paths_kept"], 2)
+            self.assertEqual(second["paths"], ["/store/originals/x.jpg", "/store/thumbs/x.jpg"])
+
+    def test_list_assets_like_fallback_without_fts(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1", "White oak cabinets"),
+                )
+                with mock.patch("inspirations.store.has_asset_search", return_value=False):
+                    res = list_assets(db, q="cabinets white")
+                    res_sub = list_assets(db, q="abin")
+            self.assertEqual(res, [])
+            self.assertEqual([r["id"] for r in res_sub], ["a1"])
+
+    def test_list_assets_reads_latest_ai_result(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1", "Kitchen"),
+                )
+                for ai_id, model, summary, created_at in (
+                    ("ai2", "gemini-2.5-flash", "newer summary", "2026-02-07T00:00:00+00:00"),
+                    ("ai1", "gemini-2.0-flash", "older summary", "2026-02-06T00:00:00+00:00"),
+                ):
+                    db.exec(
+                        """
+                        insert into asset_ai (id, asset_id, provider, model, summary, json, created_at)
+                        values (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (ai_id, "a1", "gemini", model, summary, "{}", created_at),
+                    )
+                latest = list_assets(db)[0]
+                db.exec("delete from asset_ai where id=?", ("ai2",))
+                after_delete = list_assets(db)[0]
+            self.assertEqual(latest["ai_summary"], "newer summary")
+            self.assertEqual(latest["ai_model"], "gemini-2.5-flash")
+            self.assertEqual(after_delete["ai_summary"], "older summary")
+            self.assertEqual(after_delete["ai_created_at"], "2026-02-06T00:00:00+00:00")
+
+    def test_list_assets_card_fields_replace_ai_json(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            ai = {
+                "image_type": "photo",
+                "rooms": ["kitchen", " "],
+                "materials": ["white oak", "kitchen"],
+                "colors": "cream",
+                "tags": ["a", "b", "c", "d"],
+                "text_in_image": ["SALE"],
+                "lighting": None,
+            }
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1", "Kitchen"),
+                )
+                db.exec(
+                    """
+                    insert into asset_ai (id, asset_id, provider, model, summary, json, created_at)
+                    values (?, ?, ?, ?, ?, ?, datetime('now'))
+                    """,
+                    ("ai1", "a1", "gemini", "m", "summary", json.dumps(ai)),
+                )
+                card = list_assets(db, fields="card")[0]
+                full = list_assets(db)[0]
+                detail = get_asset(db, asset_id="a1")
+                missing = get_asset(db, asset_id="nope")
+                with self.assertRaises(ValueError):
+                    list_assets(db, fields="everything")
+            self.assertNotIn("ai_json", card)
+            self.assertEqual(card["ai_image_type"], "photo")
+            self.assertEqual(card["ai_label_count"], 9)
+            self.assertEqual(card["ai_top_tags"], ["kitchen", "white oak", "cream", "a", "b", "c"])
+            self.assertEqual(json.loads(full["ai_json"]), ai)
+            self.assertEqual(json.loads(detail["ai_json"]), ai)
+            self.assertIsNone(missing)
+
     def test_list_assets_prioritizes_records_with_preview_media(self):
         with tempfile.TemporaryDirectory() as td:
             db_path = Path(td) / "t.sqlite"
@@ -148,6 +325,71 @@ class TestStore(unittest.TestCase):
                 res = list_assets(db, source="facebook", limit=10)
             self.assertEqual([r["id"] for r in res[:4]], ["a4", "a3", "a2", "a1"])
 
+    def test_preview_rank_tracks_media_updates(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                    ("a1", "facebook", "https://example.com/a1", "Older", "2026-02-01T00:00:00+00:00"),
+                )
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at, image_url) values (?, ?, ?, ?, ?, ?)",
+                    ("a2", "facebook", "https://example.com/a2", "Newer", "2026-02-02T00:00:00+00:00", "https://example.com/a2.png"),
+                )
+                before = [r["id"] for r in list_assets(db)]
+                db.exec("update assets set thumb_path=? where id=?", ("/tmp/a1.jpg", "a1"))
+                after = [r["id"] for r in list_assets(db)]
+                ranks = {r["id"]: r["preview_rank"] for r in db.query("select id, preview_rank from assets")}
+            self.assertEqual(before, ["a2", "a1"])
+            self.assertEqual(after, ["a1", "a2"])
+            self.assertEqual(ranks, {"a1": 3, "a2": 1})
+
+    def test_list_assets_page_walks_keyset_cursor(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                for i in range(5):
+                    db.exec(
+                        "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                        (f"a{i}", "pinterest", f"pin://{i}", "Same time", "2026-02-01T00:00:00+00:00"),
+                    )
+                first = list_assets_page(db, limit=2)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, ?)",
+                    ("new", "pinterest", "pin://new", "Fresh", "2026-03-01T00:00:00+00:00"),
+                )
+                seen = [r["id"] for r in first["assets"]]
+                cursor = first["next_cursor"]
+                while cursor:
+                    page = list_assets_page(db, limit=2, cursor=cursor)
+                    seen.extend(r["id"] for r in page["assets"])
+                    cursor = page["next_cursor"]
+                with self.assertRaises(ValueError):
+                    list_assets_page(db, cursor="bm90LWpzb24")
+            self.assertEqual(seen, ["a4", "a3", "a2", "a1", "a0"])
+
+    def test_list_assets_page_cursor_follows_search_rank(self):
+        with tempfile.TemporaryDirectory() as td:
+            db_path = Path(td) / "t.sqlite"
+            with Db(db_path) as db:
+                ensure_schema(db)
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, notes, imported_at) values (?, ?, ?, ?, ?, datetime('now'))",
+                    ("a1", "pinterest", "pin://1", "Living room", "a little brass here"),
+                )
+                db.exec(
+                    "insert into assets (id, source, source_ref, title, imported_at) values (?, ?, ?, ?, datetime('now'))",
+                    ("a2", "pinterest", "pin://2", "Brass sconce with brass shade"),
+                )
+                first = list_assets_page(db, q="brass", limit=1)
+                second = list_assets_page(db, q="brass", limit=1, cursor=first["next_cursor"])
+            self.assertEqual([r["id"] for r in first["assets"]], ["a2"])
+            self.assertEqual([r["id"] for r in second["assets"]], ["a1"])
+            self.assertIsNone(second["next_cursor"])
+
     def test_remove_items_from_collection(self):
         with tempfile.TemporaryDirectory() as td:
             db_path = Path(td) / "t.sqlite"
@@ -1,4 +1,7 @@
+import multiprocessing
+import os
 import tempfile
+import time
 import unittest
 from pathlib import Path
 from unittest import mock
@@ -104,5 +107,101 @@ class TestThumbnails(unittest.TestCase):
             self.assertIsNone(row["thumb_path"])
 
 
+    def test_identical_originals_share_one_thumbnail(self):
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            stored = base / "blob.jpg"
+            stored.write_bytes(b"jpg")
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                for i, aid in enumerate(["a1", "a2"]):
+                    db.exec(
+                        """
+                        insert into assets (id, source, source_ref, imported_at, stored_path, sha256)
+                        values (?, 'pinterest', ?, ?, ?, 'abc')
+                        """,
+                        (aid, f"pin://{aid}", f"2026-01-0{i + 1}T00:00:00+00:00", str(stored)),
+                    )
+
+                def _fake_thumb(tool, src, dst, size, **kw):
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    dst.write_bytes(b"thumb")
+
+                with mock.patch("inspirations.thumbnails._make_thumb", side_effect=_fake_thumb) as make, mock.patch(
+                    "inspirations.thumbnails.compute_dhash", return_value=None
+                ):
+                    report = generate_thumbnails(db, store_dir=base / "store", tool="sips")
+                paths = [r["thumb_path"] for r in db.query("select thumb_path from assets order by id")]
+
+            self.assertEqual(make.call_count, 1)
+            self.assertEqual((report["generated"], report["reused"]), (1, 1))
+            self.assertEqual(paths[0], paths[1])
+
+    def test_process_pool_generates_shares_and_times_out(self):
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            bin_dir = base / "bin"
+            bin_dir.mkdir()
+            sips = bin_dir / "sips"
+            # Stand-in for `sips -Z <size> <src> --out <dst>`.
+            sips.write_text('#!/bin/sh\ncase "$3" in *slow*) exec sleep 30;; esac\ncp "$3" "$5"\n', encoding="utf-8")
+            sips.chmod(0o755)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                for i, (aid, name, sha) in enumerate(
+                    [("a1", "one.jpg", "s1"), ("a2", "two.jpg", "s2"), ("a3", "two.jpg", "s2"), ("a4", "slow.jpg", "s4"), ("a5", "x.bin", "s5")]
+                ):
+                    stored = base / name
+                    stored.write_bytes(name.encode())
+                    db.exec(
+                        """
+                        insert into assets (id, source, source_ref, imported_at, stored_path, sha256)
+                        values (?, 'pinterest', ?, ?, ?, ?)
+                        """,
+                        (aid, f"pin://{aid}", f"2026-01-0{i + 1}T00:00:00+00:00", str(stored), sha),
+                    )
+                with mock.patch.dict(os.environ, {"PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"}):
+                    report = generate_thumbnails(db, store_dir=base / "store", tool="sips", workers=2, timeout_s=2)
+                rows = {r["id"]: r["thumb_path"] for r in db.query("select id, thumb_path from assets")}
+
+            self.assertEqual(report["workers"], 2)
+            self.assertEqual((report["attempted"], report["generated"], report["reused"]), (5, 2, 1))
+            self.assertEqual(sorted(e["id"] for e in report["errors"]), ["a4", "a5"])
+            self.assertEqual(rows["a2"], rows["a3"])
+            self.assertTrue(rows["a1"].endswith("a1.jpg"))
+            self.assertIsNone(rows["a4"])
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "workers must inherit the patched module")
+    def test_process_pool_abandons_stuck_workers(self):
+        def _hang_on_slow(tool, src, dst, size, **kw):
+            if "slow" in src.name:
+                time.sleep(60)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            dst.write_bytes(b"thumb")
+
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            with Db(base / "t.sqlite") as db:
+                ensure_schema(db)
+                for i, name in enumerate(["slow.jpg", "b.jpg", "c.jpg"]):
+                    stored = base / name
+                    stored.write_bytes(b"jpg")
+                    db.exec(
+                        "insert into assets (id, source, source_ref, imported_at, stored_path) values (?, 'scan', ?, ?, ?)",
+                        (f"a{i}", f"scan://{i}", f"2026-01-0{i + 1}T00:00:00+00:00", str(stored)),
+                    )
+                started = time.monotonic()
+                # Worker processes are forked, so they inherit the patched module.
+                with mock.patch("inspirations.thumbnails._make_thumb", side_effect=_hang_on_slow), mock.patch(
+                    "inspirations.thumbnails.THUMB_TIMEOUT_GRACE_S", 0
+                ):
+                    report = generate_thumbnails(db, store_dir=base / "store", tool="pillow", workers=2, timeout_s=1)
+                elapsed = time.monotonic() - started
+
+            self.assertLess(elapsed, 20)
+            self.assertEqual(report["generated"], 2)
+            self.assertEqual(report["errors"], [{"id": "a0", "error": "Timed out after 1s"}])
+
+
 if __name__ == "__main__":
     unittest.main()
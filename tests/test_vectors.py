@@ -0,0 +1,24 @@
+import unittest
+
+from inspirations.vectors import dot, pack_vector, query_vector, unpack_vector, vector_dimensions
+
+
+class TestVectors(unittest.TestCase):
+    def test_pack_vector_is_normalized_little_endian_float32(self):
+        blob = pack_vector([3.0, 4.0])
+        self.assertEqual(blob, bytes.fromhex("9a99193f") + bytes.fromhex("cdcc4c3f"))
+        self.assertEqual(vector_dimensions(blob), 2)
+        values = list(unpack_vector(blob))
+        self.assertAlmostEqual(values[0], 0.6, places=6)
+        self.assertAlmostEqual(values[1], 0.8, places=6)
+
+    def test_dot_of_unit_vectors_is_cosine(self):
+        score = dot(query_vector([2.0, 0.0]), unpack_vector(pack_vector([1.0, 1.0])))
+        self.assertAlmostEqual(score, 2**-0.5, places=6)
+
+    def test_zero_vector_stays_zero(self):
+        self.assertEqual(list(unpack_vector(pack_vector([0.0, 0.0]))), [0.0, 0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -53,7 +53,6 @@ def with_db(fn: Callable[[Db], Any], *, retries: int = 8, base_delay: float = 0.
     for i in range(retries):
         try:
             with Db(DB_PATH) as db:
-                ensure_schema(db)
                 return fn(db)
         except sqlite3.OperationalError as e:
             if "locked" in str(e).lower() and i < retries - 1:
@@ -241,6 +240,7 @@ def main() -> None:
     run_id = str(uuid.uuid4())
     now = _now_iso()
 
+    with_db(ensure_schema)
     with_db(
         lambda db: db.exec(
             "insert into ai_runs (id, provider, model, created_at) values (?, ?, ?, ?)",